@@ -5,10 +5,14 @@ Incluye especializaciones como Perro, Gato, Ave y Pez.
 
 También se integra con módulos externos para gestionar alimentación, vacunación y tratamientos,
 así como un pequeño bloque de ejemplo para uso práctico al ejecutar el archivo como script principal.
+
+Los animales cargados de la base de datos con `Animal.from_row` recuerdan sus valores
+originales, de modo que `save()` solo envía los campos modificados.
 """
 from alimentacion.alimentacion import CatalogoAlimentos, Alimento
 from salud.vacunacion import CartillaVacunacion, Vacuna
 from cuidados.cuidado_base import CuidadoProgramado
+from database.modelo import SeguimientoCambios
 import requests
 from datetime import datetime
 
@@ -18,13 +22,16 @@ def obtener_tratamiento():
     from salud.tratamiento import Tratamiento, RegistroTratamientos
     return Tratamiento, RegistroTratamientos
 
-class Animal:
+class Animal(SeguimientoCambios):
     """
     Clase base para representar un animal. Esta clase maneja las características generales
     de un animal, como su nombre, especie, edad y la posibilidad de llevar un registro de
     su cartilla de vacunación, alimentación, cuidados programados y tratamientos.
     """
 
+    _CLAVE = "id_animal"
+    _ACTUALIZAR = "update_animal"
+
     def __init__(self, chip, nombre, especie, edad, requiere_cartilla=True, requiere_alimentos=True, requiere_cuidados=True):
         """
         Inicializa los atributos básicos del animal.
@@ -47,6 +54,40 @@ class Animal:
         self.dueno = None
         self.cuidados_programados = [] if requiere_cuidados else []
         self.registro_tratamientos = None  # Inicializamos como None, se asigna cuando es necesario
+        self.id_animal = None  # Clave en la tabla animales; la fija from_row
+
+    @classmethod
+    def from_row(cls, row):
+        """
+        Crea un animal a partir de una fila de la tabla animales sin volver a darlo de alta
+        (los constructores de las subclases lo registran en la API).
+
+        :param row: Diccionario con las columnas id_animal, chip, especie, nombre, edad y raza.
+        :return: Instancia de Perro, Gato, Ave o Pez según la especie (Animal si no se reconoce),
+                 marcada como guardada.
+        """
+        if cls is Animal:
+            cls = {"perro": Perro, "gato": Gato, "ave": Ave, "pez": Pez}.get(
+                str(row.get("especie", "")).lower(), Animal)
+        animal = cls.__new__(cls)
+        Animal.__init__(animal, row.get("chip"), row["nombre"], row["especie"], row.get("edad"),
+                        requiere_cartilla=cls not in (Ave, Pez))
+        animal.raza = row.get("raza")
+        animal.id_animal = row.get("id_animal")
+        animal.marcar_guardado()
+        return animal
+
+    def _columnas(self):
+        """
+        Valores de las columnas de la tabla animales que se corresponden con atributos.
+        """
+        return {
+            "chip": self.chip,
+            "especie": self.especie,
+            "nombre": self.nombre,
+            "edad": self.edad,
+            "raza": getattr(self, "raza", None),
+        }
 
     def __str__(self):
         """
@@ -2,8 +2,10 @@ from abc import ABC, abstractmethod
 
 import requests
 
+from database.modelo import SeguimientoCambios
 
-class Persona(ABC):
+
+class Persona(SeguimientoCambios, ABC):
     """
     Clase abstracta base que representa una persona.
 
@@ -12,6 +14,8 @@ class Persona(ABC):
         nif (str): Número de identificación fiscal.
         direccion (str): Dirección física.
         telefono (str): Número de teléfono.
+
+    Las instancias cargadas con `from_row` solo guardan con `save()` los campos modificados.
     """
     def __init__(self, nombre, nif, direccion, telefono):
         """
@@ -61,6 +65,20 @@ class Persona(ABC):
             return (self.nif == other.nif)
         return False
 
+    def _columnas(self):
+        """
+        Devuelve los valores de las columnas comunes de duenos y veterinarios.
+
+        Returns:
+            dict: nombre, nif, direccion y telefono.
+        """
+        return {
+            "nombre": self.nombre,
+            "nif": self.nif,
+            "direccion": self.direccion,
+            "telefono": self.telefono,
+        }
+
 
 class Dueno(Persona):
     """
@@ -68,7 +86,11 @@ class Dueno(Persona):
 
     Atributos heredados de Persona y:
         animales (list): Lista de animales asociados al dueño.
+        id_dueno (int): Clave en la tabla duenos (None si no se ha cargado de la BD).
     """
+    _CLAVE = "id_dueno"
+    _ACTUALIZAR = "actualizar_dueno"
+
     def __init__(self, nombre, nif, direccion, telefono):
         """
         Inicializa un nuevo dueño sin animales registrados.
@@ -81,8 +103,27 @@ class Dueno(Persona):
         """
         super().__init__(nombre, nif, direccion, telefono)
         self.animales = []
+        self.id_dueno = None
         requests.post("http://127.0.0.1:5000/dueno",json={"nombre": self.nombre, "nif": self.nif, "direccion": self.direccion, "telefono": self.telefono})
 
+    @classmethod
+    def from_row(cls, row):
+        """
+        Crea un dueño a partir de una fila de la tabla duenos sin volver a darlo de alta.
+
+        Args:
+            row (dict): Fila con id_dueno, nif, nombre, direccion y telefono.
+
+        Returns:
+            Dueno: Instancia marcada como guardada.
+        """
+        dueno = cls.__new__(cls)
+        Persona.__init__(dueno, row["nombre"], row["nif"], row["direccion"], row["telefono"])
+        dueno.animales = []
+        dueno.id_dueno = row.get("id_dueno")
+        dueno.marcar_guardado()
+        return dueno
+
     def agregar_animal(self, animal):
         """
         Agrega un animal a la lista del dueño.
@@ -124,6 +165,9 @@ class Veterinario(Persona):
         colegiado_id (str): Identificador del colegio profesional.
         consultas (list): Lista de consultas atendidas.
     """
+    _CLAVE = "colegiado_id"
+    _ACTUALIZAR = "actualizar_veterinario"
+
     def __init__(self, nombre, nif, direccion, telefono, colegiado_id):
         """
         Inicializa un nuevo veterinario sin consultas registradas.
@@ -164,6 +208,33 @@ class Veterinario(Persona):
         base = super().__repr__()[:-1]
         return f"{base}, colegiado_id={self.colegiado_id!r}, consultas={len(self.consultas)})"
 
+    @classmethod
+    def from_row(cls, row):
+        """
+        Crea un veterinario a partir de una fila de la tabla veterinarios sin volver a darlo de alta.
+
+        Args:
+            row (dict): Fila con colegiado_id, nombre, nif, direccion y telefono.
+
+        Returns:
+            Veterinario: Instancia marcada como guardada.
+        """
+        veterinario = cls.__new__(cls)
+        Persona.__init__(veterinario, row["nombre"], row["nif"], row["direccion"], row["telefono"])
+        veterinario.colegiado_id = row["colegiado_id"]
+        veterinario.consultas = []
+        veterinario.marcar_guardado()
+        return veterinario
+
+    def _columnas(self):
+        """
+        Añade colegiado_id (clave de la tabla, modificable) a las columnas comunes.
+
+        Returns:
+            dict: Columnas de la tabla veterinarios.
+        """
+        return {**super()._columnas(), "colegiado_id": self.colegiado_id}
+
     def registrar_consulta(self, consulta):
         """
         Registra una nueva consulta médica.
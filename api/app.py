@@ -5,14 +5,36 @@ app.py · API RESTful Clínica Veterinaria
 * CRUD animales
 * CRUD cuidados
 * CRUD dueño y veterinario
+
+Los GET de colecciones se paginan por clave primaria (*keyset*): aceptan
+`?limit=N&after=<cursor>` y responden `{"items": [...], "next": <cursor>}`;
+`next` es null en la última página.
+
+Los listados de animales y cuidados pueden pedirse completos en *streaming*:
+con `Accept: application/x-ndjson` (una fila JSON por línea) o con
+`?stream=1` (un array JSON enviado por trozos).  Las filas van del cursor
+de la BD al socket sin construir la lista ni el JSON completos en memoria.
+
+Todos los GET de datos llevan `ETag` (versiones de las tablas de las que
+dependen, ver database/versiones.py) y responden 304 sin consultar la BD si
+`If-None-Match` coincide.
+
+Las respuestas JSON se comprimen con gzip/deflate si el cliente lo acepta
+(ver api/compresion.py).
 """
 
 from __future__ import annotations
+import functools
+import json
+import re
 from datetime import datetime
-from typing import Any, Dict
+from typing import IO, Any, Callable, Dict, Iterator, List, Optional, Tuple
 
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, make_response, request
+from werkzeug.exceptions import HTTPException
 from database import db
+from database.db_base import CLAVES, COLUMNAS, ERRORES_INTEGRIDAD
+from api.compresion import instalar_compresion
 
 from animales.animal import Perro, Gato, Ave, Pez
 from cuidados.cuidado_base import CuidadoProgramado
@@ -22,16 +44,390 @@ from cuidados.cuidado_ave import CuidadoAve
 from cuidados.cuidado_pez import CuidadoPez
 
 app = Flask(__name__)
+compresor = instalar_compresion(app)
+
+PAGINA_POR_DEFECTO = 100
+PAGINA_MAXIMA = 1000
+LOTE_MAXIMO = 200
+ESPECIES = ("perro", "gato", "ave", "pez")
+# importaciones NDJSON: filas por INSERT multi-fila, longitud máxima de
+# línea y errores detallados en la respuesta
+IMPORTACION_LOTE = 500
+IMPORTACION_LINEA_MAXIMA = 1 << 20
+IMPORTACION_MAX_ERRORES = 1000
+# filas por lote leído de la BD y bytes acumulados por trozo en los listados en streaming
+FLUJO_LOTE = 1000
+FLUJO_TROZO = 64 * 1024
 
 
 def _validar_fecha(fecha_txt: str) -> str:
     try:
         datetime.strptime(fecha_txt, "%Y-%m-%d")
-    except ValueError as exc:
+    except (TypeError, ValueError) as exc:
         raise ValueError("La fecha debe estar en formato YYYY-MM-DD") from exc
     return fecha_txt
 
 
+def _cambios(tabla: str) -> Dict[str, Any]:
+    """
+    Cuerpo JSON de un PUT: objeto no vacío solo con columnas de `tabla`.
+
+    Raises
+    ------
+    ValueError
+        Si el cuerpo no es un objeto, está vacío o trae campos desconocidos.
+    """
+    cambios = request.get_json(force=True)
+    if not cambios:
+        raise ValueError("JSON vacío")
+    if not isinstance(cambios, dict):
+        raise ValueError("Se esperaba un objeto JSON con los campos a modificar")
+    desconocidas = set(cambios) - set(COLUMNAS[tabla])
+    if desconocidas:
+        raise ValueError(f"Campos no válidos para '{tabla}': {sorted(desconocidas)}")
+    return cambios
+
+
+def _validar_animal(data: Any) -> Dict[str, Any]:
+    """
+    Reglas de alta de un animal (POST /animales y su importación).
+
+    Returns
+    -------
+    Dict[str, Any]
+        Fila para `insert_animal`.
+
+    Raises
+    ------
+    ValueError
+        Si faltan `especie` o `nombre` o la especie no es reconocida.
+    """
+    if not isinstance(data, dict) or not data:
+        raise ValueError("No se recibió JSON")
+    nombre = data.get("nombre")
+    especie = data.get("especie")
+    if not nombre or not especie:
+        raise ValueError("Campos 'especie' y 'nombre' son obligatorios")
+    if str(especie).lower() not in ESPECIES:
+        raise ValueError(f"Tipo de animal '{especie}' no reconocido")
+    return {
+        "especie": especie,
+        "nombre": nombre,
+        "edad": data.get("edad"),
+        "chip": data.get("chip", ""),
+        "raza": data.get("raza"),
+    }
+
+
+def _validar_cuidado(data: Any) -> Dict[str, Any]:
+    """
+    Reglas de alta de un cuidado (POST /cuidados y su importación):
+    `animal_id` (chip del animal), `fecha` y `tipo` obligatorios, fecha
+    YYYY-MM-DD y estado de `CuidadoProgramado.ESTADOS_VALIDOS`.
+
+    Returns
+    -------
+    Dict[str, Any]
+        Fila para `insert_cuidado`.
+
+    Raises
+    ------
+    KeyError
+        Si falta un campo obligatorio.
+    ValueError
+        Si algún campo no es válido.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Se esperaba un objeto JSON")
+    animal_id = data["animal_id"]
+    if isinstance(animal_id, bool) or not isinstance(animal_id, (str, int)):
+        raise ValueError("'animal_id' debe ser el chip del animal")
+    # el chip es texto: se conservan los ceros a la izquierda y las letras
+    animal_id = str(animal_id).strip()
+    if not animal_id:
+        raise ValueError("'animal_id' no puede estar vacío")
+    fecha = _validar_fecha(data["fecha"])
+    tipo = data["tipo"]
+    estado = data.get("estado", "pendiente")
+    if estado not in CuidadoProgramado.ESTADOS_VALIDOS:
+        raise ValueError(
+            f"Estado '{estado}' no válido; usa {CuidadoProgramado.ESTADOS_VALIDOS}."
+        )
+    return {
+        "animal_id": animal_id,
+        "fecha": fecha,
+        "tipo": tipo,
+        "estado": estado,
+        "notas": data.get("notas", ""),
+    }
+
+
+def _validar_filtro_cuidados(ids: Any, filtro: Any) -> Dict[str, Any]:
+    """
+    Criterios de PATCH /cuidados: `ids` lista de enteros y `filtro` con
+    `animal_id` (chip, texto o entero), `estado` actual y `desde`/`hasta`
+    (YYYY-MM-DD).  Hace falta al menos uno de los dos.
+
+    Returns
+    -------
+    Dict[str, Any]
+        Argumentos con nombre para `db.cambiar_estado_cuidados`.
+
+    Raises
+    ------
+    ValueError
+        Si algún criterio no es válido o no se indica ninguno.
+    """
+    if ids is not None and (
+        not isinstance(ids, list)
+        or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids)
+    ):
+        raise ValueError("'ids' debe ser una lista de enteros")
+    if filtro is None:
+        filtro = {}
+    if not isinstance(filtro, dict) or set(filtro) - {"animal_id", "estado", "desde", "hasta"}:
+        raise ValueError("'filtro' admite solo animal_id, estado, desde y hasta")
+    if ids is None and not filtro:
+        raise ValueError("Indica 'ids' o un 'filtro'")
+
+    animal_id = filtro.get("animal_id")
+    if animal_id is not None:
+        if isinstance(animal_id, bool) or not isinstance(animal_id, (str, int)):
+            raise ValueError("filtro 'animal_id' debe ser el chip del animal (texto o entero)")
+        animal_id = str(animal_id).strip()
+        if not animal_id:
+            raise ValueError("filtro 'animal_id' no puede estar vacío")
+    estado = filtro.get("estado")
+    validos = CuidadoProgramado.ESTADOS_VALIDOS
+    if estado is not None and (not isinstance(estado, str) or estado not in validos):
+        raise ValueError(f"filtro 'estado' debe ser uno de {sorted(validos)}")
+    fechas = {}
+    for campo in ("desde", "hasta"):
+        if filtro.get(campo) is not None:
+            if not isinstance(filtro[campo], str):
+                raise ValueError(f"filtro '{campo}' debe ser una fecha YYYY-MM-DD")
+            fechas[campo] = _validar_fecha(filtro[campo])
+    return {"ids": ids, "animal_id": animal_id, "estado": estado, **fechas}
+
+
+def _parametros_pagina() -> Tuple[int, Optional[int]]:
+    """Lee y valida `limit` y `after` de la query string."""
+    try:
+        limit = int(request.args.get("limit", PAGINA_POR_DEFECTO))
+        after = request.args.get("after")
+        after = int(after) if after not in (None, "") else None
+    except ValueError as exc:
+        raise ValueError("'limit' y 'after' deben ser enteros") from exc
+    if not 1 <= limit <= PAGINA_MAXIMA:
+        raise ValueError(f"'limit' debe estar entre 1 y {PAGINA_MAXIMA}")
+    return limit, after
+
+
+def _pagina(listar: Callable[..., List[Dict[str, Any]]], tabla: str, *args: Any):
+    """
+    Responde una página de `listar(*args, limit=, after=)`.
+
+    Se pide una fila más de las necesarias para saber si hay página
+    siguiente sin una consulta COUNT adicional.
+    """
+    try:
+        limit, after = _parametros_pagina()
+    except ValueError as e:
+        return {"error": str(e)}, 400
+
+    filas = listar(*args, limit=limit + 1, after=after)
+    siguiente = filas[limit - 1][CLAVES[tabla]] if len(filas) > limit else None
+    return jsonify({"items": filas[:limit], "next": siguiente}), 200
+
+
+def _condicional(*tablas: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """
+    GET condicional para una vista que solo depende de `tablas`.
+
+    El ETag se calcula con las versiones de las tablas *antes* de leerlas:
+    si una escritura llega durante la lectura el ETag queda atrás y la
+    siguiente petición vuelve a descargar, nunca al revés.  Si el cuerpo
+    sale comprimido, el compresor le añade la codificación al ETag; el 304
+    acepta tanto esa variante como la del cuerpo sin comprimir.
+    """
+    def decorador(vista: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(vista)
+        def condicional(*args: Any, **kwargs: Any):
+            etag = db.etag(*tablas)
+            if _modo_flujo() == "ndjson":      # misma URL, otra representación
+                etag += "-ndjson"
+            coincide = next(
+                (e for e in compresor.etiquetas(etag) if request.if_none_match.contains_weak(e)),
+                None,
+            )
+            if coincide is not None:
+                respuesta = make_response("", 304)
+                respuesta.set_etag(coincide, weak=True)
+                respuesta.vary.add("Accept-Encoding")
+            else:
+                respuesta = make_response(vista(*args, **kwargs))
+                if respuesta.status_code != 200:
+                    return respuesta
+                respuesta.set_etag(etag, weak=True)
+            respuesta.vary.add("Accept")
+            return respuesta
+        return condicional
+    return decorador
+
+
+def _lineas(flujo: IO[bytes]) -> Iterator[Tuple[int, Optional[bytes]]]:
+    """
+    Lee `flujo` línea a línea sin cargarlo entero; entrega (número, línea)
+    o (número, None) si la línea supera IMPORTACION_LINEA_MAXIMA.
+    """
+    numero = 0
+    while True:
+        linea = flujo.readline(IMPORTACION_LINEA_MAXIMA + 1)
+        if not linea:
+            return
+        numero += 1
+        if len(linea) > IMPORTACION_LINEA_MAXIMA and not linea.endswith(b"\n"):
+            while linea and not linea.endswith(b"\n"):      # descarta el resto
+                linea = flujo.readline(IMPORTACION_LINEA_MAXIMA)
+            yield numero, None
+        else:
+            yield numero, linea
+
+
+def _importar(
+    validar: Callable[[Any], Dict[str, Any]],
+    insertar_muchos: Callable[[List[Dict[str, Any]]], List[int]],
+    insertar_uno: Callable[[Dict[str, Any]], int],
+) -> Dict[str, Any]:
+    """
+    Importa el cuerpo NDJSON de la petición (un objeto JSON por línea).
+
+    Las filas válidas se insertan con `insertar_muchos` en lotes de
+    IMPORTACION_LOTE; si un lote viola una restricción (chip duplicado,
+    animal inexistente…) se reintenta fila a fila para aislar las culpables.
+    Los errores se anotan por línea y la importación continúa.
+    """
+    insertados = 0
+    total_errores = 0
+    errores: List[Dict[str, Any]] = []
+    lote: List[Tuple[int, Dict[str, Any]]] = []
+
+    def anotar(numero: int, mensaje: str) -> None:
+        nonlocal total_errores
+        total_errores += 1
+        if len(errores) < IMPORTACION_MAX_ERRORES:
+            errores.append({"linea": numero, "error": mensaje})
+
+    def volcar() -> None:
+        nonlocal insertados
+        if not lote:
+            return
+        try:
+            insertar_muchos([fila for _, fila in lote])
+            insertados += len(lote)
+        except ERRORES_INTEGRIDAD:
+            for numero, fila in lote:
+                try:
+                    insertar_uno(fila)
+                    insertados += 1
+                except ERRORES_INTEGRIDAD as e:
+                    anotar(numero, f"Conflicto con los datos existentes: {e}")
+        lote.clear()
+
+    for numero, linea in _lineas(request.stream):
+        if linea is None:
+            anotar(numero, f"Línea de más de {IMPORTACION_LINEA_MAXIMA} bytes")
+            continue
+        if not linea.strip():
+            continue
+        try:
+            fila = validar(json.loads(linea))
+        except KeyError as e:
+            anotar(numero, f"Campo obligatorio faltante: {e}")
+            continue
+        except ValueError as e:          # incluye JSON mal formado
+            anotar(numero, str(e))
+            continue
+        lote.append((numero, fila))
+        if len(lote) >= IMPORTACION_LOTE:
+            volcar()
+    volcar()
+    errores.sort(key=lambda e: e["linea"])       # los de lote llegan al volcarlo
+    return {"insertados": insertados, "total_errores": total_errores, "errores": errores}
+
+
+def _modo_flujo() -> Optional[str]:
+    """
+    "ndjson" si el cliente prefiere `application/x-ndjson`, "json" si pide
+    `?stream=1` y None para la respuesta paginada normal.
+    """
+    preferido = request.accept_mimetypes.best_match(["application/json", "application/x-ndjson"])
+    if preferido == "application/x-ndjson":
+        return "ndjson"
+    if request.args.get("stream", "").lower() in ("1", "true", "yes", "si", "sí"):
+        return "json"
+    return None
+
+
+def _flujo(filas: Iterator[Dict[str, Any]], modo: str) -> Response:
+    """
+    Respuesta en streaming con `filas`: NDJSON o array JSON por trozos.
+
+    Las filas se codifican una a una y se envían en trozos de unos
+    FLUJO_TROZO bytes.  Si la BD falla a mitad la respuesta (ya con 200)
+    queda truncada; un cliente NDJSON lo detecta por la última línea.
+    """
+    codificar = app.json.dumps
+
+    def trozos() -> Iterator[str]:
+        partes: List[str] = []
+        tam = 0
+        if modo == "json":
+            partes.append("[")
+        separador = "" if modo == "ndjson" else "\n"
+        for fila in filas:
+            texto = codificar(fila)
+            if modo == "ndjson":
+                texto += "\n"
+            partes.append(separador + texto)
+            if modo == "json":
+                separador = ",\n"
+            tam += len(texto)
+            if tam >= FLUJO_TROZO:
+                yield "".join(partes)
+                partes.clear()
+                tam = 0
+        if modo == "json":
+            partes.append("]\n")
+        if partes:
+            yield "".join(partes)
+
+    tipo = "application/x-ndjson" if modo == "ndjson" else "application/json"
+    return Response(trozos(), mimetype=tipo)
+
+
+def _listado(
+    listar: Callable[..., List[Dict[str, Any]]],
+    iterar: Callable[..., Iterator[Dict[str, Any]]],
+    tabla: str,
+    *args: Any,
+):
+    """Listado completo en streaming (ver `_modo_flujo`) o página normal."""
+    modo = _modo_flujo()
+    if modo is None:
+        return _pagina(listar, tabla, *args)
+    return _flujo(iterar(*args, batch_size=FLUJO_LOTE), modo)
+
+
+def _conflicto(exc: Exception):
+    """Una escritura violó una restricción de la BD (chip duplicado, campo obligatorio…)."""
+    return {"error": f"Conflicto con los datos existentes: {exc}"}, 409
+
+
+for _error in ERRORES_INTEGRIDAD:
+    app.register_error_handler(_error, _conflicto)
+
+
 @app.route("/")
 def home():
     return " Bienvenido a la API de la Clínica Veterinaria"
@@ -40,18 +436,23 @@ def home():
 # ------------------- CRUD ANIMALES -------------------
 
 @app.route("/animales", methods=["GET"])
+@_condicional("animales")
 def listar_animales():
     """
-    Devuelve un listado JSON con los animales almacenados en la BD.
+    Devuelve una página JSON con los animales almacenados en la BD.
+
+    Query string: `limit` (por defecto 100) y `after` (cursor `next`
+    de la página anterior).  Con `Accept: application/x-ndjson` o
+    `?stream=1` devuelve todos los animales en streaming (ver `_flujo`).
 
     Returns
     -------
-    json : list
-        Listado de animales en formato JSON.
+    json : dict
+        `{"items": [...], "next": cursor | null}`.
     int
-        Código de estado HTTP 200 (OK).
+        Código de estado HTTP 200 (OK) o 400 si la paginación no es válida.
     """
-    return jsonify(db.listar_animales()), 200
+    return _listado(db.get_animales, db.iter_animales, "animales")
 
 
 @app.route("/animales", methods=["POST"])
@@ -61,13 +462,15 @@ def crear_animal():
 
     Ejemplo de cuerpo JSON:
     {
-      "tipo": "perro",
+      "especie": "perro",
       "chip": "1234",
       "nombre": "Fido",
       "edad": 4,
+      "cuidados": [{"fecha": "2024-06-05", "tipo": "Vacuna"}]
     }
 
-    Campos mínimos: tipo, nombre
+    Campos mínimos: especie, nombre.  `cuidados` es opcional: se crean con el
+    animal en una misma transacción (o se crea todo o nada).
 
     Returns
     -------
@@ -77,30 +480,84 @@ def crear_animal():
         Código de estado HTTP 200 (OK) o 400 (Bad Request).
     """
     data = request.get_json(force=True)
-    if not data:
-        return {"error": "No se recibió JSON"}, 400
+    try:
+        fila = _validar_animal(data)
+    except ValueError as e:
+        return {"error": str(e)}, 400
+    chip = fila["chip"]
 
-    chip = data.get("chip", "")
-    nombre = data.get("nombre")
-    edad = data.get("edad")
-    raza = data.get("raza")
-    especie = data.get("especie")
-    if not nombre or not especie:
-        return {"error": "Campos 'especie' y 'nombre' son obligatorios"}, 400
+    cuidados = data.get("cuidados") or []
+    try:
+        filas_cuidados = [
+            {
+                "animal_id": chip,
+                "fecha": _validar_fecha(c["fecha"]),
+                "tipo": c["tipo"],
+                "estado": c.get("estado", "pendiente"),
+                "notas": c.get("notas", ""),
+            }
+            for c in cuidados
+        ]
+    except (KeyError, TypeError, ValueError) as e:
+        return {"error": f"Cuidado inválido: {e}"}, 400
+
+    with db.transaction() as tx:
+        animal_id = tx.insert_animal(fila)
+        cuidado_ids = tx.insert_many_cuidados(filas_cuidados) if filas_cuidados else []
+
+    respuesta: Dict[str, Any] = {"mensaje": "Animal creado", "id": animal_id}
+    if cuidado_ids:
+        respuesta["cuidados"] = cuidado_ids
+    return respuesta, 200
+
+
+@app.route("/animales/import", methods=["POST"])
+def importar_animales():
+    """
+    Alta masiva de animales desde un cuerpo NDJSON de cualquier tamaño.
 
-    if especie.lower() not in ["perro", "gato", "ave", "pez"]:
-        return {"error": f"Tipo de animal '{especie}' no reconocido"}, 400
+    Cada línea es un animal con los campos de POST /animales (sin
+    `cuidados`).  Se lee en *streaming* y se inserta por lotes; las líneas
+    inválidas o en conflicto se informan sin detener la importación.
 
-    animal_id = db.insert_animal(
-        {
-            "especie": especie,
-            "nombre": nombre,
-            "edad": edad,
-            "chip": chip,
-            "raza": raza,
-        }
-    )
-    return {"mensaje": "Animal creado", "id": animal_id}, 200
+    Returns
+    -------
+    json : dict
+        `{"insertados": n, "total_errores": m, "errores": [{"linea", "error"}]}`
+        (como mucho IMPORTACION_MAX_ERRORES detallados).
+    int
+        Código de estado HTTP 200 (OK).
+    """
+    return _importar(_validar_animal, db.insert_many_animales, db.insert_animal), 200
+
+
+@app.route("/animales/bulk", methods=["PUT"])
+def sincronizar_animales():
+    """
+    Inserta o actualiza varios animales identificados por su chip.
+
+    Cuerpo JSON: lista de animales, cada uno con `chip` y los campos a fijar
+    (especie, nombre, edad, raza…).  Todo se aplica en una transacción.
+
+    Returns
+    -------
+    json : dict
+        Recuentos {"insertados", "actualizados", "sin_cambios"}, o mensaje de error.
+    int
+        Código de estado HTTP 200 (OK) o 400 (Bad Request).
+    """
+    filas = request.get_json(force=True)
+    if not isinstance(filas, list):
+        return {"error": "Se esperaba una lista JSON de animales"}, 400
+
+    for i, fila in enumerate(filas):
+        if not isinstance(fila, dict) or not fila.get("chip"):
+            return {"error": f"Fila {i}: el campo 'chip' es obligatorio"}, 400
+        especie = fila.get("especie")
+        if especie is not None and str(especie).lower() not in ESPECIES:
+            return {"error": f"Fila {i}: tipo de animal '{especie}' no reconocido"}, 400
+
+    return db.upsert_animales(filas), 200
 
 
 @app.route("/animales/<int:animal_id>", methods=["PUT"])
@@ -122,9 +579,10 @@ def actualizar_animal(animal_id: int):
     int
         Código de estado HTTP 200 (OK) o 400 (Bad Request).
     """
-    cambios = request.get_json(force=True) or {}
-    if not cambios:
-        return {"error": "JSON vacío"}, 400
+    try:
+        cambios = _cambios("animales")
+    except ValueError as e:
+        return {"error": str(e)}, 400
 
     db.update_animal(animal_id, cambios)
     return {"mensaje": "Animal actualizado"}, 200
@@ -154,18 +612,19 @@ def borrar_animal(animal_id: int):
 # PERSONA DUEÑO
 
 @app.route("/dueno", methods=["GET"])
+@_condicional("duenos")
 def listar_dueno():
     """
-    Devuelve un listado JSON con todos los dueños.
+    Devuelve una página JSON de dueños (`limit`/`after`).
 
     Returns
     -------
-    json : list
-        Listado de dueños en formato JSON.
+    json : dict
+        `{"items": [...], "next": cursor | null}`.
     int
-        Código de estado HTTP 200 (OK).
+        Código de estado HTTP 200 (OK) o 400 si la paginación no es válida.
     """
-    return jsonify(db.listar_duenos()), 200
+    return _pagina(db.obtener_duenos, "duenos")
 
 
 @app.route("/dueno", methods=["POST"])
@@ -194,7 +653,7 @@ def crear_dueno():
     if not nombre or not nif:
         return {"error": "Campos 'nif' y 'nombre' son obligatorios"}, 400
 
-    dueno_id = db.insert_dueno(
+    dueno_id = db.insertar_dueno(
         {
             "nombre": nombre,
             "nif": nif,
@@ -224,11 +683,12 @@ def actualizar_dueno(dueno_id: int):
     int
         Código de estado HTTP 200 (OK) o 400 (Bad Request).
     """
-    cambios = request.get_json(force=True) or {}
-    if not cambios:
-        return {"error": "JSON vacío"}, 400
+    try:
+        cambios = _cambios("duenos")
+    except ValueError as e:
+        return {"error": str(e)}, 400
 
-    db.update_dueno(dueno_id, cambios)
+    db.actualizar_dueno(dueno_id, cambios)
     return {"mensaje": " Dueño actualizado"}, 200
 
 
@@ -249,24 +709,25 @@ def borrar_dueno(dueno_id: int):
     int
         Código de estado HTTP 200 (OK).
     """
-    db.delete_dueno(dueno_id)
+    db.eliminar_dueno(dueno_id)
     return {"mensaje": "Dueño eliminado"}, 200
 
 
 @app.route("/veterinario", methods=["GET"])
+@_condicional("veterinarios")
 # PERSONA VETERINARIO
 def listar_veterinario():
     """
-    Devuelve un listado JSON con todos los veterinarios.
+    Devuelve una página JSON de veterinarios (`limit`/`after`).
 
     Returns
     -------
-    json : list
-        Listado de veterinarios en formato JSON.
+    json : dict
+        `{"items": [...], "next": cursor | null}`.
     int
-        Código de estado HTTP 200 (OK).
+        Código de estado HTTP 200 (OK) o 400 si la paginación no es válida.
     """
-    return jsonify(db.listar_veterinarios()), 200
+    return _pagina(db.obtener_veterinarios, "veterinarios")
 
 
 @app.route("/veterinario", methods=["POST"])
@@ -296,7 +757,7 @@ def crear_veterinario():
     if not nombre or not colegiado_id:
         return {"error": "Campos 'colegiado_id' y 'nombre' son obligatorios"}, 400
 
-    veterinario_id = db.insert_veterinario(
+    veterinario_id = db.insertar_veterinario(
         {
             "nombre": nombre,
             "nif": nif,
@@ -327,11 +788,12 @@ def actualizar_veterinario(veterinario_id: int):
     int
         Código de estado HTTP 200 (OK) o 400 (Bad Request).
     """
-    cambios = request.get_json(force=True) or {}
-    if not cambios:
-        return {"error": "JSON vacío"}, 400
+    try:
+        cambios = _cambios("veterinarios")
+    except ValueError as e:
+        return {"error": str(e)}, 400
 
-    db.update_veterinario(veterinario_id, cambios)
+    db.actualizar_veterinario(veterinario_id, cambios)
     return {"mensaje": " Veterinario actualizado"}, 200
 
 
@@ -352,85 +814,40 @@ def borrar_veterinario(veterinario_id: int):
     int
         Código de estado HTTP 200 (OK).
     """
-    db.delete_veterinario(veterinario_id)
+    db.eliminar_veterinario(veterinario_id)
     return {"mensaje": "Veterinario eliminado"}, 200
 
 
-@app.route("/alimento", methods=["GET"])
-def listar_alimentos():
-    """Devuelve un listado JSON con todos los alimentos."""
-    return jsonify(db.listar_alimentos()), 200
-
-
-@app.route("/alimento", methods=["POST"])
-def crear_alimento():
-    """Crea un nuevo alimento."""
-    data = request.get_json(force=True)
-    if not data:
-        return {"error": "No se recibió JSON"}, 400
-
-    tipo_animal = data.get("tipo_animal")
-    alimento = data.get("alimento")
-    cantidad = data.get("cantidad")
-    fecha_caducidad = data.get("fecha_caducidad")
-    coste = data.get("coste")
-
-    if not tipo_animal or not alimento or cantidad is None:
-        return {"error": "Campos 'tipo_animal', 'alimento' y 'cantidad' son obligatorios"}, 400
-
-    alimento_id = db.insert_alimento(
-        {
-            "tipo_animal": tipo_animal,
-            "alimento": alimento,
-            "cantidad": cantidad,
-            "fecha_caducidad": fecha_caducidad,
-            "coste": coste,
-        }
-    )
-    return {"mensaje": "Alimento creado", "id": alimento_id}, 200
-
-
-@app.route("/alimento/<int:alimento_id>", methods=["PUT"])
-def actualizar_alimento(alimento_id: int):
-    """Actualiza la información de un alimento."""
-    cambios = request.get_json(force=True) or {}
-    if not cambios:
-        return {"error": "JSON vacío"}, 400
-    db.update_alimento(alimento_id, cambios)
-    return {"mensaje": "Alimento actualizado"}, 200
-
-
-@app.route("/alimento/<int:alimento_id>", methods=["DELETE"])
-def borrar_alimento(alimento_id: int):
-    """Elimina un alimento."""
-    db.delete_alimento(alimento_id)
-    return {"mensaje": "Alimento eliminado"}, 200
-
-
 # ------------------- CRUD CUIDADOS -------------------
 @app.route("/cuidados", methods=["GET"])
+@_condicional("cuidados")
 def listar_cuidados():
-    return jsonify(db.get_cuidados()), 200
+    """Página de cuidados (`limit`/`after`) o todos en streaming (ver `_listado`)."""
+    return _listado(db.get_cuidados, db.iter_cuidados, "cuidados")
 
 
 @app.route("/animales/<int:animal_id>/cuidados", methods=["GET"])
+@_condicional("cuidados")
 def listar_cuidados_animal(animal_id: int):
-    return jsonify(db.get_cuidados(animal_id)), 200
+    """Cuidados de un animal, paginados o en streaming (ver `_listado`)."""
+    return _listado(db.get_cuidados, db.iter_cuidados, "cuidados", animal_id)
 
 
 @app.route("/cuidados", methods=["POST"])
 def crear_cuidado():
     data: Dict[str, Any] = request.get_json(force=True) or {}
     try:
-        animal_id = int(data["animal_id"])
-        fecha = _validar_fecha(data["fecha"])
-        tipo_cuidado = data["tipo"]
+        fila = _validar_cuidado(data)
     except (KeyError, ValueError) as e:
         return {"error": f"Campos requeridos faltantes o inválidos: {e}"}, 400
-
-    tipo_animal = next(
-        (a["tipo"] for a in db.get_animales() if a["chip"] == animal_id), None
-    )
+    animal_id = fila["animal_id"]
+    fecha = fila["fecha"]
+    tipo_cuidado = fila["tipo"]
+
+    animal = db.get_animal_by_chip(animal_id)
+    if animal is None:
+        return {"error": f"No existe ningún animal con chip {animal_id}"}, 404
+    tipo_animal = animal["especie"].lower()
     clase = {
         "perro": CuidadoPerro,
         "gato": CuidadoGato,
@@ -443,27 +860,31 @@ def crear_cuidado():
             fecha=fecha,
             tipo_cuidado=tipo_cuidado,
             animal_id=animal_id,
-            estado=data.get("estado", "pendiente"),
-            notas=data.get("notas", ""),
+            estado=fila["estado"],
+            notas=fila["notas"],
         )
     except Exception as e:
         return {"error": str(e)}, 400
 
-    cuidado_id = db.insert_cuidado({
-        "animal_id": animal_id,
-        "fecha": fecha,
-        "tipo": tipo_cuidado,
-        "estado": data.get("estado", "pendiente"),
-        "notas": data.get("notas", ""),
-    })
+    cuidado_id = db.insert_cuidado(fila)
     return {"mensaje": "Cuidado creado", "id": cuidado_id}, 201
 
 
+@app.route("/cuidados/import", methods=["POST"])
+def importar_cuidados():
+    """
+    Alta masiva de cuidados desde un cuerpo NDJSON (ver `importar_animales`);
+    cada línea con los campos de POST /cuidados.
+    """
+    return _importar(_validar_cuidado, db.insert_many_cuidados, db.insert_cuidado), 200
+
+
 @app.route("/cuidados/<int:cuidado_id>", methods=["PUT"])
 def actualizar_cuidado(cuidado_id: int):
-    cambios = request.get_json(force=True) or {}
-    if not cambios:
-        return {"error": "JSON vacío"}, 400
+    try:
+        cambios = _cambios("cuidados")
+    except ValueError as e:
+        return {"error": str(e)}, 400
 
     if "fecha" in cambios:
         try:
@@ -475,6 +896,42 @@ def actualizar_cuidado(cuidado_id: int):
     return {"mensaje": "Cuidado actualizado"}, 200
 
 
+@app.route("/cuidados", methods=["PATCH"])
+def cambiar_estado_cuidados():
+    """
+    Cambia el estado de muchos cuidados con un único UPDATE.
+
+    Ejemplo de cuerpo JSON (todos los pendientes del animal 3 hasta el
+    30 de junio pasan a realizados):
+    {"estado": "realizado",
+     "filtro": {"animal_id": 3, "estado": "pendiente", "hasta": "2024-06-30"}}
+
+    `ids` (lista de IDs) y `filtro` (`animal_id`, `estado` actual, `desde`,
+    `hasta`, fechas incluidas) se combinan; hace falta al menos uno.
+
+    Returns
+    -------
+    json : dict
+        {"actualizados": n} o mensaje de error.
+    int
+        Código de estado HTTP 200 (OK) o 400 (Bad Request).
+    """
+    data = request.get_json(force=True)
+    if not isinstance(data, dict):
+        return {"error": "Se esperaba un objeto JSON"}, 400
+    nuevo_estado = data.get("estado")
+    validos = CuidadoProgramado.ESTADOS_VALIDOS
+    if not isinstance(nuevo_estado, str) or nuevo_estado not in validos:
+        return {"error": f"'estado' debe ser uno de {sorted(validos)}"}, 400
+    try:
+        criterios = _validar_filtro_cuidados(data.get("ids"), data.get("filtro"))
+    except ValueError as e:
+        return {"error": str(e)}, 400
+
+    actualizados = db.cambiar_estado_cuidados(nuevo_estado, **criterios)
+    return {"actualizados": actualizados}, 200
+
+
 @app.route("/cuidados/<int:cuidado_id>", methods=["DELETE"])
 def borrar_cuidado(cuidado_id: int):
     db.delete_cuidado(cuidado_id)
@@ -483,9 +940,10 @@ def borrar_cuidado(cuidado_id: int):
 
 # ------------------- CRUD ALIMENTO -------------------
 @app.route("/alimento", methods=["GET"])
+@_condicional("alimentos")
 def listar_alimentos():
-    """Devuelve un listado JSON con todos los alimentos."""
-    return jsonify(db.listar_alimentos()), 200
+    """Devuelve una página JSON de alimentos (`limit`/`after`)."""
+    return _pagina(db.obtener_alimentos, "alimentos")
 
 
 @app.route("/alimento", methods=["POST"])
@@ -504,7 +962,7 @@ def crear_alimento():
     if not tipo_animal or not alimento or cantidad is None:
         return {"error": "Campos 'tipo_animal', 'alimento' y 'cantidad' son obligatorios"}, 400
 
-    alimento_id = db.insert_alimento({
+    alimento_id = db.insertar_alimento({
         "tipo_animal": tipo_animal,
         "alimento": alimento,
         "cantidad": cantidad,
@@ -517,25 +975,27 @@ def crear_alimento():
 @app.route("/alimento/<int:alimento_id>", methods=["PUT"])
 def actualizar_alimento(alimento_id: int):
     """Actualiza la información de un alimento."""
-    cambios = request.get_json(force=True) or {}
-    if not cambios:
-        return {"error": "JSON vacío"}, 400
-    db.update_alimento(alimento_id, cambios)
+    try:
+        cambios = _cambios("alimentos")
+    except ValueError as e:
+        return {"error": str(e)}, 400
+    db.actualizar_alimento(alimento_id, cambios)
     return {"mensaje": "Alimento actualizado"}, 200
 
 
 @app.route("/alimento/<int:alimento_id>", methods=["DELETE"])
 def borrar_alimento(alimento_id: int):
     """Elimina un alimento."""
-    db.delete_alimento(alimento_id)
+    db.eliminar_alimento(alimento_id)
     return {"mensaje": "Alimento eliminado"}, 200
 
 
 # ------------------- CRUD VACUNAS -------------------
 @app.route("/vacuna", methods=["GET"])
+@_condicional("vacunas")
 def listar_vacunas():
-    """Devuelve un listado JSON con todas las vacunas."""
-    return jsonify(db.listar_vacunas()), 200
+    """Devuelve una página JSON de vacunas (`limit`/`after`)."""
+    return _pagina(db.listar_vacunas, "vacunas")
 
 
 @app.route("/vacuna", methods=["POST"])
@@ -561,9 +1021,10 @@ def crear_vacuna():
 @app.route("/vacuna/<int:vacuna_id>", methods=["PUT"])
 def actualizar_vacuna(vacuna_id: int):
     """Actualiza la información de una vacuna."""
-    cambios = request.get_json(force=True) or {}
-    if not cambios:
-        return {"error": "JSON vacío"}, 400
+    try:
+        cambios = _cambios("vacunas")
+    except ValueError as e:
+        return {"error": str(e)}, 400
     db.update_vacuna(vacuna_id, cambios)
     return {"mensaje": "Vacuna actualizada"}, 200
 
@@ -577,9 +1038,10 @@ def borrar_vacuna(vacuna_id: int):
 
 # ------------------- CRUD TRATAMIENTO -------------------
 @app.route("/tratamiento", methods=["GET"])
+@_condicional("tratamientos")
 def listar_tratamientos():
-    """Devuelve un listado JSON con todos los tratamientos."""
-    return jsonify(db.listar_tratamientos()), 200
+    """Devuelve una página JSON de tratamientos (`limit`/`after`)."""
+    return _pagina(db.listar_tratamientos, "tratamientos")
 
 
 @app.route("/tratamiento", methods=["POST"])
@@ -609,9 +1071,10 @@ def crear_tratamiento():
 @app.route("/tratamiento/<int:tratamiento_id>", methods=["PUT"])
 def actualizar_tratamiento(tratamiento_id: int):
     """Actualiza la información de un tratamiento."""
-    cambios = request.get_json(force=True) or {}
-    if not cambios:
-        return {"error": "JSON vacío"}, 400
+    try:
+        cambios = _cambios("tratamientos")
+    except ValueError as e:
+        return {"error": str(e)}, 400
     db.update_tratamiento(tratamiento_id, cambios)
     return {"mensaje": "Tratamiento actualizado"}, 200
 
@@ -625,9 +1088,10 @@ def borrar_tratamiento(tratamiento_id: int):
 
 # ------------------- CRUD CONSULTA -------------------
 @app.route("/consulta", methods=["GET"])
+@_condicional("consultas")
 def listar_consultas():
-    """Devuelve un listado JSON con todas las consultas."""
-    return jsonify(db.listar_consultas()), 200
+    """Devuelve una página JSON de consultas (`limit`/`after`)."""
+    return _pagina(db.listar_consultas, "consultas")
 
 
 @app.route("/consulta", methods=["POST"])
@@ -657,9 +1121,10 @@ def crear_consulta():
 @app.route("/consulta/<int:consulta_id>", methods=["PUT"])
 def actualizar_consulta(consulta_id: int):
     """Actualiza la información de una consulta."""
-    cambios = request.get_json(force=True) or {}
-    if not cambios:
-        return {"error": "JSON vacío"}, 400
+    try:
+        cambios = _cambios("consultas")
+    except ValueError as e:
+        return {"error": str(e)}, 400
     db.update_consulta(consulta_id, cambios)
     return {"mensaje": "Consulta actualizada"}, 200
 
@@ -671,6 +1136,212 @@ def borrar_consulta(consulta_id: int):
     return {"mensaje": "Consulta eliminada"}, 200
 
 
+# ------------------- LOTES -------------------
+_REFERENCIA = re.compile(r"\$\{(\w+)(?:\.(\w+))?\}")
+
+
+class _LoteFallido(Exception):
+    """Una operación del lote falló: se deshace todo el lote."""
+
+    def __init__(self, indice: int, status: int, cuerpo: Any) -> None:
+        super().__init__(indice)
+        self.indice = indice
+        self.status = status
+        self.cuerpo = cuerpo
+
+
+def _resolver(valor: Any, creados: Dict[str, Any]) -> Any:
+    """
+    Sustituye `${ref}` (el "id" devuelto por la operación `ref`) y
+    `${ref.campo}` en cadenas, listas y dicts.  Una cadena que es solo una
+    referencia toma el valor con su tipo (p. ej. un entero).
+
+    Raises
+    ------
+    KeyError
+        Si la referencia o el campo no existen.
+    """
+    if isinstance(valor, dict):
+        return {k: _resolver(v, creados) for k, v in valor.items()}
+    if isinstance(valor, list):
+        return [_resolver(v, creados) for v in valor]
+    if not isinstance(valor, str) or "${" not in valor:
+        return valor
+
+    def buscar(m: "re.Match[str]") -> Any:
+        ref, campo = m.group(1), m.group(2) or "id"
+        if ref not in creados:
+            raise KeyError(f"referencia desconocida '${{{ref}}}'")
+        cuerpo = creados[ref]
+        if not isinstance(cuerpo, dict) or campo not in cuerpo:
+            raise KeyError(f"'{ref}' no devolvió el campo '{campo}'")
+        return cuerpo[campo]
+
+    completa = _REFERENCIA.fullmatch(valor)
+    if completa:
+        return buscar(completa)
+    return _REFERENCIA.sub(lambda m: str(buscar(m)), valor)
+
+
+def _ejecutar_operacion(op: Any, creados: Dict[str, Any]) -> Tuple[int, Any]:
+    """
+    Despacha una operación del lote a la vista de su ruta; devuelve (status,
+    cuerpo).  Los errores de la vista se convierten en el resultado de la
+    operación (409 de integridad, 400 de datos no válidos, 500 el resto)
+    para que el lote se deshaga y responda con el índice de la que falló.
+    """
+    if not isinstance(op, dict):
+        return 400, {"error": "Cada operación debe ser un objeto JSON"}
+    metodo = str(op.get("method", "GET")).upper()
+    try:
+        ruta = _resolver(op.get("path"), creados)
+        cuerpo = _resolver(op.get("body"), creados)
+    except KeyError as e:
+        return 400, {"error": str(e.args[0])}
+    if not isinstance(ruta, str) or not ruta.startswith("/"):
+        return 400, {"error": "'path' debe ser una ruta que empiece por '/'"}
+
+    ruta, _, query = ruta.partition("?")
+    try:
+        endpoint, argumentos = app.url_map.bind("localhost").match(ruta, method=metodo)
+    except HTTPException as e:
+        return e.code or 400, {"error": e.description}
+    if endpoint == "ejecutar_lote":
+        return 400, {"error": "Un lote no puede contener otro lote"}
+
+    with app.test_request_context(ruta, method=metodo, query_string=query, json=cuerpo):
+        try:
+            respuesta = make_response(app.view_functions[endpoint](**argumentos))
+        except ERRORES_INTEGRIDAD as e:
+            respuesta = make_response(_conflicto(e))
+        except (ValueError, TypeError) as e:
+            respuesta = make_response(({"error": str(e)}, 400))
+        except Exception:
+            app.logger.exception("Error en la operación %s %s del lote", metodo, ruta)
+            respuesta = make_response(({"error": "Error interno del servidor"}, 500))
+    return respuesta.status_code, respuesta.get_json(silent=True)
+
+
+@app.route("/batch", methods=["POST"])
+def ejecutar_lote():
+    """
+    Ejecuta una lista ordenada de operaciones de esta API en una única
+    transacción, con la validación de cada ruta.
+
+    Ejemplo de cuerpo JSON:
+    [
+      {"ref": "fido", "method": "POST", "path": "/animales",
+       "body": {"especie": "perro", "nombre": "Fido", "chip": "1234"}},
+      {"method": "POST", "path": "/vacuna",
+       "body": {"nombre": "Rabia", "fecha": "2024-06-05"}},
+      {"method": "PUT", "path": "/animales/${fido}", "body": {"edad": 5}}
+    ]
+
+    `${ref}` se sustituye por el "id" que devolvió la operación con ese
+    `ref` y `${ref.campo}` por otro campo de su respuesta.
+
+    Returns
+    -------
+    json : dict
+        `{"resultados": [{"status", "body"}, ...]}` en el orden recibido.  Si
+        una operación falla no se aplica ninguna: se responde con su código,
+        `error`, `indice` y los resultados hasta ella.
+    int
+        200 (OK), 400 si el lote no es válido o el código de la operación fallida.
+    """
+    operaciones = request.get_json(force=True)
+    if not isinstance(operaciones, list) or not operaciones:
+        return {"error": "Se esperaba una lista JSON de operaciones"}, 400
+    if len(operaciones) > LOTE_MAXIMO:
+        return {"error": f"Como máximo {LOTE_MAXIMO} operaciones por lote"}, 400
+
+    resultados: List[Dict[str, Any]] = []
+    creados: Dict[str, Any] = {}
+    try:
+        with db.transaction():
+            for i, op in enumerate(operaciones):
+                status, cuerpo = _ejecutar_operacion(op, creados)
+                resultados.append({"status": status, "body": cuerpo})
+                if status >= 400:
+                    raise _LoteFallido(i, status, cuerpo)
+                if isinstance(op, dict) and op.get("ref"):
+                    creados[str(op["ref"])] = cuerpo
+    except _LoteFallido as e:
+        return {
+            "error": f"La operación {e.indice} falló; no se ha aplicado ningún cambio",
+            "indice": e.indice,
+            "resultados": resultados,
+        }, e.status
+    return {"resultados": resultados}, 200
+
+
+# ------------------- SINCRONIZACIÓN -------------------
+@app.route("/changes", methods=["GET"])
+@_condicional(*COLUMNAS)
+def listar_cambios():
+    """
+    Cambios posteriores a `since` para mantener una réplica local al día.
+
+    Query string: `since` (último `next` recibido; 0 o ausente para la
+    carga inicial) y `limit` (entradas del registro por llamada, por
+    defecto 100).  Se repite la llamada con el `next` devuelto mientras
+    `more` sea true.  Si el registro se ha podado (`db.podar_cambios`) por
+    encima del `since` de un cliente, este debe volver a la carga inicial.
+
+    Returns
+    -------
+    json : dict
+        `{"items": [{"seq", "tabla", "clave", "op", "fila"}], "next": seq,
+        "more": bool}`; `op` es "upsert" (con la fila actual) o "delete"
+        (`fila` null).
+    int
+        Código de estado HTTP 200 (OK) o 400 si los parámetros no son válidos.
+    """
+    try:
+        since = int(request.args.get("since") or 0)
+        limit = int(request.args.get("limit", PAGINA_POR_DEFECTO))
+    except ValueError:
+        return {"error": "'since' y 'limit' deben ser enteros"}, 400
+    if since < 0 or not 1 <= limit <= PAGINA_MAXIMA:
+        return {"error": f"'since' >= 0 y 'limit' entre 1 y {PAGINA_MAXIMA}"}, 400
+    return jsonify(db.cambios_desde(since, limit)), 200
+
+
+# ------------------- ESTADÍSTICAS -------------------
+@app.route("/stats", methods=["GET"])
+@_condicional("cuidados", "animales", "tratamientos")
+def estadisticas():
+    """
+    Agregados para los cuadros de mando, calculados en la BD con GROUP BY.
+
+    Query string opcional: `desde` y `hasta` (YYYY-MM-DD, inclusivos)
+    acotan la fecha de los cuidados y el inicio de los tratamientos.
+
+    Returns
+    -------
+    json : dict
+        `{"cuidados_por_estado_y_dia": [{"fecha", "estado", "total"}],
+        "animales_por_especie": [{"especie", "total"}],
+        "coste_tratamientos_por_mes": [{"mes", "tratamientos", "coste"}]}`.
+    int
+        Código de estado HTTP 200 (OK) o 400 si alguna fecha no es válida.
+    """
+    try:
+        desde, hasta = (
+            _validar_fecha(request.args[p]) if request.args.get(p) else None
+            for p in ("desde", "hasta")
+        )
+    except ValueError as e:
+        return {"error": str(e)}, 400
+
+    return jsonify({
+        "cuidados_por_estado_y_dia": db.cuidados_por_estado_y_dia(desde, hasta),
+        "animales_por_especie": db.animales_por_especie(),
+        "coste_tratamientos_por_mes": db.coste_tratamientos_por_mes(desde, hasta),
+    }), 200
+
+
 # ------------------- RUN -------------------
-if __name__ == "_main_":
+if __name__ == "__main__":
+    db.warm_up()      # conecta y migra antes de aceptar peticiones
     app.run(debug=True, port=5000)
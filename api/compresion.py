@@ -0,0 +1,185 @@
+"""
+compresion.py
+
+Compresión gzip/deflate de las respuestas de la API según `Accept-Encoding`.
+
+- Solo se comprimen tipos de texto (JSON, NDJSON, text/*) y cuerpos de al
+  menos `minimo` bytes: por debajo la cabecera gzip y el coste de CPU no
+  compensan.
+- Las respuestas en streaming (listados NDJSON) se comprimen trozo a trozo
+  con `Z_SYNC_FLUSH`, de modo que cada trozo sigue llegando al cliente en
+  cuanto se genera.
+- Las respuestas con `ETag` (listados estables como /alimento o /vacuna)
+  guardan los bytes comprimidos en una LRU indexada por el hash del cuerpo:
+  un mismo contenido no se vuelve a comprimir, y como la clave es el propio
+  contenido nunca se sirve una versión antigua.
+- Un cuerpo comprimido no es el mismo que el original, así que su `ETag`
+  lleva la codificación como sufijo (`"…-gzip"`, `"…-deflate"`), igual que
+  la representación NDJSON lleva `-ndjson`.  `etiquetas()` da los ETags
+  posibles para la petición actual, para que el GET condicional reconozca
+  ambos.
+
+Variables de entorno: `API_COMPRESION_MIN_BYTES` (1024),
+`API_COMPRESION_NIVEL` (1-9, 6) y `API_COMPRESION_CACHE` (entradas, 128;
+0 la desactiva).
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+from flask import Flask, Response, request
+
+_COMPRIMIBLES = ("application/json", "application/x-ndjson")
+
+
+class CompresorRespuestas:
+    """
+    Hook `after_request` que comprime las respuestas.
+
+    Parameters
+    ----------
+    minimo : int
+        Tamaño mínimo en bytes de un cuerpo para comprimirlo.
+    nivel : int
+        Nivel de compresión de zlib (1 rápido … 9 máximo).
+    max_entradas : int
+        Cuerpos comprimidos que se guardan (LRU); 0 desactiva la caché.
+    """
+
+    def __init__(self, minimo: int = 1024, nivel: int = 6, max_entradas: int = 128) -> None:
+        if not 1 <= nivel <= 9:
+            raise ValueError("nivel debe estar entre 1 y 9.")
+        self.minimo = minimo
+        self.nivel = nivel
+        self.max_entradas = max_entradas
+        self._cache: "OrderedDict[Tuple[str, bytes], bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def instalar(self, app: Flask) -> "CompresorRespuestas":
+        app.after_request(self.comprimir)
+        return self
+
+    def stats(self) -> Dict[str, Any]:
+        """Aciertos, fallos y tamaño de la caché de cuerpos comprimidos."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entradas": len(self._cache),
+                "bytes": sum(len(v) for v in self._cache.values()),
+            }
+
+    def etiquetas(self, etag: str) -> Tuple[str, ...]:
+        """
+        ETags con los que se ha podido servir `etag` a esta petición: el del
+        cuerpo comprimido con la codificación negociada y el del cuerpo sin
+        comprimir (por debajo de `minimo` no se comprime).
+        """
+        codificacion = self._negociar()
+        if codificacion is None:
+            return (etag,)
+        return (_etag_codificado(etag, codificacion), etag)
+
+    # ──────────────────────────────── Hook ──────────────────────────────────
+    def comprimir(self, respuesta: Response) -> Response:
+        if not self._comprimible(respuesta):
+            return respuesta
+        respuesta.vary.add("Accept-Encoding")
+        codificacion = self._negociar()
+        if codificacion is None:
+            return respuesta
+
+        if respuesta.is_streamed:
+            original = respuesta.response
+            respuesta.response = self._flujo(respuesta.iter_encoded(), original, codificacion)
+            respuesta.headers.pop("Content-Length", None)
+        else:
+            datos = respuesta.get_data()
+            if len(datos) < self.minimo:
+                return respuesta
+            respuesta.set_data(self._comprimir_cuerpo(datos, codificacion, "ETag" in respuesta.headers))
+        respuesta.headers["Content-Encoding"] = codificacion
+        etag, debil = respuesta.get_etag()
+        if etag is not None:
+            respuesta.set_etag(_etag_codificado(etag, codificacion), weak=debil)
+        return respuesta
+
+    # ──────────────────────────────── Auxiliares ──────────────────────────────────
+    @staticmethod
+    def _comprimible(respuesta: Response) -> bool:
+        if respuesta.status_code < 200 or respuesta.status_code in (204, 206, 304):
+            return False
+        if respuesta.direct_passthrough or "Content-Encoding" in respuesta.headers:
+            return False
+        tipo = respuesta.mimetype or ""
+        return tipo in _COMPRIMIBLES or tipo.startswith("text/")
+
+    @staticmethod
+    def _negociar() -> Optional[str]:
+        """gzip si el cliente lo acepta (preferido), si no deflate, si no None."""
+        aceptadas = request.accept_encodings
+        mejor = max(("gzip", "deflate"), key=lambda c: aceptadas[c])
+        return mejor if aceptadas[mejor] > 0 else None
+
+    def _codificar(self, datos: bytes, codificacion: str) -> bytes:
+        if codificacion == "gzip":
+            return gzip.compress(datos, compresslevel=self.nivel, mtime=0)
+        return zlib.compress(datos, self.nivel)
+
+    def _comprimir_cuerpo(self, datos: bytes, codificacion: str, cacheable: bool) -> bytes:
+        if not cacheable or self.max_entradas < 1:
+            return self._codificar(datos, codificacion)
+        clave = (codificacion, hashlib.blake2b(datos, digest_size=16).digest())
+        with self._lock:
+            comprimido = self._cache.get(clave)
+            if comprimido is not None:
+                self._cache.move_to_end(clave)
+                self.hits += 1
+                return comprimido
+            self.misses += 1
+        comprimido = self._codificar(datos, codificacion)
+        with self._lock:
+            self._cache[clave] = comprimido
+            self._cache.move_to_end(clave)
+            while len(self._cache) > self.max_entradas:
+                self._cache.popitem(last=False)
+        return comprimido
+
+    def _flujo(
+        self, trozos: Iterable[bytes], original: Iterable[Any], codificacion: str
+    ) -> Iterator[bytes]:
+        # wbits 31 → cabecera gzip; 15 → formato zlib (el "deflate" de HTTP)
+        compresor = zlib.compressobj(self.nivel, zlib.DEFLATED, 31 if codificacion == "gzip" else 15)
+        try:
+            for trozo in trozos:
+                salida = compresor.compress(trozo) + compresor.flush(zlib.Z_SYNC_FLUSH)
+                if salida:
+                    yield salida
+            yield compresor.flush()
+        finally:
+            # si el cliente corta, cierra el generador de la BD (libera el cursor)
+            cerrar = getattr(original, "close", None)
+            if cerrar is not None:
+                cerrar()
+
+
+def _etag_codificado(etag: str, codificacion: str) -> str:
+    return f"{etag}-{codificacion}"
+
+
+def instalar_compresion(app: Flask) -> CompresorRespuestas:
+    """Instala en `app` un `CompresorRespuestas` configurado por entorno."""
+    return CompresorRespuestas(
+        minimo=int(os.getenv("API_COMPRESION_MIN_BYTES", 1024)),
+        nivel=int(os.getenv("API_COMPRESION_NIVEL", 6)),
+        max_entradas=int(os.getenv("API_COMPRESION_CACHE", 128)),
+    ).instalar(app)
@@ -4,7 +4,7 @@ examples.py
 Script de consola (CLI) para interactuar con la API RESTful definida en api.py.
 
 Ofrece un menú con opciones:
-    1. Ver animales registrados (GET /animales)
+    1. Ver animales registrados (réplica local sincronizada con GET /changes)
     2. Crear un nuevo animal (POST /animales)
     3. Salir
 
@@ -17,23 +17,57 @@ import sys
 
 URL_BASE = os.getenv("API_URL", "http://127.0.0.1:5000")
 
+# Réplica local de los animales: tras la primera carga solo se piden los
+# cambios posteriores al último `seq` recibido (GET /changes).
+_replica = {"seq": 0, "animales": {}}
+
+
+def sincronizar_animales() -> bool:
+    """
+    Pide a /changes lo ocurrido desde el último `seq` y lo aplica a la
+    réplica local (altas/modificaciones y bajas de animales).
+
+    Returns
+    -------
+    bool
+        True si la réplica quedó al día; False si la API respondió con error.
+    """
+    while True:
+        r = requests.get(
+            f"{URL_BASE}/changes", params={"since": _replica["seq"], "limit": 1000}
+        )
+        if r.status_code != 200:
+            print(f"Error al sincronizar. Código: {r.status_code}, Respuesta: {r.text}")
+            return False
+        pagina = r.json()
+        for cambio in pagina["items"]:
+            if cambio["tabla"] != "animales":
+                continue
+            if cambio["op"] == "delete":
+                _replica["animales"].pop(cambio["clave"], None)
+            else:
+                _replica["animales"][cambio["clave"]] = cambio["fila"]
+        _replica["seq"] = pagina["next"]
+        if not pagina["more"]:
+            return True
+
+
 def ver_animales():
     """
-    Realiza una petición GET a /animales para obtener la lista de animales.
-    Muestra los resultados por pantalla.
+    Actualiza la réplica local con GET /changes (solo lo que ha cambiado
+    desde la última vez) y muestra los animales por pantalla.
     """
     try:
-        r = requests.get(f"{URL_BASE}/animales")
-        if r.status_code == 200:
-            lista = r.json()
-            if lista:
-                print("\nLista de animales registrados:")
-                for i, animal in enumerate(lista, 1):
-                    print(f"{i}. {animal['tipo']} | Nombre: {animal['nombre']} | Edad: {animal['edad']} | Chip: {animal['chip']}")
-            else:
-                print("\nNo hay animales registrados aún.")
+        if not sincronizar_animales():
+            return
+        lista = [_replica["animales"][k] for k in sorted(_replica["animales"])]
+
+        if lista:
+            print("\nLista de animales registrados:")
+            for i, animal in enumerate(lista, 1):
+                print(f"{i}. {animal['especie']} | Nombre: {animal['nombre']} | Edad: {animal['edad']} | Chip: {animal['chip']}")
         else:
-            print(f"Error al obtener animales. Código: {r.status_code}, Respuesta: {r.text}")
+            print("\nNo hay animales registrados aún.")
     except requests.RequestException as e:
         print(f"Ocurrió un error de conexión: {e}")
 
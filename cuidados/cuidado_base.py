@@ -19,18 +19,26 @@ estado : str
     Uno de {"pendiente", "realizado", "cancelado"}.
 notas : str
     Información adicional libre.
+
+Los objetos cargados con `from_row` recuerdan sus valores originales:
+`save()` guarda solo los campos modificados (ver database/modelo.py).
 """
 
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
 from datetime import datetime, date
-from typing import Any, Dict, ClassVar, Final
+from typing import Any, Dict, ClassVar, Final, Iterable, List, Tuple
+
+from database.modelo import SeguimientoCambios
 
 
-class CuidadoProgramado(ABC):
+class CuidadoProgramado(SeguimientoCambios, ABC):
     """Modelo base para un cuidado programado."""
 
+    _CLAVE: ClassVar[str] = "id"
+    _ACTUALIZAR: ClassVar[str] = "update_cuidado"
+
     # valores permitidos para `estado`
     ESTADOS_VALIDOS: ClassVar[set[str]] = {"pendiente", "realizado", "cancelado"}
 
@@ -95,6 +103,9 @@ class CuidadoProgramado(ABC):
             data["id"] = self.id
         return data
 
+    def _columnas(self) -> Dict[str, Any]:
+        return self.to_dict()
+
     # ───────────────────────── Métodos de clase / fábrica ───────────────────────
     @classmethod
     def from_row(cls, row: Dict[str, Any]) -> "CuidadoProgramado":
@@ -103,8 +114,9 @@ class CuidadoProgramado(ABC):
         (`cursor(dictionary=True)`).
 
         *Para clases hijas*, sobreescribir cuando haya lógica adicional.
+        El objeto queda marcado como guardado (sin cambios pendientes).
         """
-        return cls(
+        obj = cls(
             id=row.get("id"),
             animal_id=row["animal_id"],
             fecha=row["fecha"] if isinstance(row["fecha"], str) else row["fecha"].strftime("%Y-%m-%d"),
@@ -112,6 +124,70 @@ class CuidadoProgramado(ABC):
             estado=row["estado"],
             notas=row.get("notas", ""),
         )
+        obj.marcar_guardado()
+        return obj
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict[str, Any]]) -> List["CuidadoProgramado"]:
+        """
+        Crea en bloque las instancias de varias filas de la tabla `cuidados`.
+
+        Equivale a `[cls.from_row(r) for r in rows]` sin pasar por
+        `__init__`: una fecha `date` (MySQL) se usa tal cual y una cadena
+        (SQLite) se convierte con `date.fromisoformat`, sin la ida y vuelta
+        strftime/strptime.  La instantánea de cambios se pasa a
+        `marcar_guardado()` con los valores de la fila, sin recalcular
+        `to_dict()`.  Si una subclase redefine `from_row` se respeta.
+
+        Raises
+        ------
+        ValueError
+            Si alguna fila tiene un estado o una fecha no válidos.
+        """
+        if cls.from_row.__func__ is not CuidadoProgramado.from_row.__func__:
+            return [cls.from_row(r) for r in rows]
+
+        validos = cls.ESTADOS_VALIDOS
+        nuevo = object.__new__
+        # las fechas se repiten mucho (agendas por día): cada valor se
+        # convierte una vez a (date, texto 'YYYY-MM-DD' de to_dict)
+        fechas: Dict[Any, Tuple[date, str]] = {}
+        objs: List[CuidadoProgramado] = []
+        for row in rows:
+            valor = row["fecha"]
+            convertida = fechas.get(valor)
+            if convertida is None:
+                if isinstance(valor, str):
+                    dia = date.fromisoformat(valor)
+                else:
+                    dia = valor.date() if isinstance(valor, datetime) else valor
+                convertida = fechas[valor] = (dia, dia.strftime("%Y-%m-%d"))
+            fecha, texto = convertida
+            estado = row["estado"]
+            if estado not in validos:
+                raise ValueError(
+                    f"Estado '{estado}' no válido; usa {validos}.")
+
+            animal_id = row["animal_id"]
+            tipo = row["tipo"]
+            notas = row.get("notas", "")
+
+            obj = nuevo(cls)
+            obj.id = row.get("id")
+            obj.animal_id = animal_id
+            obj.fecha = fecha
+            obj.tipo_cuidado = tipo
+            obj.estado = estado
+            obj.notas = notas
+            obj.marcar_guardado({
+                "animal_id": animal_id,
+                "fecha": texto,
+                "tipo": tipo,
+                "estado": estado,
+                "notas": notas,
+            })
+            objs.append(obj)
+        return objs
 
     # ─────────────────────────── Representación ────────────────────────────────
     def __str__(self) -> str:          # para `print(cuidado)`
@@ -23,12 +23,19 @@ for c in gc.listar_cuidados(animal_id=3, as_objects=True):
 
 # Marcar como realizado
 gc.cambiar_estado_cuidado(nuevo_id, "realizado")
+
+# Varias operaciones como una sola transacción (un único commit; si algo
+# falla no se aplica ninguna)
+with db.transaction():
+    gc.cambiar_estado_cuidado(nuevo_id, "realizado")
+    gc.crear_cuidado(animal_id=3, fecha="2025-06-05",
+                     tipo_cuidado="Vacuna tetravalente")
 """
 
 from __future__ import annotations
 
 from datetime import date, datetime
-from typing import Any, Dict, Iterable, List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 from database import db
 from .cuidado_base import CuidadoProgramado
@@ -41,22 +48,6 @@ from .cuidado_pez import CuidadoPez
 #  Helpers de conversión fila <-> objeto
 # ---------------------------------------------------------------------------#
 
-# Cache sencilla de animales → tipo, para instanciar la subclase correcta
-# Se carga bajo demanda en _get_tipo_animal().
-_ANIMALES_CACHE: Dict[int, str] = {}
-
-
-def _get_tipo_animal(animal_id: int) -> Optional[str]:
-    """Devuelve 'perro', 'gato', … para un animal o None si no se encuentra."""
-    if animal_id in _ANIMALES_CACHE:
-        return _ANIMALES_CACHE[animal_id]
-
-    for a in db.get_animales():
-        _ANIMALES_CACHE[a["chip"]] = a["tipo"].lower()
-
-    return _ANIMALES_CACHE.get(animal_id)
-
-
 _CLASE_POR_TIPO: Dict[str, type[CuidadoProgramado]] = {
     "perro": CuidadoPerro,
     "gato": CuidadoGato,
@@ -65,14 +56,37 @@ _CLASE_POR_TIPO: Dict[str, type[CuidadoProgramado]] = {
 }
 
 
-def _row_to_obj(row: Dict[str, Any]) -> CuidadoProgramado:
+def _filas_a_objetos(filas: List[Dict[str, Any]]) -> List[CuidadoProgramado]:
     """
-    Convierte una fila dict de la tabla `cuidados` a la subclase adecuada.
-    Si el tipo de animal no se reconoce, usa `CuidadoProgramado`.
+    Convierte filas de `cuidados` que ya traen `especie` (ver
+    `db.get_cuidados_con_especie`) a la subclase de cada animal: agrupa las
+    filas por subclase, crea cada grupo con `from_rows` y devuelve los
+    objetos en el orden original.
     """
-    tipo_animal = _get_tipo_animal(row["animal_id"])
-    cls = _CLASE_POR_TIPO.get(tipo_animal, CuidadoProgramado)
-    return cls.from_row(row)
+    clases: Dict[Optional[str], type[CuidadoProgramado]] = {}
+    grupos: Dict[type[CuidadoProgramado], Tuple[List[int], List[Dict[str, Any]]]] = {}
+    for i, fila in enumerate(filas):
+        especie = fila["especie"]
+        cls = clases.get(especie)
+        if cls is None:
+            cls = _CLASE_POR_TIPO.get(especie.lower()) if especie else None
+            if cls is None:
+                raise ValueError(
+                    f"Cuidado {fila['id']}: no hay clase de cuidado para el animal "
+                    f"{fila['animal_id']} (especie {especie!r})."
+                )
+            clases[especie] = cls
+        grupo = grupos.get(cls)
+        if grupo is None:
+            grupo = grupos[cls] = ([], [])
+        grupo[0].append(i)
+        grupo[1].append(fila)
+
+    objetos: List[Any] = [None] * len(filas)
+    for cls, (posiciones, filas_cls) in grupos.items():
+        for i, obj in zip(posiciones, cls.from_rows(filas_cls)):
+            objetos[i] = obj
+    return objetos
 
 
 # ---------------------------------------------------------------------------#
@@ -126,14 +140,20 @@ def listar_cuidados(
         Si se indica, solo los del animal.  Si None, lista global.
     as_objects : bool
         - `False` (por defecto): devuelve dicts tal cual vienen de la BD.
-        - `True` : devuelve instancias de las subclases de cuidado.
+        - `True` : devuelve instancias de las subclases de cuidado (en
+          orden de id).
+
+    Raises
+    ------
+    ValueError
+        Con `as_objects=True`, si el animal de un cuidado no existe o su
+        especie no tiene subclase de cuidado.
     """
-    filas = db.get_cuidados(animal_id)
-
     if not as_objects:
-        return filas
+        return db.get_cuidados(animal_id)
 
-    return [_row_to_obj(f) for f in filas]
+    # una sola consulta con la especie de cada animal y creación por grupos
+    return _filas_a_objetos(db.get_cuidados_con_especie(animal_id))
 
 
 def actualizar_cuidado(cuidado_id: int, cambios: Dict[str, Any]) -> None:
@@ -151,6 +171,58 @@ def cambiar_estado_cuidado(cuidado_id: int, nuevo_estado: str) -> None:
     db.update_cuidado(cuidado_id, {"estado": nuevo_estado})
 
 
+def cambiar_estado_cuidados(
+    ids: Optional[Iterable[int]],
+    nuevo_estado: str,
+    *,
+    animal_id: Optional[int] = None,
+    estado: Optional[str] = None,
+    desde: str | date | None = None,
+    hasta: str | date | None = None,
+) -> int:
+    """
+    Cambia de estado muchos cuidados con un único UPDATE (p. ej. el cierre
+    del día) en lugar de uno por cuidado.
+
+    Parameters
+    ----------
+    ids : Iterable[int] | None
+        IDs de los cuidados; None para seleccionarlos solo por los filtros.
+    nuevo_estado : str
+        Uno de `CuidadoProgramado.ESTADOS_VALIDOS`.
+    animal_id, estado, desde, hasta : optional
+        Filtros que se combinan con `ids`: animal, estado actual y fechas
+        (ambos extremos incluidos).  Ejemplo, todos los pendientes del
+        animal 3 hasta el 2024-06-30:
+        `cambiar_estado_cuidados(None, "realizado", animal_id=3,
+        estado="pendiente", hasta="2024-06-30")`
+
+    Returns
+    -------
+    int
+        Cuidados que han cambiado de estado.
+
+    Raises
+    ------
+    ValueError
+        Si algún estado no es válido o no se indica ni `ids` ni ningún filtro.
+    """
+    for valor in (nuevo_estado, estado):
+        if valor is not None and valor not in CuidadoProgramado.ESTADOS_VALIDOS:
+            raise ValueError(
+                f"Estado '{valor}' no válido; usa {CuidadoProgramado.ESTADOS_VALIDOS}."
+            )
+    if ids is None and animal_id is None and estado is None and desde is None and hasta is None:
+        raise ValueError("Indica los ids o algún filtro (animal_id, estado, desde, hasta).")
+    if isinstance(desde, date):
+        desde = desde.strftime("%Y-%m-%d")
+    if isinstance(hasta, date):
+        hasta = hasta.strftime("%Y-%m-%d")
+    return db.cambiar_estado_cuidados(
+        nuevo_estado, ids=ids, animal_id=animal_id, estado=estado, desde=desde, hasta=hasta
+    )
+
+
 def borrar_cuidado(cuidado_id: int) -> None:
     """Elimina el cuidado indicado."""
     db.delete_cuidado(cuidado_id)
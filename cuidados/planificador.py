@@ -0,0 +1,228 @@
+"""
+planificador.py
+
+`PlanificadorCuidados`: agenda en memoria de los cuidados pendientes,
+ordenada por fecha, para responder «qué toca ahora» o «qué está vencido»
+sin cargar y filtrar todos los cuidados en cada consulta.
+
+- La carga inicial lee por lotes solo los cuidados pendientes, ya en orden
+  de fecha (`db.iter_cuidados_por_estado`, por el índice (estado, fecha));
+  la especie de los animales de cada lote se resuelve con una consulta
+  (`get_animales_by_chips`) para crear la subclase de cuidado adecuada.
+- Después se mantiene al día con el registro de cambios (`cambios_desde`):
+  altas, modificaciones y bajas, también las hechas por la API, por otro
+  proceso o en cascada al borrar un animal.  Si el gestor lleva versiones
+  por tabla (el de `database.db`), el registro solo se lee antes de una
+  consulta cuando la versión de `cuidados` ha cambiado (las de otros
+  procesos se ven a los `DB_VERSIONES_REFRESCO` segundos); `sincronizar()`
+  lo lee siempre.
+- Los pendientes se guardan en una lista ordenada por (fecha, id), como el
+  índice ordenado de memory_manager.py: cada consulta es una búsqueda
+  binaria más las filas devueltas, y un alta o una baja, una búsqueda
+  binaria y un desplazamiento de la lista.
+
+Uso básico
+----------
+from cuidados.planificador import PlanificadorCuidados
+
+agenda = PlanificadorCuidados()
+agenda.proximos(5)                          # los 5 pendientes más cercanos
+agenda.vencidos()                           # pendientes anteriores a hoy
+agenda.entre("2024-06-01", "2024-06-30")    # pendientes de junio
+
+Los objetos devueltos son los de la agenda: no deben modificarse sin
+guardarlos (`save()`), y tras hacerlo la agenda los actualiza desde la BD.
+"""
+
+from __future__ import annotations
+
+import threading
+from bisect import bisect_left, insort
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from database import db
+from .cuidado_base import CuidadoProgramado
+from . import gestor_cuidados as gc
+
+PENDIENTE = "pendiente"
+
+
+def _fecha(valor: str | date) -> date:
+    return valor if isinstance(valor, date) else date.fromisoformat(valor)
+
+
+class PlanificadorCuidados:
+    """
+    Agenda de cuidados pendientes ordenada por fecha, segura entre hilos.
+
+    Parameters
+    ----------
+    gestor : DBManager, optional
+        Gestor a usar; por defecto `database.db`.
+    lote : int
+        Filas por lote en la carga inicial y entradas del registro de
+        cambios por lectura.
+    """
+
+    def __init__(self, gestor: Any = None, lote: int = 1000) -> None:
+        if lote < 1:
+            raise ValueError("lote debe ser al menos 1.")
+        self._db = db if gestor is None else gestor
+        self.lote = lote
+        self._lock = threading.RLock()
+        self._orden: List[Tuple[date, int]] = []
+        self._cuidados: Dict[int, CuidadoProgramado] = {}
+        # id → su entrada en `_orden` (el objeto devuelto puede modificarse)
+        self._claves: Dict[int, Tuple[date, int]] = {}
+        # último seq aplicado del registro de cambios; None = sin cargar
+        self._seq: Optional[int] = None
+        self._version: Any = None
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._al_dia()
+            return len(self._cuidados)
+
+    # ──────────────────────────────── Consultas ──────────────────────────────────
+    def proximos(self, n: int = 10, desde: str | date | None = None) -> List[CuidadoProgramado]:
+        """
+        Los `n` cuidados pendientes más próximos, en orden de fecha.
+
+        Parameters
+        ----------
+        n : int
+            Máximo de cuidados devueltos.
+        desde : str | datetime.date, optional
+            Solo los de esa fecha o posteriores; por defecto también los
+            vencidos.
+        """
+        if n < 1:
+            raise ValueError("n debe ser al menos 1.")
+        with self._lock:
+            self._al_dia()
+            i = 0 if desde is None else bisect_left(self._orden, (_fecha(desde),))
+            return [self._cuidados[c] for _, c in self._orden[i:i + n]]
+
+    def vencidos(self, hoy: str | date | None = None) -> List[CuidadoProgramado]:
+        """Cuidados pendientes con fecha anterior a `hoy` (por defecto, hoy)."""
+        limite = date.today() if hoy is None else _fecha(hoy)
+        with self._lock:
+            self._al_dia()
+            j = bisect_left(self._orden, (limite,))
+            return [self._cuidados[c] for _, c in self._orden[:j]]
+
+    def entre(self, desde: str | date, hasta: str | date) -> List[CuidadoProgramado]:
+        """Cuidados pendientes con `desde <= fecha <= hasta`, en orden de fecha."""
+        inicio = _fecha(desde)
+        fin = _fecha(hasta) + timedelta(days=1)
+        with self._lock:
+            self._al_dia()
+            i = bisect_left(self._orden, (inicio,))
+            j = bisect_left(self._orden, (fin,), i)
+            return [self._cuidados[c] for _, c in self._orden[i:j]]
+
+    # ──────────────────────────────── Sincronización ──────────────────────────────────
+    def cargar(self) -> None:
+        """(Re)construye la agenda con los cuidados pendientes de la BD."""
+        with self._lock:
+            # se anotan antes de leer: lo escrito durante la carga se
+            # vuelve a aplicar después (las entradas son idempotentes)
+            seq = self._db.ultimo_cambio()
+            version = self._version_bd()
+            self._orden, self._cuidados, self._claves = [], {}, {}
+            pendientes: List[Dict[str, Any]] = []
+            for fila in self._db.iter_cuidados_por_estado(PENDIENTE, batch_size=self.lote):
+                pendientes.append(fila)
+                if len(pendientes) >= self.lote:
+                    self._anadir(pendientes, ordenar=False)
+                    pendientes = []
+            self._anadir(pendientes, ordenar=False)
+            # ya llegan en orden de (fecha, id): sort() solo lo recorre
+            self._orden.sort()
+            self._seq, self._version = seq, version
+
+    def sincronizar(self) -> int:
+        """
+        Aplica los cambios registrados desde la última lectura (carga la
+        agenda si aún no se ha hecho).
+
+        Returns
+        -------
+        int
+            Cuidados añadidos, actualizados o quitados de la agenda.
+        """
+        with self._lock:
+            if self._seq is None:
+                self.cargar()
+                return len(self._cuidados)
+
+            version = self._version_bd()
+            cambiados: Set[int] = set()
+            mas = True
+            while mas:
+                pagina = self._db.cambios_desde(self._seq, self.lote)
+                altas: List[Dict[str, Any]] = []
+                for item in pagina["items"]:
+                    if item["tabla"] != "cuidados":
+                        continue
+                    fila = item["fila"]
+                    if self._quitar(int(item["clave"])):
+                        cambiados.add(int(item["clave"]))
+                    if fila is not None and fila["estado"] == PENDIENTE:
+                        altas.append(fila)
+                cambiados.update(self._anadir(altas))
+                self._seq, mas = pagina["next"], pagina["more"]
+            self._version = version
+            return len(cambiados)
+
+    def _al_dia(self) -> None:
+        """Carga o sincroniza si hace falta antes de una consulta."""
+        if self._seq is None or self._version is None or self._version != self._version_bd():
+            self.sincronizar()
+
+    def _version_bd(self) -> Any:
+        """Versión de `cuidados` en el gestor, o None si no las lleva."""
+        version = getattr(self._db, "version", None)
+        return None if version is None else version("cuidados")
+
+    # ──────────────────────────────── Auxiliares ──────────────────────────────────
+    def _anadir(self, filas: List[Dict[str, Any]], ordenar: bool = True) -> List[int]:
+        """
+        Crea los cuidados de `filas` (con la subclase de la especie de cada
+        animal), los añade a la agenda y devuelve sus IDs.  Los de animales
+        inexistentes o de especie sin subclase de cuidado no se pueden
+        representar y se omiten.
+        """
+        if not filas:
+            return []
+        especies = {
+            chip: animal["especie"]
+            for chip, animal in self._db.get_animales_by_chips(
+                {str(f["animal_id"]) for f in filas}
+            ).items()
+        }
+        con_especie = []
+        for fila in filas:
+            especie = especies.get(str(fila["animal_id"]))
+            if especie and especie.lower() in gc._CLASE_POR_TIPO:
+                con_especie.append({**fila, "especie": especie})
+        ids: List[int] = []
+        for cuidado in gc._filas_a_objetos(con_especie):
+            clave = (cuidado.fecha, cuidado.id)
+            self._cuidados[cuidado.id] = cuidado
+            self._claves[cuidado.id] = clave
+            if ordenar:
+                insort(self._orden, clave)
+            else:
+                self._orden.append(clave)
+            ids.append(cuidado.id)
+        return ids
+
+    def _quitar(self, cuidado_id: int) -> bool:
+        clave = self._claves.pop(cuidado_id, None)
+        if clave is None:
+            return False
+        del self._cuidados[cuidado_id]
+        del self._orden[bisect_left(self._orden, clave)]
+        return True
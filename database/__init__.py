@@ -1,5 +1,4 @@
-import os
-from .db_base import get_db_manager
+from .db_base import LazyDBManager, get_db_manager
 
-# Instancia global que usa la factoría de db_base
-db = get_db_manager()
+# Instancia global: el gestor real se crea en el primer uso (o con db.warm_up())
+db = LazyDBManager(get_db_manager)
@@ -0,0 +1,624 @@
+"""
+cache.py
+
+`CachingDBManager`: decorador de cualquier `DBManager` que guarda en memoria
+el resultado de los métodos de lectura (get_animales, get_cuidados,
+listar_vacunas, …) y los invalida cuando se escribe en la tabla afectada.
+
+La caché es una LRU acotada (`max_entries`) con caducidad (`ttl`).  Cada
+entrada se etiqueta con su tabla y su ámbito:
+
+    - None              → listado global de la tabla (cualquier escritura lo invalida)
+    - ("animal", chip)  → cuidados de un animal concreto
+    - ("id", clave)     → una fila concreta (obtener_dueno, obtener_alimento…)
+
+Así una escritura solo descarta lo que realmente puede haber cambiado: por
+ejemplo, insertar un cuidado del animal "A" no invalida los cuidados de "B".
+
+La caché es por proceso: con varios procesos escribiendo en la misma base,
+cada uno puede servir datos con hasta `ttl` segundos de antigüedad.  Las
+filas devueltas se comparten con la caché y no deben modificarse.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import (
+    Any, Callable, Dict, Hashable, Iterable, Iterator, List, Optional, Set, Tuple,
+)
+
+from .db_base import DBManager
+
+# ámbito de una entrada: None (listado global) o (tipo, valor)
+Ambito = Optional[Tuple[str, Any]]
+
+
+class CacheLRU:
+    """
+    LRU acotada con caducidad, segura entre hilos.
+
+    Cada entrada guarda (expira, valor, tabla, ámbito).
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 30.0) -> None:
+        if max_entries < 1:
+            raise ValueError("max_entries debe ser al menos 1.")
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._datos: "OrderedDict[Hashable, Tuple[float, Any, str, Ambito]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expirados = 0
+        self.desalojados = 0
+        self.invalidados = 0
+        # se incrementa en cada invalidación de la tabla; evita guardar un
+        # resultado leído antes de una escritura concurrente
+        self._generaciones: Dict[str, int] = {}
+
+    def generacion(self, tabla: str) -> int:
+        with self._lock:
+            return self._generaciones.get(tabla, 0)
+
+    def get(self, clave: Hashable) -> Tuple[bool, Any]:
+        """Devuelve (encontrado, valor); cuenta el acierto o el fallo."""
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is not None:
+                if entrada[0] > time.monotonic():
+                    self._datos.move_to_end(clave)
+                    self.hits += 1
+                    return True, entrada[1]
+                del self._datos[clave]
+                self.expirados += 1
+            self.misses += 1
+            return False, None
+
+    def put(
+        self, clave: Hashable, valor: Any, tabla: str, ambito: Ambito, generacion: int
+    ) -> None:
+        """Guarda `valor` salvo que `tabla` se haya invalidado desde `generacion`."""
+        with self._lock:
+            if self._generaciones.get(tabla, 0) != generacion:
+                return
+            self._datos[clave] = (time.monotonic() + self.ttl, valor, tabla, ambito)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_entries:
+                self._datos.popitem(last=False)
+                self.desalojados += 1
+
+    def invalidar(self, tabla: str, debe_caer: Callable[[Ambito, Any], bool]) -> int:
+        """Elimina las entradas de `tabla` para las que `debe_caer(ámbito, valor)`."""
+        with self._lock:
+            self._generaciones[tabla] = self._generaciones.get(tabla, 0) + 1
+            caen = [
+                k for k, (_, valor, t, ambito) in self._datos.items()
+                if t == tabla and debe_caer(ambito, valor)
+            ]
+            for k in caen:
+                del self._datos[k]
+            self.invalidados += len(caen)
+            return len(caen)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._datos.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            consultas = self.hits + self.misses
+            return {
+                "entradas": len(self._datos),
+                "max_entries": self.max_entries,
+                "ttl_s": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / consultas if consultas else 0.0,
+                "expirados": self.expirados,
+                "desalojados": self.desalojados,
+                "invalidados": self.invalidados,
+            }
+
+
+class CachingDBManager(DBManager):
+    """
+    Envuelve un `DBManager` y cachea sus lecturas.
+
+    Parameters
+    ----------
+    inner : DBManager
+        Gestor real (MySQL, SQLite, …) al que se delegan todas las llamadas.
+    max_entries : int
+        Máximo de resultados guardados (LRU).
+    ttl : float
+        Segundos que un resultado se considera válido.
+
+    Los métodos que no forman parte de la interfaz (p. ej. `pool_stats`) se
+    delegan tal cual en `inner`.
+    """
+
+    def __init__(self, inner: DBManager, max_entries: int = 1024, ttl: float = 30.0) -> None:
+        self.inner = inner
+        self.cache = CacheLRU(max_entries, ttl)
+        # tablas escritas por la transaction() abierta en cada hilo
+        self._tx_local = threading.local()
+
+    def __getattr__(self, nombre: str) -> Any:
+        return getattr(self.inner, nombre)
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """Aciertos, fallos, invalidaciones, etc. de la caché."""
+        return self.cache.stats()
+
+    @contextmanager
+    def transaction(self) -> Iterator["CachingDBManager"]:
+        """
+        Transacción del gestor interno.  Dentro del bloque las lecturas de
+        este hilo no usan la caché (verían datos aún sin confirmar) y, al
+        salir, se invalidan de nuevo las tablas escritas: otro hilo pudo
+        cachear su estado anterior entre la escritura y el commit.
+        """
+        tocadas: Optional[Set[str]] = getattr(self._tx_local, "tablas", None)
+        if tocadas is not None:        # anidada: la exterior invalida al final
+            with self.inner.transaction():
+                yield self
+            return
+        self._tx_local.tablas = tocadas = set()
+        try:
+            with self.inner.transaction():
+                yield self
+        finally:
+            self._tx_local.tablas = None
+            for tabla in tocadas:
+                self._invalidar_tabla(tabla)
+
+    # ──────────────────────────────── Auxiliares ──────────────────────────────────
+    def _en_transaccion(self) -> bool:
+        return getattr(self._tx_local, "tablas", None) is not None
+
+    def _anotar(self, tabla: str) -> None:
+        """Registra `tabla` como escrita en la transacción en curso del hilo."""
+        tocadas = getattr(self._tx_local, "tablas", None)
+        if tocadas is not None:
+            tocadas.add(tabla)
+
+    def _leer(
+        self,
+        clave: Tuple[Any, ...],
+        tabla: str,
+        ambito: Ambito,
+        cargar: Callable[[], Any],
+    ) -> Any:
+        if self._en_transaccion():
+            return cargar()
+        encontrado, valor = self.cache.get(clave)
+        if not encontrado:
+            generacion = self.cache.generacion(tabla)
+            valor = cargar()
+            self.cache.put(clave, valor, tabla, ambito, generacion)
+        return list(valor) if isinstance(valor, list) else valor
+
+    def _invalidar(self, tabla: str, *ambitos: Ambito) -> None:
+        """Invalida los listados globales de `tabla` y las entradas de `ambitos`."""
+        self._anotar(tabla)
+        caen = set(ambitos)
+        self.cache.invalidar(tabla, lambda ambito, _: ambito is None or ambito in caen)
+
+    def _invalidar_tabla(self, tabla: str) -> None:
+        self._anotar(tabla)
+        self.cache.invalidar(tabla, lambda ambito, _: True)
+
+    def _invalidar_cuidado(self, cuidado_id: int, animal_id: Any = None) -> None:
+        """
+        Invalida los listados globales de cuidados, los del animal al que
+        pertenece `cuidado_id` (según lo que haya en caché) y los de
+        `animal_id` si el cuidado pasa a otro animal.
+        """
+        self._anotar("cuidados")
+        destino = None if animal_id is None else ("animal", str(animal_id))
+
+        def debe_caer(ambito: Ambito, valor: Any) -> bool:
+            if ambito is None or ambito == destino:
+                return True
+            return any(f.get("id") == cuidado_id for f in valor)
+
+        self.cache.invalidar("cuidados", debe_caer)
+
+    # ──────────────────────────────── Animales ──────────────────────────────────
+    def insert_animal(self, datos: Dict[str, Any]) -> int:
+        nuevo = self.inner.insert_animal(datos)
+        self._invalidar("animales")
+        return nuevo
+
+    def insert_many_animales(
+        self, filas: Iterable[Dict[str, Any]], chunk_size: int = 500
+    ) -> List[int]:
+        try:
+            return self.inner.insert_many_animales(filas, chunk_size)
+        finally:
+            self._invalidar("animales")
+
+    def upsert_animales(
+        self, filas: Iterable[Dict[str, Any]], chunk_size: int = 500
+    ) -> Dict[str, int]:
+        try:
+            return self.inner.upsert_animales(filas, chunk_size)
+        finally:
+            self._invalidar_tabla("animales")
+
+    def get_animales(
+        self,
+        *,
+        limit: Optional[int] = None,
+        after: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        return self._leer(
+            ("get_animales", limit, after), "animales", None,
+            lambda: self.inner.get_animales(limit=limit, after=after),
+        )
+
+    def get_animal_by_chip(self, chip: Any) -> Optional[Dict[str, Any]]:
+        # ámbito global: cualquier escritura en animales (también un alta con
+        # ese chip, que haría obsoleto un None cacheado) la invalida
+        return self._leer(
+            ("get_animal_by_chip", str(chip)), "animales", None,
+            lambda: self.inner.get_animal_by_chip(chip),
+        )
+
+    def get_animales_by_chips(self, chips: Iterable[Any]) -> Dict[str, Dict[str, Any]]:
+        claves = tuple(dict.fromkeys(str(c) for c in chips))
+        return dict(self._leer(
+            ("get_animales_by_chips", claves), "animales", None,
+            lambda: self.inner.get_animales_by_chips(claves),
+        ))
+
+    def iter_animales(self, batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        # los recorridos completos no se cachean
+        return self.inner.iter_animales(batch_size)
+
+    def update_animal(self, animal_id: int, datos: Dict[str, Any]) -> None:
+        self.inner.update_animal(animal_id, datos)
+        self._invalidar("animales")
+
+    def delete_animal(self, animal_id: int) -> None:
+        self.inner.delete_animal(animal_id)
+        self._invalidar("animales")
+        self._invalidar_tabla("cuidados")      # ON DELETE CASCADE
+
+    # ──────────────────────────────── Dueños ──────────────────────────────────
+    def insertar_dueno(self, datos: Dict[str, Any]) -> int:
+        nuevo = self.inner.insertar_dueno(datos)
+        self._invalidar("duenos", ("id", nuevo))
+        return nuevo
+
+    def insert_many_duenos(
+        self, filas: Iterable[Dict[str, Any]], chunk_size: int = 500
+    ) -> List[int]:
+        try:
+            return self.inner.insert_many_duenos(filas, chunk_size)
+        finally:
+            self._invalidar_tabla("duenos")
+
+    def obtener_duenos(
+        self,
+        *,
+        limit: Optional[int] = None,
+        after: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        return self._leer(
+            ("obtener_duenos", limit, after), "duenos", None,
+            lambda: self.inner.obtener_duenos(limit=limit, after=after),
+        )
+
+    def obtener_dueno(self, dueno_id: int) -> Optional[Dict[str, Any]]:
+        return self._leer(
+            ("obtener_dueno", dueno_id), "duenos", ("id", dueno_id),
+            lambda: self.inner.obtener_dueno(dueno_id),
+        )
+
+    def actualizar_dueno(self, dueno_id: int, datos: Dict[str, Any]) -> None:
+        self.inner.actualizar_dueno(dueno_id, datos)
+        self._invalidar("duenos", ("id", dueno_id))
+
+    def eliminar_dueno(self, dueno_id: int) -> None:
+        self.inner.eliminar_dueno(dueno_id)
+        self._invalidar("duenos", ("id", dueno_id))
+
+    # ──────────────────────────────── Veterinarios ──────────────────────────────────
+    def insertar_veterinario(self, datos: Dict[str, Any]) -> int:
+        nuevo = self.inner.insertar_veterinario(datos)
+        self._invalidar("veterinarios", ("id", nuevo))
+        return nuevo
+
+    def insert_many_veterinarios(
+        self, filas: Iterable[Dict[str, Any]], chunk_size: int = 500
+    ) -> List[int]:
+        try:
+            return self.inner.insert_many_veterinarios(filas, chunk_size)
+        finally:
+            self._invalidar_tabla("veterinarios")
+
+    def obtener_veterinarios(
+        self,
+        *,
+        limit: Optional[int] = None,
+        after: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        return self._leer(
+            ("obtener_veterinarios", limit, after), "veterinarios", None,
+            lambda: self.inner.obtener_veterinarios(limit=limit, after=after),
+        )
+
+    def obtener_veterinario(self, colegiado_id: int) -> Optional[Dict[str, Any]]:
+        return self._leer(
+            ("obtener_veterinario", colegiado_id), "veterinarios", ("id", colegiado_id),
+            lambda: self.inner.obtener_veterinario(colegiado_id),
+        )
+
+    def actualizar_veterinario(self, colegiado_id: int, datos: Dict[str, Any]) -> None:
+        self.inner.actualizar_veterinario(colegiado_id, datos)
+        self._invalidar("veterinarios", ("id", colegiado_id))
+
+    def eliminar_veterinario(self, colegiado_id: int) -> None:
+        self.inner.eliminar_veterinario(colegiado_id)
+        self._invalidar("veterinarios", ("id", colegiado_id))
+
+    # ──────────────────────────────── Cuidados ──────────────────────────────────
+    def insert_cuidado(self, datos: Dict[str, Any]) -> int:
+        nuevo = self.inner.insert_cuidado(datos)
+        self._invalidar("cuidados", ("animal", str(datos.get("animal_id"))))
+        return nuevo
+
+    def insert_many_cuidados(
+        self, filas: Iterable[Dict[str, Any]], chunk_size: int = 500
+    ) -> List[int]:
+        animales = set()
+
+        def anotar(filas_: Iterable[Dict[str, Any]]) -> Iterable[Dict[str, Any]]:
+            for f in filas_:
+                animales.add(("animal", str(f.get("animal_id"))))
+                yield f
+
+        try:
+            return self.inner.insert_many_cuidados(anotar(filas), chunk_size)
+        finally:
+            self._invalidar("cuidados", *animales)
+
+    def get_cuidados(
+        self,
+        animal_id: Optional[int] = None,
+        *,
+        limit: Optional[int] = None,
+        after: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        chip = None if animal_id is None else str(animal_id)
+        return self._leer(
+            ("get_cuidados", chip, limit, after),
+            "cuidados",
+            None if chip is None else ("animal", chip),
+            lambda: self.inner.get_cuidados(animal_id, limit=limit, after=after),
+        )
+
+    def iter_cuidados(
+        self, animal_id: Optional[int] = None, batch_size: int = 1000
+    ) -> Iterator[Dict[str, Any]]:
+        return self.inner.iter_cuidados(animal_id, batch_size)
+
+    def iter_cuidados_por_estado(
+        self, estado: str, batch_size: int = 1000
+    ) -> Iterator[Dict[str, Any]]:
+        return self.inner.iter_cuidados_por_estado(estado, batch_size)
+
+    def get_cuidados_con_especie(
+        self, animal_id: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        # depende de cuidados y de animales: no se cachea
+        return self.inner.get_cuidados_con_especie(animal_id)
+
+    def update_cuidado(self, cuidado_id: int, datos: Dict[str, Any]) -> None:
+        self.inner.update_cuidado(cuidado_id, datos)
+        self._invalidar_cuidado(cuidado_id, datos.get("animal_id"))
+
+    def delete_cuidado(self, cuidado_id: int) -> None:
+        self.inner.delete_cuidado(cuidado_id)
+        self._invalidar_cuidado(cuidado_id)
+
+    def cambiar_estado_cuidados(
+        self,
+        nuevo_estado: str,
+        *,
+        ids: Optional[Iterable[int]] = None,
+        animal_id: Optional[Any] = None,
+        estado: Optional[str] = None,
+        desde: Optional[str] = None,
+        hasta: Optional[str] = None,
+    ) -> int:
+        try:
+            return self.inner.cambiar_estado_cuidados(
+                nuevo_estado, ids=ids, animal_id=animal_id,
+                estado=estado, desde=desde, hasta=hasta,
+            )
+        finally:
+            # los filtros se combinan: con animal solo cambian cuidados suyos
+            if animal_id is not None:
+                self._invalidar("cuidados", ("animal", str(animal_id)))
+            else:
+                self._invalidar_tabla("cuidados")
+
+    # ──────────────────────────────── Alimentos ──────────────────────────────────
+    def insertar_alimento(self, datos: Dict[str, Any]) -> int:
+        nuevo = self.inner.insertar_alimento(datos)
+        self._invalidar("alimentos", ("id", nuevo))
+        return nuevo
+
+    def insert_many_alimentos(
+        self, filas: Iterable[Dict[str, Any]], chunk_size: int = 500
+    ) -> List[int]:
+        try:
+            return self.inner.insert_many_alimentos(filas, chunk_size)
+        finally:
+            self._invalidar_tabla("alimentos")
+
+    def obtener_alimentos(
+        self,
+        *,
+        limit: Optional[int] = None,
+        after: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        return self._leer(
+            ("obtener_alimentos", limit, after), "alimentos", None,
+            lambda: self.inner.obtener_alimentos(limit=limit, after=after),
+        )
+
+    def obtener_alimento(self, alimento_id: int) -> Optional[Dict[str, Any]]:
+        return self._leer(
+            ("obtener_alimento", alimento_id), "alimentos", ("id", alimento_id),
+            lambda: self.inner.obtener_alimento(alimento_id),
+        )
+
+    def actualizar_alimento(self, alimento_id: int, datos: Dict[str, Any]) -> None:
+        self.inner.actualizar_alimento(alimento_id, datos)
+        self._invalidar("alimentos", ("id", alimento_id))
+
+    def eliminar_alimento(self, alimento_id: int) -> None:
+        self.inner.eliminar_alimento(alimento_id)
+        self._invalidar("alimentos", ("id", alimento_id))
+
+    # ──────────────────────────────── Vacunas ──────────────────────────────────
+    def insert_vacuna(self, datos: Dict[str, Any]) -> int:
+        nuevo = self.inner.insert_vacuna(datos)
+        self._invalidar("vacunas")
+        return nuevo
+
+    def insert_many_vacunas(
+        self, filas: Iterable[Dict[str, Any]], chunk_size: int = 500
+    ) -> List[int]:
+        try:
+            return self.inner.insert_many_vacunas(filas, chunk_size)
+        finally:
+            self._invalidar("vacunas")
+
+    def listar_vacunas(
+        self,
+        *,
+        limit: Optional[int] = None,
+        after: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        return self._leer(
+            ("listar_vacunas", limit, after), "vacunas", None,
+            lambda: self.inner.listar_vacunas(limit=limit, after=after),
+        )
+
+    def update_vacuna(self, vacuna_id: int, datos: Dict[str, Any]) -> None:
+        self.inner.update_vacuna(vacuna_id, datos)
+        self._invalidar("vacunas")
+
+    def delete_vacuna(self, vacuna_id: int) -> None:
+        self.inner.delete_vacuna(vacuna_id)
+        self._invalidar("vacunas")
+
+    # ──────────────────────────────── Tratamientos ──────────────────────────────────
+    def insert_tratamiento(self, datos: Dict[str, Any]) -> int:
+        nuevo = self.inner.insert_tratamiento(datos)
+        self._invalidar("tratamientos")
+        return nuevo
+
+    def insert_many_tratamientos(
+        self, filas: Iterable[Dict[str, Any]], chunk_size: int = 500
+    ) -> List[int]:
+        try:
+            return self.inner.insert_many_tratamientos(filas, chunk_size)
+        finally:
+            self._invalidar("tratamientos")
+
+    def listar_tratamientos(
+        self,
+        *,
+        limit: Optional[int] = None,
+        after: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        return self._leer(
+            ("listar_tratamientos", limit, after), "tratamientos", None,
+            lambda: self.inner.listar_tratamientos(limit=limit, after=after),
+        )
+
+    def update_tratamiento(self, tratamiento_id: int, datos: Dict[str, Any]) -> None:
+        self.inner.update_tratamiento(tratamiento_id, datos)
+        self._invalidar("tratamientos")
+
+    def delete_tratamiento(self, tratamiento_id: int) -> None:
+        self.inner.delete_tratamiento(tratamiento_id)
+        self._invalidar("tratamientos")
+
+    # ──────────────────────────────── Consultas ──────────────────────────────────
+    def insert_consulta(self, datos: Dict[str, Any]) -> int:
+        nuevo = self.inner.insert_consulta(datos)
+        self._invalidar("consultas")
+        return nuevo
+
+    def insert_many_consultas(
+        self, filas: Iterable[Dict[str, Any]], chunk_size: int = 500
+    ) -> List[int]:
+        try:
+            return self.inner.insert_many_consultas(filas, chunk_size)
+        finally:
+            self._invalidar("consultas")
+
+    def listar_consultas(
+        self,
+        *,
+        limit: Optional[int] = None,
+        after: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        return self._leer(
+            ("listar_consultas", limit, after), "consultas", None,
+            lambda: self.inner.listar_consultas(limit=limit, after=after),
+        )
+
+    def update_consulta(self, consulta_id: int, datos: Dict[str, Any]) -> None:
+        self.inner.update_consulta(consulta_id, datos)
+        self._invalidar("consultas")
+
+    def delete_consulta(self, consulta_id: int) -> None:
+        self.inner.delete_consulta(consulta_id)
+        self._invalidar("consultas")
+
+    # ──────────────────────────────── Sincronización ──────────────────────────────────
+    def podar_cambios(self, conservar: int) -> int:
+        return self.inner.podar_cambios(conservar)
+
+    def ultimo_cambio(self) -> int:
+        return self.inner.ultimo_cambio()
+
+    def ultimo_cambio_por_tabla(self, since: int, hasta: int) -> Dict[str, int]:
+        return self.inner.ultimo_cambio_por_tabla(since, hasta)
+
+    def cambios_desde(self, since: int = 0, limit: int = 1000) -> Dict[str, Any]:
+        # el registro solo crece: no se cachea para no retrasar los cambios
+        return self.inner.cambios_desde(since, limit)
+
+    # ──────────────────────────────── Estadísticas ──────────────────────────────────
+    # Se guardan como listados globales: cualquier escritura en la tabla los invalida.
+    def cuidados_por_estado_y_dia(
+        self, desde: Optional[str] = None, hasta: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        return self._leer(
+            ("cuidados_por_estado_y_dia", desde, hasta), "cuidados", None,
+            lambda: self.inner.cuidados_por_estado_y_dia(desde, hasta),
+        )
+
+    def animales_por_especie(self) -> List[Dict[str, Any]]:
+        return self._leer(
+            ("animales_por_especie",), "animales", None, self.inner.animales_por_especie
+        )
+
+    def coste_tratamientos_por_mes(
+        self, desde: Optional[str] = None, hasta: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        return self._leer(
+            ("coste_tratamientos_por_mes", desde, hasta), "tratamientos", None,
+            lambda: self.inner.coste_tratamientos_por_mes(desde, hasta),
+        )
@@ -2,15 +2,18 @@
 db_base.py
 
 Define la interfaz base (DBManager) que deben implementar los gestores de
-base de datos concretos (por ahora MySQL, pero extensible a SQLite u otros).
-También carga las variables de entorno y expone la factoría `get_db_manager()`.
+base de datos concretos (MySQL, SQLite y en memoria, extensible a otros).
+También carga las variables de entorno y expone la factoría `get_db_manager()`
+y el proxy perezoso `LazyDBManager` que usa `database.db`.
 """
 
 from __future__ import annotations
 
 import os
+import threading
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional
+from numbers import Number
+from typing import Callable, ContextManager, Iterable, Iterator, List, Dict, Any, Optional, Tuple
 from dotenv import load_dotenv
 
 # ──────────────────────── 1) Variables de entorno ────────────────────────────
@@ -23,10 +26,46 @@ DB_NAME = os.getenv("DB_NAME", "clinica")
 DB_USER = os.getenv("DB_USER", "")
 DB_PASS = os.getenv("DB_PASS", "")
 
+# Pool de conexiones (solo gestores con servidor, p. ej. MySQL)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_POOL_IDLE_TIMEOUT = float(os.getenv("DB_POOL_IDLE_TIMEOUT", 300))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+
+# Caché de lecturas en memoria (ver cache.py); desactivada por defecto
+DB_CACHE = os.getenv("DB_CACHE", "0").lower() in ("1", "true", "yes", "si", "sí")
+DB_CACHE_SIZE = int(os.getenv("DB_CACHE_SIZE", 1024))
+DB_CACHE_TTL = float(os.getenv("DB_CACHE_TTL", 30))
+
+# Segundos que se reutilizan las versiones de tabla (ETag) sin leer la BD
+DB_VERSIONES_REFRESCO = float(os.getenv("DB_VERSIONES_REFRESCO", 1))
+
+# Métricas por método/sentencia y log de consultas lentas (ver metricas.py)
+DB_METRICS = os.getenv("DB_METRICS", "0").lower() in ("1", "true", "yes", "si", "sí")
+DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", 200))
+DB_SLOW_QUERY_LOG = os.getenv("DB_SLOW_QUERY_LOG")
+
+# SQLite (DB_TYPE=sqlite); None → valores por defecto del gestor
+DB_PATH = os.getenv("DB_PATH")
+DB_SQLITE_MMAP_SIZE = os.getenv("DB_SQLITE_MMAP_SIZE")
+DB_SQLITE_CACHE_KB = os.getenv("DB_SQLITE_CACHE_KB")
+
 # ──────────────────────── 2) Interfaz genérica ───────────────────────────────
 class DBManager(ABC):
     """Interfaz CRUD que usan el resto de capas de la aplicación."""
 
+    # ── Transacciones ───────────────────────────────────────────────────────
+    @abstractmethod
+    def transaction(self) -> ContextManager["DBManager"]:
+        """
+        Unidad de trabajo: `with db.transaction() as tx: ...`
+
+        Todas las llamadas al gestor hechas en el bloque desde el mismo hilo
+        (con `tx` o con `db`) usan una única conexión y se confirman con un
+        solo commit al salir; si el bloque lanza una excepción no se aplica
+        ninguna.  Las transacciones anidadas se confirman con la exterior.
+        """
+        ...
+
     # ── Animales ────────────────────────────────────────────────────────────
     @abstractmethod
     def insert_animal(self, datos: Dict[str, Any]) -> int:
@@ -34,8 +73,100 @@ class DBManager(ABC):
         ...
 
     @abstractmethod
-    def get_animales(self) -> List[Dict[str, Any]]:
-        """Devuelve todos los animales como lista de dicts."""
+    def insert_many_animales(
+        self, filas: Iterable[Dict[str, Any]], chunk_size: int = 500
+    ) -> List[int]:
+        """
+        Inserta varios animales en una sola transacción.
+
+        Parameters
+        ----------
+        filas : Iterable[dict]
+            Datos de cada animal (mismas claves que `insert_animal`).
+        chunk_size : int
+            Filas por sentencia INSERT; acota la memoria en cargas enormes.
+
+        Returns
+        -------
+        List[int]
+            IDs generados, en el mismo orden que `filas`.
+        """
+        ...
+
+    @abstractmethod
+    def upsert_animales(
+        self, filas: Iterable[Dict[str, Any]], chunk_size: int = 500
+    ) -> Dict[str, int]:
+        """
+        Sincroniza animales identificados por `chip` (UNIQUE): inserta los
+        que no existen y actualiza las columnas indicadas de los que sí, en
+        una sola transacción y con sentencias por lotes (ON DUPLICATE KEY
+        UPDATE / ON CONFLICT).
+
+        Parameters
+        ----------
+        filas : Iterable[Dict[str, Any]]
+            Animales con `chip` y las columnas a fijar.
+        chunk_size : int
+            Máximo de filas por sentencia.
+
+        Returns
+        -------
+        Dict[str, int]
+            {"insertados": n, "actualizados": n, "sin_cambios": n}.
+
+        Raises
+        ------
+        ValueError
+            Si alguna fila no incluye `chip`.
+        """
+        ...
+
+    @abstractmethod
+    def get_animales(
+        self,
+        *,
+        limit: Optional[int] = None,
+        after: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Devuelve los animales como lista de dicts.
+
+        Sin argumentos devuelve la tabla completa.  Para paginar por clave
+        (*keyset*) se indica `limit` y, a partir de la segunda página, `after`
+        con la clave primaria de la última fila recibida; las filas salen
+        ordenadas por clave primaria.
+        """
+        ...
+
+    @abstractmethod
+    def get_animal_by_chip(self, chip: Any) -> Optional[Dict[str, Any]]:
+        """
+        Devuelve el animal con ese `chip` o None, buscando por el índice
+        UNIQUE de la columna (el chip se compara como texto).
+        """
+        ...
+
+    @abstractmethod
+    def get_animales_by_chips(self, chips: Iterable[Any]) -> Dict[str, Dict[str, Any]]:
+        """
+        Busca varios animales por chip con una consulta `IN` por lote.
+
+        Returns
+        -------
+        Dict[str, Dict[str, Any]]
+            chip (texto) → fila; los chips que no existen no aparecen.
+        """
+        ...
+
+    @abstractmethod
+    def iter_animales(self, batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        """
+        Generador que recorre todos los animales sin cargarlos en memoria.
+
+        Usa un cursor sin buffer y lee las filas de `batch_size` en
+        `batch_size`; pensado para exportaciones e informes nocturnos.
+        """
         ...
 
     @abstractmethod
@@ -54,7 +185,20 @@ class DBManager(ABC):
         ...
 
     @abstractmethod
-    def obtener_duenos(self) -> List[Dict[str, Any]]:
+    def insert_many_duenos(
+        self, filas: Iterable[Dict[str, Any]], chunk_size: int = 500
+    ) -> List[int]:
+        """Inserta varios dueños en una transacción; devuelve sus IDs en orden."""
+        ...
+
+    @abstractmethod
+    def obtener_duenos(
+        self,
+        *,
+        limit: Optional[int] = None,
+        after: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Dueños; paginación como en `get_animales`."""
         ...
 
     @abstractmethod
@@ -75,7 +219,20 @@ class DBManager(ABC):
         ...
 
     @abstractmethod
-    def obtener_veterinarios(self) -> List[Dict[str, Any]]:
+    def insert_many_veterinarios(
+        self, filas: Iterable[Dict[str, Any]], chunk_size: int = 500
+    ) -> List[int]:
+        """Inserta varios veterinarios en una transacción; devuelve sus IDs en orden."""
+        ...
+
+    @abstractmethod
+    def obtener_veterinarios(
+        self,
+        *,
+        limit: Optional[int] = None,
+        after: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Veterinarios; paginación como en `get_animales`."""
         ...
 
     @abstractmethod
@@ -96,7 +253,48 @@ class DBManager(ABC):
         ...
 
     @abstractmethod
-    def get_cuidados(self, animal_id: Optional[int] = None) -> List[Dict[str, Any]]:
+    def insert_many_cuidados(
+        self, filas: Iterable[Dict[str, Any]], chunk_size: int = 500
+    ) -> List[int]:
+        """Inserta varios cuidados en una transacción; devuelve sus IDs en orden."""
+        ...
+
+    @abstractmethod
+    def get_cuidados(
+        self,
+        animal_id: Optional[int] = None,
+        *,
+        limit: Optional[int] = None,
+        after: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Cuidados (todos o de `animal_id`); paginación como en `get_animales`."""
+        ...
+
+    @abstractmethod
+    def iter_cuidados(
+        self, animal_id: Optional[int] = None, batch_size: int = 1000
+    ) -> Iterator[Dict[str, Any]]:
+        """Generador de cuidados (todos o de `animal_id`); ver `iter_animales`."""
+        ...
+
+    @abstractmethod
+    def iter_cuidados_por_estado(
+        self, estado: str, batch_size: int = 1000
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Generador de los cuidados con `estado`, en orden de (fecha, id); solo
+        se leen las filas de ese estado.
+        """
+        ...
+
+    @abstractmethod
+    def get_cuidados_con_especie(
+        self, animal_id: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Cuidados (todos o de `animal_id`) en orden de id, cada uno con la
+        `especie` de su animal (None si no existe) en una sola consulta.
+        """
         ...
 
     @abstractmethod
@@ -107,13 +305,45 @@ class DBManager(ABC):
     def delete_cuidado(self, cuidado_id: int) -> None:
         ...
 
+    @abstractmethod
+    def cambiar_estado_cuidados(
+        self,
+        nuevo_estado: str,
+        *,
+        ids: Optional[Iterable[int]] = None,
+        animal_id: Optional[Any] = None,
+        estado: Optional[str] = None,
+        desde: Optional[str] = None,
+        hasta: Optional[str] = None,
+    ) -> int:
+        """
+        Pasa a `nuevo_estado` los cuidados que cumplen todos los filtros
+        indicados (`ids`, animal, estado actual y `desde <= fecha <= hasta`)
+        en una sola operación; sin filtros, todos.  Devuelve cuántos cambian
+        (los que ya estaban en `nuevo_estado` no cuentan ni se reescriben).
+        """
+        ...
+
     # ── Alimentos ───────────────────────────────────────────────────────────
     @abstractmethod
     def insertar_alimento(self, datos: Dict[str, Any]) -> int:
         ...
 
     @abstractmethod
-    def obtener_alimentos(self) -> List[Dict[str, Any]]:
+    def insert_many_alimentos(
+        self, filas: Iterable[Dict[str, Any]], chunk_size: int = 500
+    ) -> List[int]:
+        """Inserta varios alimentos en una transacción; devuelve sus IDs en orden."""
+        ...
+
+    @abstractmethod
+    def obtener_alimentos(
+        self,
+        *,
+        limit: Optional[int] = None,
+        after: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Alimentos; paginación como en `get_animales`."""
         ...
 
     @abstractmethod
@@ -135,8 +365,20 @@ class DBManager(ABC):
         ...
 
     @abstractmethod
-    def listar_vacunas(self) -> List[Dict[str, Any]]:
-        """Devuelve todas las vacunas como lista de dicts."""
+    def insert_many_vacunas(
+        self, filas: Iterable[Dict[str, Any]], chunk_size: int = 500
+    ) -> List[int]:
+        """Inserta varias vacunas en una transacción; devuelve sus IDs en orden."""
+        ...
+
+    @abstractmethod
+    def listar_vacunas(
+        self,
+        *,
+        limit: Optional[int] = None,
+        after: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Devuelve las vacunas como lista de dicts (paginable con `limit`/`after`)."""
         ...
 
     @abstractmethod
@@ -156,8 +398,20 @@ class DBManager(ABC):
         ...
 
     @abstractmethod
-    def listar_tratamientos(self) -> List[Dict[str, Any]]:
-        """Devuelve todos los tratamientos como lista de dicts."""
+    def insert_many_tratamientos(
+        self, filas: Iterable[Dict[str, Any]], chunk_size: int = 500
+    ) -> List[int]:
+        """Inserta varios tratamientos en una transacción; devuelve sus IDs en orden."""
+        ...
+
+    @abstractmethod
+    def listar_tratamientos(
+        self,
+        *,
+        limit: Optional[int] = None,
+        after: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Devuelve los tratamientos como lista de dicts (paginable con `limit`/`after`)."""
         ...
 
     @abstractmethod
@@ -177,8 +431,20 @@ class DBManager(ABC):
         ...
 
     @abstractmethod
-    def listar_consultas(self) -> List[Dict[str, Any]]:
-        """Devuelve todas las consultas como lista de dicts."""
+    def insert_many_consultas(
+        self, filas: Iterable[Dict[str, Any]], chunk_size: int = 500
+    ) -> List[int]:
+        """Inserta varias consultas en una transacción; devuelve sus IDs en orden."""
+        ...
+
+    @abstractmethod
+    def listar_consultas(
+        self,
+        *,
+        limit: Optional[int] = None,
+        after: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Devuelve las consultas como lista de dicts (paginable con `limit`/`after`)."""
         ...
 
     @abstractmethod
@@ -191,16 +457,214 @@ class DBManager(ABC):
         """Elimina la consulta con ID `consulta_id`."""
         ...
 
+    # ── Sincronización ───────────────────────────────────────────────────────
+    @abstractmethod
+    def cambios_desde(self, since: int = 0, limit: int = 1000) -> Dict[str, Any]:
+        """
+        Cambios registrados con número de secuencia mayor que `since`.
 
-# ──────────────────────── 3) Importa gestores concretos ──────────────────────
-from .mysql_manager import MySQLManager   # noqa: E402
+        Cada escritura en duenos, veterinarios, animales, cuidados, alimentos,
+        vacunas, tratamientos o consultas (incluidos los borrados en cascada)
+        deja una entrada con un `seq` creciente.  Las entradas de una misma
+        fila se condensan en la última de la página y se acompañan del estado
+        actual de la fila; si ya no existe se devuelve una baja (*tombstone*).
+        `next` nunca salta un `seq` que aún puede aparecer (ver
+        `SQLManager.cambios_desde`), así que basta con pedir desde él.  El
+        registro no se poda solo: ver `podar_cambios`.
+
+        Parameters
+        ----------
+        since : int
+            Último `seq` que tiene el cliente (0 para empezar desde el principio).
+        limit : int
+            Máximo de entradas del registro que se leen por llamada.
 
-# ──────────────────────── 4) Factoría de gestores ────────────────────────────
+        Returns
+        -------
+        Dict[str, Any]
+            {"items": [{"seq", "tabla", "clave", "op": "upsert" | "delete",
+            "fila": dict | None}], "next": seq hasta el que se ha leído,
+            "more": True si quedan entradas posteriores}.
+
+        Raises
+        ------
+        ValueError
+            Si `limit` < 1.
+        """
+        ...
+
+    @abstractmethod
+    def podar_cambios(self, conservar: int) -> int:
+        """
+        Borra del registro de cambios todo salvo las `conservar` entradas más
+        recientes (el registro crece con cada escritura) y devuelve cuántas
+        se han borrado.  Se conserva siempre la última entrada de cada tabla
+        (ver `ultimo_cambio_por_tabla`).  Un cliente cuyo `since` quede por
+        debajo de lo podado ya no recibirá las bajas de ese tramo: debe
+        volver a cargarlo todo (como en la carga inicial).
+
+        Raises
+        ------
+        ValueError
+            Si `conservar` < 1.
+        """
+        ...
+
+    @abstractmethod
+    def ultimo_cambio(self) -> int:
+        """
+        `seq` de la última entrada del registro de cambios (0 si no hay
+        ninguna): punto de partida de `cambios_desde` para quien carga el
+        estado actual y después solo quiere las novedades.
+        """
+        ...
+
+    @abstractmethod
+    def ultimo_cambio_por_tabla(self, since: int, hasta: int) -> Dict[str, int]:
+        """
+        `seq` de la última entrada de cada tabla con `since < seq <= hasta`
+        (solo las tablas que tienen alguna).  Con `hasta = ultimo_cambio()`
+        lo usa versiones.py para construir el ETag de cada recurso.
+        """
+        ...
+
+    # ── Estadísticas ─────────────────────────────────────────────────────────
+    # Agregados calculados en la BD (GROUP BY): devuelven unas pocas filas en
+    # lugar de las tablas completas.  Fechas y meses como texto
+    # 'YYYY-MM-DD' / 'YYYY-MM'; los extremos `desde`/`hasta` son inclusivos.
+    @abstractmethod
+    def cuidados_por_estado_y_dia(
+        self, desde: Optional[str] = None, hasta: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Número de cuidados por día y estado.
+
+        Parameters
+        ----------
+        desde, hasta : str, optional
+            Límites de `fecha` ('YYYY-MM-DD').
+
+        Returns
+        -------
+        List[Dict[str, Any]]
+            Filas {"fecha", "estado", "total"} ordenadas por fecha y estado.
+        """
+        ...
+
+    @abstractmethod
+    def animales_por_especie(self) -> List[Dict[str, Any]]:
+        """Número de animales por especie: filas {"especie", "total"} ordenadas por especie."""
+        ...
+
+    @abstractmethod
+    def coste_tratamientos_por_mes(
+        self, desde: Optional[str] = None, hasta: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Tratamientos y coste total por mes de inicio.
+
+        Parameters
+        ----------
+        desde, hasta : str, optional
+            Límites de `fecha_inicio` ('YYYY-MM-DD').
+
+        Returns
+        -------
+        List[Dict[str, Any]]
+            Filas {"mes", "tratamientos", "coste"} ordenadas por mes.
+        """
+        ...
+
+
+# ──────────────────────── 3) Esquema común ───────────────────────────────────
+# Columnas escribibles y clave primaria de cada tabla.  Los gestores SQL las
+# usan para construir las sentencias y para rechazar claves desconocidas.
+COLUMNAS: Dict[str, Tuple[str, ...]] = {
+    "duenos": ("nif", "nombre", "direccion", "telefono"),
+    "veterinarios": ("colegiado_id", "nombre", "nif", "direccion", "telefono"),
+    "animales": (
+        "chip", "especie", "nombre", "edad", "raza", "dueno_id", "colegiado_id",
+    ),
+    "cuidados": ("animal_id", "fecha", "tipo", "estado", "notas"),
+    "alimentos": ("tipo_animal", "alimento", "cantidad", "fecha_caducidad", "coste"),
+    "vacunas": ("nombre", "fecha"),
+    "tratamientos": ("nombre", "fecha_inicio", "fecha_fin", "coste"),
+    "consultas": ("animal", "veterinario", "fecha", "diagnostico"),
+}
+
+CLAVES: Dict[str, str] = {
+    "duenos": "id_dueno",
+    "veterinarios": "colegiado_id",
+    "animales": "id_animal",
+    "cuidados": "id",
+    "alimentos": "id",
+    "vacunas": "id",
+    "tratamientos": "id",
+    "consultas": "id",
+}
+
+
+def mismo_valor(actual: Any, nuevo: Any) -> bool:
+    """
+    True si guardar `nuevo` en una columna que contiene `actual` no la
+    cambiaría: números entre sí se comparan como números; el resto de
+    mezclas de tipos (chip 1234 frente a '1234', date frente a
+    'YYYY-MM-DD'), como texto, igual que los convierte la columna.
+    """
+    if actual is None or nuevo is None:
+        return actual is nuevo
+    if isinstance(actual, Number) and isinstance(nuevo, Number):
+        return actual == nuevo
+    if type(actual) is type(nuevo):
+        return actual == nuevo
+    return str(actual) == str(nuevo)
+
+
+# ──────────────────────── 4) Importa gestores concretos ──────────────────────
+from .mysql_manager import MySQLManager   # noqa: E402
+from .sqlite_manager import SQLiteManager  # noqa: E402
+from .memory_manager import InMemoryManager, IntegrityError as _MemoriaIntegrityError  # noqa: E402
+from .cache import CachingDBManager        # noqa: E402
+from .versiones import VersionedDBManager  # noqa: E402
+from .metricas import InstrumentedDBManager, MetricasDB, configurar_log_lentas  # noqa: E402
+from .sql_base import SQLManager           # noqa: E402
+
+import sqlite3                                           # noqa: E402
+from mysql.connector import IntegrityError as _MySQLIntegrityError  # noqa: E402
+
+# Violaciones de restricciones (UNIQUE, NOT NULL, claves ajenas) de cualquier gestor
+ERRORES_INTEGRIDAD: Tuple[type, ...] = (
+    _MySQLIntegrityError,
+    sqlite3.IntegrityError,
+    _MemoriaIntegrityError,
+)
+
+# ──────────────────────── 5) Factoría de gestores ────────────────────────────
 def get_db_manager() -> DBManager:
     """
     Devuelve una instancia del gestor adecuado según la variable `DB_TYPE`.
-    Actualmente solo se soporta MySQL.
+    Valores soportados: 'mysql', 'sqlite' y 'memory'.  Con `DB_CACHE=1` el
+    gestor se envuelve en un `CachingDBManager`; siempre después en un
+    `VersionedDBManager` (versiones por tabla para los ETag de la API), y
+    con `DB_METRICS=1` el resultado en un `InstrumentedDBManager` (mide lo
+    que ve quien llama, aciertos de caché incluidos).
     """
+    manager = _crear_manager()
+    metricas = MetricasDB(umbral_lento_ms=DB_SLOW_QUERY_MS) if DB_METRICS else None
+    if metricas is not None:
+        if DB_SLOW_QUERY_LOG:
+            configurar_log_lentas(DB_SLOW_QUERY_LOG)
+        if isinstance(manager, SQLManager):
+            manager.metricas = metricas
+    if DB_CACHE:
+        manager = CachingDBManager(manager, max_entries=DB_CACHE_SIZE, ttl=DB_CACHE_TTL)
+    manager = VersionedDBManager(manager, refresco=DB_VERSIONES_REFRESCO)
+    if metricas is not None:
+        manager = InstrumentedDBManager(manager, metricas)
+    return manager
+
+
+def _crear_manager() -> DBManager:
     if DB_TYPE.lower() == "mysql":
         return MySQLManager(
             host=DB_HOST,
@@ -208,9 +672,79 @@ def get_db_manager() -> DBManager:
             user=DB_USER,
             password=DB_PASS,
             database=DB_NAME,
+            pool_size=DB_POOL_SIZE,
+            pool_idle_timeout=DB_POOL_IDLE_TIMEOUT,
+            pool_timeout=DB_POOL_TIMEOUT,
+        )
+
+    if DB_TYPE.lower() == "sqlite":
+        return SQLiteManager(
+            path=DB_PATH,
+            mmap_size=int(DB_SQLITE_MMAP_SIZE) if DB_SQLITE_MMAP_SIZE else None,
+            cache_size_kb=int(DB_SQLITE_CACHE_KB) if DB_SQLITE_CACHE_KB else None,
+            pool_size=DB_POOL_SIZE,
+            pool_idle_timeout=DB_POOL_IDLE_TIMEOUT,
+            pool_timeout=DB_POOL_TIMEOUT,
         )
 
+    if DB_TYPE.lower() == "memory":
+        return InMemoryManager()
+
     raise RuntimeError(
         f"DB_TYPE='{DB_TYPE}' no está soportado. "
         "Implementa un gestor concreto o cambia la variable de entorno."
     )
+
+
+# ──────────────────────── 6) Inicialización perezosa ─────────────────────────
+class LazyDBManager:
+    """
+    Proxy que crea el gestor real la primera vez que se usa.
+
+    Importar `database` (o `api.app`, `cuidados.gestor_cuidados`…) no abre
+    conexiones ni ejecuta migraciones: eso ocurre en la primera llamada a
+    cualquier método, p. ej. `db.get_animales()`.  Los servidores que
+    prefieran pagar ese coste al arrancar llaman a `warm_up()`.
+
+    Parameters
+    ----------
+    factory : Callable[[], DBManager]
+        Función que construye el gestor (por defecto `get_db_manager`).
+    """
+
+    def __init__(self, factory: Callable[[], DBManager] = get_db_manager) -> None:
+        self._factory = factory
+        self._manager: Optional[DBManager] = None
+        self._lock = threading.Lock()
+
+    def warm_up(self) -> DBManager:
+        """
+        Construye el gestor ya (conexión, migraciones y comprobaciones de
+        esquema) si aún no existe, y lo devuelve.
+
+        Raises
+        ------
+        Exception
+            Lo que lance el gestor al conectar o migrar; el siguiente uso
+            lo vuelve a intentar.
+        """
+        manager = self._manager
+        if manager is None:
+            with self._lock:
+                if self._manager is None:
+                    self._manager = self._factory()
+                manager = self._manager
+        return manager
+
+    @property
+    def inicializado(self) -> bool:
+        """True si el gestor real ya se ha construido."""
+        return self._manager is not None
+
+    def __getattr__(self, nombre: str) -> Any:
+        return getattr(self._manager or self.warm_up(), nombre)
+
+    def __repr__(self) -> str:
+        if self._manager is None:
+            return "<LazyDBManager sin inicializar>"
+        return f"<LazyDBManager {type(self._manager).__name__}>"
@@ -0,0 +1,902 @@
+"""
+memory_manager.py
+
+Gestor concreto en memoria (`DB_TYPE=memory`), sin servidor ni ficheros.
+
+Pensado para medir el coste de `api/app.py` y `cuidados/gestor_cuidados.py`
+sin el ruido de la red o del disco, como referencia rápida frente a los
+gestores SQL y para pruebas herméticas (cada instancia empieza vacía).
+
+Cada tabla es un dict clave primaria → fila con:
+
+    - La lista ordenada de claves, para paginar por clave (`limit`/`after`)
+      con `bisect` igual que `WHERE clave > after ORDER BY clave`.
+    - Índices secundarios valor → claves: los campos UNIQUE (chip, nif), las
+      claves ajenas (animal_id, dueno_id, colegiado_id) y `cuidados.fecha`,
+      este último ordenado para consultas por rango.
+
+Se respetan las restricciones del esquema SQL (NOT NULL, UNIQUE, claves
+ajenas y el ON DELETE CASCADE de cuidados) para que el código que funciona
+aquí funcione igual contra MySQL o SQLite.  Cada escritura se anota además
+en un registro de cambios, el equivalente de los triggers de la migración 4
+(`cambios_desde`).  Los datos se pierden al terminar el proceso.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from datetime import date
+from typing import (
+    Any, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple,
+)
+
+from .db_base import CLAVES, COLUMNAS, DBManager, mismo_valor
+
+
+class IntegrityError(Exception):
+    """Una escritura viola una restricción del esquema (NOT NULL, UNIQUE o clave ajena)."""
+
+
+# ──────────────────────── Restricciones del esquema ──────────────────────────
+# Copia de lo que declara el DDL de migraciones.py.
+_NULABLES: Dict[str, Set[str]] = {
+    "animales": {"edad", "raza", "dueno_id", "colegiado_id"},
+    "cuidados": {"notas"},
+}
+_UNICAS: Dict[str, Tuple[str, ...]] = {
+    "duenos": ("nif",),
+    "veterinarios": ("nif",),
+    "animales": ("chip",),
+}
+_POR_DEFECTO: Dict[str, Dict[str, Any]] = {
+    "cuidados": {"estado": "pendiente"},
+}
+# (tabla, columna, tabla referenciada, columna referenciada, ON DELETE CASCADE)
+_REFERENCIAS: Tuple[Tuple[str, str, str, str, bool], ...] = (
+    ("animales", "dueno_id", "duenos", "id_dueno", False),
+    ("animales", "colegiado_id", "veterinarios", "colegiado_id", False),
+    ("cuidados", "animal_id", "animales", "chip", True),
+)
+# Columnas VARCHAR que guardan identificadores: como en SQL, 3 y "3" son el mismo
+_TEXTO: Dict[str, Tuple[str, ...]] = {
+    "animales": ("chip",),
+    "cuidados": ("animal_id",),
+}
+# Índices ordenados además de los de UNIQUE y claves ajenas
+_ORDENADOS: Dict[str, Tuple[str, ...]] = {
+    "cuidados": ("fecha",),
+}
+
+
+class _Indice:
+    """Índice secundario valor → claves primarias (los NULL no se indexan)."""
+
+    __slots__ = ("unico", "_mapa", "_valores")
+
+    def __init__(self, unico: bool = False, ordenado: bool = False) -> None:
+        self.unico = unico
+        self._mapa: Dict[Any, Set[Any]] = {}
+        # valores distintos en orden, solo si el índice admite rangos
+        self._valores: Optional[List[Any]] = [] if ordenado else None
+
+    def anadir(self, valor: Any, clave: Any) -> None:
+        if valor is None:
+            return
+        claves = self._mapa.get(valor)
+        if claves is None:
+            self._mapa[valor] = {clave}
+            if self._valores is not None:
+                insort(self._valores, valor)
+        else:
+            claves.add(clave)
+
+    def quitar(self, valor: Any, clave: Any) -> None:
+        if valor is None:
+            return
+        claves = self._mapa[valor]
+        claves.discard(clave)
+        if not claves:
+            del self._mapa[valor]
+            if self._valores is not None:
+                del self._valores[bisect_left(self._valores, valor)]
+
+    def buscar(self, valor: Any) -> Set[Any]:
+        """Claves de las filas con `valor` (no modificar el conjunto devuelto)."""
+        return self._mapa.get(valor, set())
+
+    def rango(self, desde: Any = None, hasta: Any = None) -> List[Any]:
+        """Claves con `desde <= valor <= hasta`, en orden de valor (índices ordenados)."""
+        if self._valores is None:
+            raise TypeError("El índice no es ordenado.")
+        i = 0 if desde is None else bisect_left(self._valores, desde)
+        j = len(self._valores) if hasta is None else bisect_right(self._valores, hasta)
+        claves: List[Any] = []
+        for valor in self._valores[i:j]:
+            claves.extend(sorted(self._mapa[valor]))
+        return claves
+
+
+class _Tabla:
+    """Filas de una tabla, su orden por clave primaria y sus índices."""
+
+    def __init__(self, nombre: str) -> None:
+        self.nombre = nombre
+        self.clave = CLAVES[nombre]
+        self.columnas = tuple(c for c in COLUMNAS[nombre] if c != self.clave)
+        self.filas: Dict[Any, Dict[str, Any]] = {}
+        self.orden: List[Any] = []
+        self.siguiente = 1
+        self.indices: Dict[str, _Indice] = {}
+        for col in _UNICAS.get(nombre, ()):
+            self.indices[col] = _Indice(unico=True)
+        for tabla, col, *_ in _REFERENCIAS:
+            if tabla == nombre:
+                self.indices.setdefault(col, _Indice())
+        for col in _ORDENADOS.get(nombre, ()):
+            self.indices[col] = _Indice(ordenado=True)
+
+    def poner(self, clave: Any, fila: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Sustituye (o borra con None) la fila `clave`; devuelve la anterior."""
+        anterior = self.filas.get(clave)
+        if anterior is not None:
+            for col, indice in self.indices.items():
+                indice.quitar(anterior[col], clave)
+        if fila is None:
+            if anterior is not None:
+                del self.filas[clave]
+                del self.orden[bisect_left(self.orden, clave)]
+            return anterior
+        self.filas[clave] = fila
+        if anterior is None:
+            if not self.orden or clave > self.orden[-1]:
+                self.orden.append(clave)
+            else:
+                insort(self.orden, clave)
+        for col, indice in self.indices.items():
+            indice.anadir(fila[col], clave)
+        return anterior
+
+
+class _Registro:
+    """
+    Registro de cambios: entradas (seq, tabla, clave, operación) en orden de
+    `seq`.  Se deshace con el mismo protocolo que `_Tabla`: `poner(seq, None)`
+    quita la entrada; los `seq` no se reutilizan.
+    """
+
+    def __init__(self) -> None:
+        self.seqs: List[int] = []
+        self.entradas: List[Tuple[int, str, Any, str]] = []
+        # los seq empiezan en el reloj (µs) y no en 1: así no se repiten
+        # tras un reinicio y un ETag antiguo no coincide con datos nuevos
+        self.siguiente = time.time_ns() // 1000
+
+    def anotar(self, tabla: str, clave: Any, operacion: str) -> int:
+        seq = self.siguiente
+        self.siguiente += 1
+        self.seqs.append(seq)
+        self.entradas.append((seq, tabla, clave, operacion))
+        return seq
+
+    def poner(self, seq: int, entrada: None) -> None:
+        i = bisect_left(self.seqs, seq)
+        if i < len(self.seqs) and self.seqs[i] == seq:
+            del self.seqs[i]
+            del self.entradas[i]
+
+
+class InMemoryManager(DBManager):
+    """
+    Implementación de `DBManager` sobre diccionarios en memoria.
+
+    Es segura entre hilos: un cerrojo serializa las operaciones y una
+    `transaction()` lo mantiene durante todo el bloque, de modo que las
+    transacciones se ejecutan de una en una.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._tablas: Dict[str, _Tabla] = {t: _Tabla(t) for t in COLUMNAS}
+        self._registro = _Registro()
+        # registro para deshacer de la transacción abierta en cada hilo
+        self._tx_local = threading.local()
+
+    # ──────────────────────────────── Transacciones ──────────────────────────────────
+    @contextmanager
+    def transaction(self) -> Iterator["InMemoryManager"]:
+        """
+        Unidad de trabajo: si el bloque lanza una excepción se deshacen sus
+        cambios.  Las transacciones anidadas deshacen solo lo suyo.
+        """
+        with self._lock:
+            registro: Optional[List[Tuple[Any, Any, Any]]] = getattr(
+                self._tx_local, "deshacer", None
+            )
+            exterior = registro is None
+            if exterior:
+                registro = self._tx_local.deshacer = []
+            marca = len(registro)
+            try:
+                yield self
+            except BaseException:
+                while len(registro) > marca:
+                    tabla, clave, anterior = registro.pop()
+                    tabla.poner(clave, anterior)
+                raise
+            finally:
+                if exterior:
+                    self._tx_local.deshacer = None
+
+    def _poner(self, tabla: _Tabla, clave: Any, fila: Optional[Dict[str, Any]]) -> None:
+        """Escribe la fila, la anota en el registro de cambios y guarda cómo deshacerlo."""
+        anterior = tabla.poner(clave, fila)
+        seq = self._registro.anotar(tabla.nombre, clave, "delete" if fila is None else "upsert")
+        registro = getattr(self._tx_local, "deshacer", None)
+        if registro is not None:
+            registro.append((tabla, clave, anterior))
+            registro.append((self._registro, seq, None))
+
+    # ──────────────────────────────── Auxiliares ──────────────────────────────────
+    @staticmethod
+    def _normalizar(tabla: str, col: str, valor: Any) -> Any:
+        """Fechas a 'YYYY-MM-DD' (como las guarda SQLite) y los ids VARCHAR a str."""
+        if isinstance(valor, date):
+            return str(valor)
+        if valor is not None and col in _TEXTO.get(tabla, ()):
+            return str(valor)
+        return valor
+
+    def _comprobar(self, t: _Tabla, clave: Any, fila: Dict[str, Any]) -> None:
+        """Valida NOT NULL, UNIQUE y claves ajenas de `fila` antes de guardarla."""
+        nulables = _NULABLES.get(t.nombre, set())
+        for col in t.columnas:
+            if fila[col] is None and col not in nulables:
+                raise IntegrityError(f"{t.nombre}.{col} no puede ser NULL")
+        for col, indice in t.indices.items():
+            if indice.unico and indice.buscar(fila[col]) - {clave}:
+                raise IntegrityError(f"{t.nombre}.{col} duplicado: {fila[col]!r}")
+        for tabla, col, tabla_ref, col_ref, _ in _REFERENCIAS:
+            if tabla != t.nombre or fila[col] is None:
+                continue
+            if not self._buscar(tabla_ref, col_ref, fila[col]):
+                raise IntegrityError(
+                    f"{t.nombre}.{col}={fila[col]!r} no existe en {tabla_ref}.{col_ref}"
+                )
+
+    def _buscar(self, tabla: str, col: str, valor: Any) -> Set[Any]:
+        """Claves de las filas de `tabla` con `col == valor` (clave primaria o índice)."""
+        t = self._tablas[tabla]
+        if col == t.clave:
+            return {valor} if valor in t.filas else set()
+        return t.indices[col].buscar(valor)
+
+    def _referencias(
+        self, t: _Tabla, anterior: Dict[str, Any], nueva: Optional[Dict[str, Any]]
+    ) -> None:
+        """
+        Aplica las claves ajenas que apuntan a `t` cuando su fila `anterior`
+        se borra (`nueva` None) o cambia el valor referenciado: borra en
+        cascada o lanza IntegrityError si hay filas que la referencian.
+        """
+        for tabla, col, tabla_ref, col_ref, cascada in _REFERENCIAS:
+            if tabla_ref != t.nombre:
+                continue
+            if nueva is not None and nueva[col_ref] == anterior[col_ref]:
+                continue
+            hijas = sorted(self._buscar(tabla, col, anterior[col_ref]))
+            if not hijas:
+                continue
+            if nueva is None and cascada:
+                for clave in hijas:
+                    self._borrar(self._tablas[tabla], clave)
+            else:
+                raise IntegrityError(
+                    f"{t.nombre}.{col_ref}={anterior[col_ref]!r} está referenciado "
+                    f"desde {tabla}.{col}"
+                )
+
+    def _insert(self, tabla: str, datos: Dict[str, Any]) -> int:
+        """Inserta las columnas de `tabla` presentes en `datos`; devuelve la clave."""
+        t = self._tablas[tabla]
+        with self._lock:
+            clave = datos.get(t.clave) if t.clave in COLUMNAS[tabla] else None
+            if clave is None:
+                clave = t.siguiente
+            elif clave in t.filas:
+                raise IntegrityError(f"{tabla}.{t.clave} duplicado: {clave!r}")
+            fila = {t.clave: clave}
+            defecto = _POR_DEFECTO.get(tabla, {})
+            for col in t.columnas:
+                fila[col] = self._normalizar(tabla, col, datos.get(col, defecto.get(col)))
+            self._comprobar(t, clave, fila)
+            self._poner(t, clave, fila)
+            t.siguiente = max(t.siguiente, clave + 1)
+            return clave
+
+    def _insert_many(self, tabla: str, filas: Iterable[Dict[str, Any]]) -> List[int]:
+        """Inserta `filas` en una transacción; devuelve las claves en orden."""
+        with self.transaction():
+            return [self._insert(tabla, datos) for datos in filas]
+
+    def _upsert(self, tabla: str, unica: str, filas: Iterable[Dict[str, Any]]) -> Dict[str, int]:
+        """Equivalente a `SQLManager._upsert` usando el índice UNIQUE de `unica`."""
+        t = self._tablas[tabla]
+        cuenta = {"insertados": 0, "actualizados": 0, "sin_cambios": 0}
+        with self.transaction():
+            for datos in filas:
+                if datos.get(unica) is None:
+                    raise ValueError(f"Cada fila debe incluir '{unica}'.")
+                existentes = t.indices[unica].buscar(self._normalizar(tabla, unica, datos[unica]))
+                if not existentes:
+                    self._insert(tabla, datos)
+                    cuenta["insertados"] += 1
+                    continue
+                clave, = existentes
+                actual = t.filas[clave]
+                cambios = {
+                    c: datos[c] for c in t.columnas
+                    if c in datos and not mismo_valor(actual[c], self._normalizar(tabla, c, datos[c]))
+                }
+                if cambios:
+                    self._update(tabla, clave, cambios)
+                    cuenta["actualizados"] += 1
+                else:
+                    cuenta["sin_cambios"] += 1
+        return cuenta
+
+    def _claves(self, t: _Tabla, filtros: Optional[Dict[str, Any]]) -> Sequence[Any]:
+        """Claves que cumplen `filtros` (igualdad sobre columnas indexadas), en orden."""
+        if not filtros:
+            return t.orden
+        (col, valor), = filtros.items()
+        return sorted(self._buscar(t.nombre, col, self._normalizar(t.nombre, col, valor)))
+
+    def _listar(
+        self,
+        tabla: str,
+        filtros: Optional[Dict[str, Any]] = None,
+        limit: Optional[int] = None,
+        after: Optional[Any] = None,
+    ) -> List[Dict[str, Any]]:
+        """Equivalente a `SQLManager._listar`: página por clave primaria."""
+        if limit is not None and limit < 1:
+            raise ValueError("limit debe ser al menos 1.")
+        t = self._tablas[tabla]
+        with self._lock:
+            claves = self._claves(t, filtros)
+            i = 0 if after is None else bisect_right(claves, after)
+            j = len(claves) if limit is None else i + limit
+            return [dict(t.filas[c]) for c in claves[i:j]]
+
+    def _iterar(
+        self, tabla: str, filtros: Optional[Dict[str, Any]], batch_size: int
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Recorre las filas copiando de `batch_size` en `batch_size`; el
+        cerrojo solo se toma para cada lote.
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size debe ser al menos 1.")
+        t = self._tablas[tabla]
+        with self._lock:
+            claves = list(self._claves(t, filtros))
+        for i in range(0, len(claves), batch_size):
+            with self._lock:
+                lote = [dict(t.filas[c]) for c in claves[i:i + batch_size] if c in t.filas]
+            yield from lote
+
+    def _select_one(self, tabla: str, clave: Any) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            fila = self._tablas[tabla].filas.get(clave)
+            return None if fila is None else dict(fila)
+
+    def _update(self, tabla: str, clave: Any, datos: Dict[str, Any]) -> None:
+        """
+        Actualiza las columnas de `datos` en la fila `clave` (sin efecto si
+        no existe).
+
+        Raises
+        ------
+        ValueError
+            Si `datos` contiene columnas que no existen en `tabla`.
+        IntegrityError
+            Si el resultado viola alguna restricción.
+        """
+        if not datos:
+            return
+        desconocidas = set(datos) - set(COLUMNAS[tabla])
+        if desconocidas:
+            raise ValueError(
+                f"Columnas no válidas para '{tabla}': {sorted(desconocidas)}"
+            )
+        t = self._tablas[tabla]
+        with self.transaction():
+            anterior = t.filas.get(clave)
+            if anterior is None:
+                return
+            nueva = dict(anterior)
+            for col, valor in datos.items():
+                nueva[col] = self._normalizar(tabla, col, valor)
+            nueva_clave = nueva[t.clave]
+            if nueva_clave != clave and nueva_clave in t.filas:
+                raise IntegrityError(f"{tabla}.{t.clave} duplicado: {nueva_clave!r}")
+            self._comprobar(t, clave, nueva)      # la propia fila no cuenta como duplicado
+            self._referencias(t, anterior, nueva)
+            if nueva_clave != clave:
+                self._poner(t, clave, None)
+            self._poner(t, nueva_clave, nueva)
+
+    def _borrar(self, t: _Tabla, clave: Any) -> None:
+        anterior = t.filas.get(clave)
+        if anterior is None:
+            return
+        self._referencias(t, anterior, None)
+        self._poner(t, clave, None)
+
+    def _delete(self, tabla: str, clave: Any) -> None:
+        """Elimina la fila `clave` aplicando las claves ajenas que la referencian."""
+        with self.transaction():
+            self._borrar(self._tablas[tabla], clave)
+
+    # ──────────────────────────────── Animales ──────────────────────────────────
+    def insert_animal(self, datos: Dict[str, Any]) -> int:
+        """Inserta un animal (chip, especie, nombre, edad, raza…) y devuelve su ID."""
+        return self._insert("animales", datos)
+
+    def insert_many_animales(
+        self, filas: Iterable[Dict[str, Any]], chunk_size: int = 500
+    ) -> List[int]:
+        """Inserta varios animales en una transacción; devuelve sus IDs en orden."""
+        return self._insert_many("animales", filas)
+
+    def upsert_animales(
+        self, filas: Iterable[Dict[str, Any]], chunk_size: int = 500
+    ) -> Dict[str, int]:
+        """Inserta o actualiza animales por `chip` (índice UNIQUE); devuelve los recuentos."""
+        return self._upsert("animales", "chip", filas)
+
+    def get_animales(
+        self,
+        *,
+        limit: Optional[int] = None,
+        after: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Devuelve los animales (paginables por id_animal)."""
+        return self._listar("animales", limit=limit, after=after)
+
+    def get_animal_by_chip(self, chip: Any) -> Optional[Dict[str, Any]]:
+        """Animal con ese chip (índice UNIQUE) o None."""
+        t = self._tablas["animales"]
+        with self._lock:
+            for clave in t.indices["chip"].buscar(str(chip)):
+                return dict(t.filas[clave])
+        return None
+
+    def get_animales_by_chips(self, chips: Iterable[Any]) -> Dict[str, Dict[str, Any]]:
+        """Animales de `chips` (chip → fila) resueltos con el índice UNIQUE."""
+        t = self._tablas["animales"]
+        indice = t.indices["chip"]
+        encontrados: Dict[str, Dict[str, Any]] = {}
+        with self._lock:
+            for chip in dict.fromkeys(str(c) for c in chips):
+                for clave in indice.buscar(chip):
+                    encontrados[chip] = dict(t.filas[clave])
+        return encontrados
+
+    def iter_animales(self, batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        """Recorre todos los animales en orden de id_animal."""
+        return self._iterar("animales", None, batch_size)
+
+    def update_animal(self, animal_id: int, datos: Dict[str, Any]) -> None:
+        """Actualiza los campos indicados en `datos` para el animal `animal_id`."""
+        self._update("animales", animal_id, datos)
+
+    def delete_animal(self, animal_id: int) -> None:
+        """Elimina el animal con ID `animal_id` (y sus cuidados, en cascada)."""
+        self._delete("animales", animal_id)
+
+    # ──────────────────────────────── Dueños ──────────────────────────────────
+    def insertar_dueno(self, datos: Dict[str, Any]) -> int:
+        """Inserta un dueño (nif, nombre, direccion, telefono) y devuelve su ID."""
+        return self._insert("duenos", datos)
+
+    def insert_many_duenos(
+        self, filas: Iterable[Dict[str, Any]], chunk_size: int = 500
+    ) -> List[int]:
+        """Inserta varios dueños en una transacción; devuelve sus IDs en orden."""
+        return self._insert_many("duenos", filas)
+
+    def obtener_duenos(
+        self,
+        *,
+        limit: Optional[int] = None,
+        after: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Devuelve los dueños (paginables por id_dueno)."""
+        return self._listar("duenos", limit=limit, after=after)
+
+    def obtener_dueno(self, dueno_id: int) -> Optional[Dict[str, Any]]:
+        """Devuelve el dueño con ID `dueno_id` o None si no existe."""
+        return self._select_one("duenos", dueno_id)
+
+    def actualizar_dueno(self, dueno_id: int, datos: Dict[str, Any]) -> None:
+        """Actualiza los campos indicados en `datos` para el dueño `dueno_id`."""
+        self._update("duenos", dueno_id, datos)
+
+    def eliminar_dueno(self, dueno_id: int) -> None:
+        """Elimina el dueño con ID `dueno_id`."""
+        self._delete("duenos", dueno_id)
+
+    # ──────────────────────────────── Veterinarios ──────────────────────────────────
+    def insertar_veterinario(self, datos: Dict[str, Any]) -> int:
+        """Inserta un veterinario y devuelve su número de colegiado."""
+        return self._insert("veterinarios", datos)
+
+    def insert_many_veterinarios(
+        self, filas: Iterable[Dict[str, Any]], chunk_size: int = 500
+    ) -> List[int]:
+        """Inserta varios veterinarios en una transacción; devuelve sus IDs en orden."""
+        return self._insert_many("veterinarios", filas)
+
+    def obtener_veterinarios(
+        self,
+        *,
+        limit: Optional[int] = None,
+        after: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Devuelve los veterinarios (paginables por colegiado_id)."""
+        return self._listar("veterinarios", limit=limit, after=after)
+
+    def obtener_veterinario(self, colegiado_id: int) -> Optional[Dict[str, Any]]:
+        """Devuelve el veterinario `colegiado_id` o None si no existe."""
+        return self._select_one("veterinarios", colegiado_id)
+
+    def actualizar_veterinario(self, colegiado_id: int, datos: Dict[str, Any]) -> None:
+        """Actualiza los campos indicados en `datos` para el veterinario."""
+        self._update("veterinarios", colegiado_id, datos)
+
+    def eliminar_veterinario(self, colegiado_id: int) -> None:
+        """Elimina el veterinario `colegiado_id`."""
+        self._delete("veterinarios", colegiado_id)
+
+    # ──────────────────────────────── Cuidados ──────────────────────────────────
+    def insert_cuidado(self, datos: Dict[str, Any]) -> int:
+        """Inserta un cuidado (animal_id, fecha, tipo, estado, notas) y devuelve su ID."""
+        return self._insert("cuidados", datos)
+
+    def insert_many_cuidados(
+        self, filas: Iterable[Dict[str, Any]], chunk_size: int = 500
+    ) -> List[int]:
+        """Inserta varios cuidados en una transacción; devuelve sus IDs en orden."""
+        return self._insert_many("cuidados", filas)
+
+    def get_cuidados(
+        self,
+        animal_id: Optional[int] = None,
+        *,
+        limit: Optional[int] = None,
+        after: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Devuelve los cuidados, todos o solo los del animal `animal_id` (índice animal_id)."""
+        return self._listar(
+            "cuidados",
+            None if animal_id is None else {"animal_id": animal_id},
+            limit=limit,
+            after=after,
+        )
+
+    def iter_cuidados(
+        self, animal_id: Optional[int] = None, batch_size: int = 1000
+    ) -> Iterator[Dict[str, Any]]:
+        """Recorre los cuidados (todos o de `animal_id`) en orden de id."""
+        return self._iterar(
+            "cuidados", None if animal_id is None else {"animal_id": animal_id}, batch_size
+        )
+
+    def iter_cuidados_por_estado(
+        self, estado: str, batch_size: int = 1000
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Recorre los cuidados con `estado` en orden de (fecha, id) siguiendo
+        el índice ordenado de `fecha`; solo se copian las filas de ese estado.
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size debe ser al menos 1.")
+        t = self._tablas["cuidados"]
+        with self._lock:
+            claves = [c for c in t.indices["fecha"].rango() if t.filas[c]["estado"] == estado]
+        for i in range(0, len(claves), batch_size):
+            with self._lock:
+                lote = [dict(t.filas[c]) for c in claves[i:i + batch_size] if c in t.filas]
+            yield from lote
+
+    def get_cuidados_con_especie(
+        self, animal_id: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Cuidados con la especie de su animal (índice UNIQUE de `chip`)."""
+        animales = self._tablas["animales"]
+        por_chip = animales.indices["chip"]
+        with self._lock:
+            filas = self.get_cuidados(animal_id)
+            for fila in filas:
+                especie = None
+                for clave in por_chip.buscar(str(fila["animal_id"])):
+                    especie = animales.filas[clave]["especie"]
+                fila["especie"] = especie
+        return filas
+
+    def update_cuidado(self, cuidado_id: int, datos: Dict[str, Any]) -> None:
+        """Actualiza los campos indicados en `datos` para el cuidado `cuidado_id`."""
+        self._update("cuidados", cuidado_id, datos)
+
+    def delete_cuidado(self, cuidado_id: int) -> None:
+        """Elimina el cuidado con ID `cuidado_id`."""
+        self._delete("cuidados", cuidado_id)
+
+    def cambiar_estado_cuidados(
+        self,
+        nuevo_estado: str,
+        *,
+        ids: Optional[Iterable[int]] = None,
+        animal_id: Optional[Any] = None,
+        estado: Optional[str] = None,
+        desde: Optional[str] = None,
+        hasta: Optional[str] = None,
+    ) -> int:
+        """
+        Cambia el estado de los cuidados filtrados en una transacción; los
+        candidatos salen de `ids`, del índice de `animal_id` o del índice
+        ordenado de `fecha`, y el resto de filtros se comprueba por fila.
+        """
+        t = self._tablas["cuidados"]
+        chip = self._normalizar("cuidados", "animal_id", animal_id)
+        desde = self._normalizar("cuidados", "fecha", desde)
+        hasta = self._normalizar("cuidados", "fecha", hasta)
+        cambiados = 0
+        with self.transaction():
+            if ids is not None:
+                candidatos: Iterable[Any] = dict.fromkeys(int(i) for i in ids)
+            elif chip is not None:
+                candidatos = self._claves(t, {"animal_id": chip})
+            elif desde is not None or hasta is not None:
+                candidatos = t.indices["fecha"].rango(desde, hasta)
+            else:
+                candidatos = list(t.orden)
+            for clave in candidatos:
+                fila = t.filas.get(clave)
+                if (
+                    fila is None
+                    or fila["estado"] == nuevo_estado
+                    or (chip is not None and fila["animal_id"] != chip)
+                    or (estado is not None and fila["estado"] != estado)
+                    or (desde is not None and fila["fecha"] < desde)
+                    or (hasta is not None and fila["fecha"] > hasta)
+                ):
+                    continue
+                self._poner(t, clave, {**fila, "estado": nuevo_estado})
+                cambiados += 1
+        return cambiados
+
+    # ──────────────────────────────── Alimentos ──────────────────────────────────
+    def insertar_alimento(self, datos: Dict[str, Any]) -> int:
+        """Inserta un alimento y devuelve su ID."""
+        return self._insert("alimentos", datos)
+
+    def insert_many_alimentos(
+        self, filas: Iterable[Dict[str, Any]], chunk_size: int = 500
+    ) -> List[int]:
+        """Inserta varios alimentos en una transacción; devuelve sus IDs en orden."""
+        return self._insert_many("alimentos", filas)
+
+    def obtener_alimentos(
+        self,
+        *,
+        limit: Optional[int] = None,
+        after: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Devuelve los alimentos (paginables por id)."""
+        return self._listar("alimentos", limit=limit, after=after)
+
+    def obtener_alimento(self, alimento_id: int) -> Optional[Dict[str, Any]]:
+        """Devuelve el alimento con ID `alimento_id` o None si no existe."""
+        return self._select_one("alimentos", alimento_id)
+
+    def actualizar_alimento(self, alimento_id: int, datos: Dict[str, Any]) -> None:
+        """Actualiza los campos indicados en `datos` para el alimento `alimento_id`."""
+        self._update("alimentos", alimento_id, datos)
+
+    def eliminar_alimento(self, alimento_id: int) -> None:
+        """Elimina el alimento con ID `alimento_id`."""
+        self._delete("alimentos", alimento_id)
+
+    # ──────────────────────────────── Vacunas ──────────────────────────────────
+    def insert_vacuna(self, datos: Dict[str, Any]) -> int:
+        """Crea una vacuna y devuelve su ID."""
+        return self._insert("vacunas", datos)
+
+    def insert_many_vacunas(
+        self, filas: Iterable[Dict[str, Any]], chunk_size: int = 500
+    ) -> List[int]:
+        """Inserta varias vacunas en una transacción; devuelve sus IDs en orden."""
+        return self._insert_many("vacunas", filas)
+
+    def listar_vacunas(
+        self,
+        *,
+        limit: Optional[int] = None,
+        after: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Devuelve las vacunas (paginables por id)."""
+        return self._listar("vacunas", limit=limit, after=after)
+
+    def update_vacuna(self, vacuna_id: int, datos: Dict[str, Any]) -> None:
+        """Actualiza los campos indicados en `datos` para la vacuna `vacuna_id`."""
+        self._update("vacunas", vacuna_id, datos)
+
+    def delete_vacuna(self, vacuna_id: int) -> None:
+        """Elimina la vacuna con ID `vacuna_id`."""
+        self._delete("vacunas", vacuna_id)
+
+    # ──────────────────────────────── Tratamientos ──────────────────────────────────
+    def insert_tratamiento(self, datos: Dict[str, Any]) -> int:
+        """Crea un tratamiento y devuelve su ID."""
+        return self._insert("tratamientos", datos)
+
+    def insert_many_tratamientos(
+        self, filas: Iterable[Dict[str, Any]], chunk_size: int = 500
+    ) -> List[int]:
+        """Inserta varios tratamientos en una transacción; devuelve sus IDs en orden."""
+        return self._insert_many("tratamientos", filas)
+
+    def listar_tratamientos(
+        self,
+        *,
+        limit: Optional[int] = None,
+        after: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Devuelve los tratamientos (paginables por id)."""
+        return self._listar("tratamientos", limit=limit, after=after)
+
+    def update_tratamiento(self, tratamiento_id: int, datos: Dict[str, Any]) -> None:
+        """Actualiza los campos indicados en `datos` para el tratamiento `tratamiento_id`."""
+        self._update("tratamientos", tratamiento_id, datos)
+
+    def delete_tratamiento(self, tratamiento_id: int) -> None:
+        """Elimina el tratamiento con ID `tratamiento_id`."""
+        self._delete("tratamientos", tratamiento_id)
+
+    # ──────────────────────────────── Consultas ──────────────────────────────────
+    def insert_consulta(self, datos: Dict[str, Any]) -> int:
+        """Crea una consulta y devuelve su ID."""
+        return self._insert("consultas", datos)
+
+    def insert_many_consultas(
+        self, filas: Iterable[Dict[str, Any]], chunk_size: int = 500
+    ) -> List[int]:
+        """Inserta varias consultas en una transacción; devuelve sus IDs en orden."""
+        return self._insert_many("consultas", filas)
+
+    def listar_consultas(
+        self,
+        *,
+        limit: Optional[int] = None,
+        after: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Devuelve las consultas (paginables por id)."""
+        return self._listar("consultas", limit=limit, after=after)
+
+    def update_consulta(self, consulta_id: int, datos: Dict[str, Any]) -> None:
+        """Actualiza los campos indicados en `datos` para la consulta `consulta_id`."""
+        self._update("consultas", consulta_id, datos)
+
+    def delete_consulta(self, consulta_id: int) -> None:
+        """Elimina la consulta con ID `consulta_id`."""
+        self._delete("consultas", consulta_id)
+
+    # ──────────────────────────────── Sincronización ──────────────────────────────────
+    def podar_cambios(self, conservar: int) -> int:
+        """Quita del registro todas las entradas salvo las `conservar` últimas."""
+        if conservar < 1:
+            raise ValueError("conservar debe ser al menos 1.")
+        r = self._registro
+        with self._lock:
+            n = max(0, len(r.seqs) - conservar)
+            ultimas = {tabla: seq for seq, tabla, _, _ in r.entradas}
+            quedan = [
+                e for i, e in enumerate(r.entradas)
+                if i >= n or ultimas[e[1]] == e[0]
+            ]
+            borradas = len(r.entradas) - len(quedan)
+            r.entradas = quedan
+            r.seqs = [e[0] for e in quedan]
+            return borradas
+
+    def ultimo_cambio(self) -> int:
+        """`seq` de la última entrada anotada en el registro de cambios."""
+        with self._lock:
+            return self._registro.siguiente - 1
+
+    def ultimo_cambio_por_tabla(self, since: int, hasta: int) -> Dict[str, int]:
+        """Último `seq` de cada tabla en el tramo `since < seq <= hasta`."""
+        r = self._registro
+        with self._lock:
+            i = bisect_right(r.seqs, since)
+            j = bisect_right(r.seqs, hasta, i)
+            return {tabla: seq for seq, tabla, _, _ in r.entradas[i:j]}
+
+    def cambios_desde(self, since: int = 0, limit: int = 1000) -> Dict[str, Any]:
+        """Página del registro de cambios con el estado actual de cada fila."""
+        if limit < 1:
+            raise ValueError("limit debe ser al menos 1.")
+        r = self._registro
+        with self._lock:
+            i = bisect_right(r.seqs, since)
+            entradas = r.entradas[i:i + limit]
+            mas = i + limit < len(r.entradas)
+            ultimas = {(tabla, clave): seq for seq, tabla, clave, _ in entradas}
+            items = []
+            for (tabla, clave), seq in sorted(ultimas.items(), key=lambda kv: kv[1]):
+                fila = self._tablas[tabla].filas.get(clave)
+                items.append({
+                    "seq": seq,
+                    "tabla": tabla,
+                    "clave": clave,
+                    "op": "delete" if fila is None else "upsert",
+                    "fila": None if fila is None else dict(fila),
+                })
+        return {
+            "items": items,
+            "next": entradas[-1][0] if entradas else since,
+            "more": mas,
+        }
+
+    # ──────────────────────────────── Estadísticas ──────────────────────────────────
+    def cuidados_por_estado_y_dia(
+        self, desde: Optional[str] = None, hasta: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Cuidados por día y estado; el rango se resuelve con el índice de `fecha`."""
+        t = self._tablas["cuidados"]
+        with self._lock:
+            if desde is None and hasta is None:
+                filas = t.filas.values()
+            else:
+                claves = t.indices["fecha"].rango(
+                    self._normalizar("cuidados", "fecha", desde),
+                    self._normalizar("cuidados", "fecha", hasta),
+                )
+                filas = [t.filas[c] for c in claves]
+            cuenta = Counter((f["fecha"], f["estado"]) for f in filas)
+        return [
+            {"fecha": fecha, "estado": estado, "total": n}
+            for (fecha, estado), n in sorted(cuenta.items())
+        ]
+
+    def animales_por_especie(self) -> List[Dict[str, Any]]:
+        """Animales por especie."""
+        with self._lock:
+            cuenta = Counter(f["especie"] for f in self._tablas["animales"].filas.values())
+        return [{"especie": e, "total": n} for e, n in sorted(cuenta.items())]
+
+    def coste_tratamientos_por_mes(
+        self, desde: Optional[str] = None, hasta: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Tratamientos y coste por mes de inicio."""
+        desde = self._normalizar("tratamientos", "fecha_inicio", desde)
+        hasta = self._normalizar("tratamientos", "fecha_inicio", hasta)
+        meses: Dict[str, List[float]] = defaultdict(lambda: [0, 0.0])
+        with self._lock:
+            for f in self._tablas["tratamientos"].filas.values():
+                inicio = f["fecha_inicio"]
+                if (desde is not None and inicio < desde) or (hasta is not None and inicio > hasta):
+                    continue
+                acumulado = meses[inicio[:7]]
+                acumulado[0] += 1
+                acumulado[1] += f["coste"]
+        return [
+            {"mes": mes, "tratamientos": n, "coste": coste}
+            for mes, (n, coste) in sorted(meses.items())
+        ]
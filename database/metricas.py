@@ -0,0 +1,329 @@
+"""
+metricas.py
+
+Instrumentación de la capa de base de datos (`DB_METRICS=1`).
+
+`MetricasDB` acumula, por método de `DBManager` y por sentencia SQL:
+llamadas, errores, tiempo total/medio/máximo, percentiles (p50/p95/p99
+sobre las últimas `muestras` mediciones), filas devueltas o afectadas y
+tiempo de espera por una conexión.
+
+Las sentencias (y llamadas) que superan `umbral_lento_ms` se escriben en el
+logger `database.lentas` con los parámetros ocultos: solo se registra su
+tipo, nunca su valor (NIF, teléfonos, notas clínicas…).
+
+`InstrumentedDBManager` envuelve cualquier `DBManager` y mide cada método
+de la interfaz; los gestores SQL miden además cada sentencia si se les
+asigna la misma instancia en `metricas`.
+"""
+
+from __future__ import annotations
+
+import functools
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional
+
+from .db_base import DBManager
+
+log_lentas = logging.getLogger("database.lentas")
+
+# Los INSERT multi-fila y los IN (...) generan un texto distinto por cada
+# tamaño de lote; se agrupan bajo una sola clave.
+_GRUPOS_VALUES = re.compile(r"(\([^()]*\))(?:\s*,\s*\([^()]*\))+")
+_LISTA_MARCAS = re.compile(r"(%s|\?)(?:\s*,\s*(?:%s|\?))+")
+_ESPACIOS = re.compile(r"\s+")
+
+
+def normalizar_sql(q: str) -> str:
+    """Clave de agregación de una sentencia: espacios y listas de marcadores colapsados."""
+    q = _ESPACIOS.sub(" ", q).strip()
+    q = _GRUPOS_VALUES.sub(r"\1, ...", q)
+    return _LISTA_MARCAS.sub(r"\1, ...", q)
+
+
+def redactar(params: Any) -> Any:
+    """Sustituye cada valor de `params` por el nombre de su tipo."""
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {k: redactar(v) for k, v in params.items()}
+    if isinstance(params, (list, tuple)):
+        if len(params) > 20:
+            return [redactar(v) for v in params[:20]] + [f"… {len(params) - 20} más"]
+        return [redactar(v) for v in params]
+    return f"<{type(params).__name__}>"
+
+
+class Medicion:
+    """Datos que el código medido completa durante la medición."""
+
+    __slots__ = ("filas", "espera")
+
+    def __init__(self) -> None:
+        self.filas = 0
+        self.espera = 0.0
+
+
+class _Serie:
+    """Acumulados de un método o sentencia."""
+
+    __slots__ = ("llamadas", "errores", "total", "maximo", "filas", "espera", "muestras")
+
+    def __init__(self, muestras: int) -> None:
+        self.llamadas = 0
+        self.errores = 0
+        self.total = 0.0
+        self.maximo = 0.0
+        self.filas = 0
+        self.espera = 0.0
+        self.muestras: Deque[float] = deque(maxlen=muestras)
+
+    def anotar(self, segundos: float, m: Medicion, error: bool) -> None:
+        self.llamadas += 1
+        self.errores += error
+        self.total += segundos
+        self.maximo = max(self.maximo, segundos)
+        self.filas += m.filas
+        self.espera += m.espera
+        self.muestras.append(segundos)
+
+    def resumen(self) -> Dict[str, Any]:
+        orden = sorted(self.muestras)
+
+        def pct(p: float) -> float:
+            return orden[min(len(orden) - 1, int(p * len(orden)))] * 1000 if orden else 0.0
+
+        return {
+            "llamadas": self.llamadas,
+            "errores": self.errores,
+            "total_ms": self.total * 1000,
+            "media_ms": self.total / self.llamadas * 1000 if self.llamadas else 0.0,
+            "max_ms": self.maximo * 1000,
+            "p50_ms": pct(0.50),
+            "p95_ms": pct(0.95),
+            "p99_ms": pct(0.99),
+            "filas": self.filas,
+            "espera_conexion_ms": self.espera * 1000,
+        }
+
+
+class MetricasDB:
+    """
+    Acumulador de métricas seguro entre hilos.
+
+    Parameters
+    ----------
+    umbral_lento_ms : float
+        Duración a partir de la cual una sentencia o llamada va al log de
+        lentas.  0 o negativo lo desactiva.
+    muestras : int
+        Mediciones recientes que se guardan por clave para los percentiles.
+    """
+
+    def __init__(self, umbral_lento_ms: float = 200.0, muestras: int = 1000) -> None:
+        self.umbral_lento = umbral_lento_ms / 1000
+        self.muestras = muestras
+        self._lock = threading.Lock()
+        self._metodos: Dict[str, _Serie] = {}
+        self._sql: Dict[str, _Serie] = {}
+        self._conexiones = _Serie(muestras)
+        # pila de mediciones de método abiertas en cada hilo
+        self._local = threading.local()
+
+    # ──────────────────────────────── Medición ──────────────────────────────────
+    @contextmanager
+    def metodo(self, nombre: str, args: Any = (), apilar: bool = True) -> Iterator[Medicion]:
+        """
+        Mide una llamada a `nombre`.  Con `apilar` las esperas de conexión
+        ocurridas durante el bloque se atribuyen a esta llamada.
+        """
+        m = Medicion()
+        pila: Optional[List[Medicion]] = None
+        if apilar:
+            pila = getattr(self._local, "pila", None)
+            if pila is None:
+                pila = self._local.pila = []
+            pila.append(m)
+        inicio = time.perf_counter()
+        error = False
+        try:
+            yield m
+        except BaseException:
+            error = True
+            raise
+        finally:
+            segundos = time.perf_counter() - inicio
+            if pila is not None:
+                pila.pop()
+            self._anotar(self._metodos, nombre, segundos, m, error)
+            if self._es_lenta(segundos):
+                log_lentas.warning(
+                    "llamada lenta %.1f ms (%d filas): %s args=%s",
+                    segundos * 1000, m.filas, nombre, redactar(args),
+                )
+
+    @contextmanager
+    def sentencia(self, q: str, params: Any = None) -> Iterator[Medicion]:
+        """Mide la ejecución (y lectura) de la sentencia SQL `q`."""
+        m = Medicion()
+        inicio = time.perf_counter()
+        error = False
+        try:
+            yield m
+        except BaseException:
+            error = True
+            raise
+        finally:
+            segundos = time.perf_counter() - inicio
+            clave = normalizar_sql(q)
+            self._anotar(self._sql, clave, segundos, m, error)
+            if self._es_lenta(segundos):
+                log_lentas.warning(
+                    "consulta lenta %.1f ms (%d filas): %s params=%s",
+                    segundos * 1000, m.filas, clave, redactar(params),
+                )
+
+    def espera_conexion(self, segundos: float) -> None:
+        """Registra lo que se tardó en obtener una conexión (pool o apertura)."""
+        pila = getattr(self._local, "pila", None)
+        if pila:
+            pila[-1].espera += segundos
+        m = Medicion()
+        m.espera = segundos
+        with self._lock:
+            self._conexiones.anotar(segundos, m, False)
+
+    # ──────────────────────────────── Consulta ──────────────────────────────────
+    def stats(self) -> Dict[str, Any]:
+        """
+        Devuelve una instantánea de las métricas.
+
+        Returns
+        -------
+        Dict[str, Any]
+            {"metodos": {nombre: resumen}, "sql": {sentencia: resumen},
+            "conexiones": resumen}, con los métodos y sentencias ordenados
+            por tiempo total descendente.
+        """
+        with self._lock:
+            def ordenar(series: Dict[str, _Serie]) -> Dict[str, Any]:
+                return {
+                    k: s.resumen()
+                    for k, s in sorted(series.items(), key=lambda kv: -kv[1].total)
+                }
+
+            return {
+                "metodos": ordenar(self._metodos),
+                "sql": ordenar(self._sql),
+                "conexiones": self._conexiones.resumen(),
+            }
+
+    def reset(self) -> None:
+        """Pone a cero todos los acumulados."""
+        with self._lock:
+            self._metodos.clear()
+            self._sql.clear()
+            self._conexiones = _Serie(self.muestras)
+
+    # ──────────────────────────────── Auxiliares ──────────────────────────────────
+    def _anotar(
+        self, series: Dict[str, _Serie], clave: str, segundos: float, m: Medicion, error: bool
+    ) -> None:
+        with self._lock:
+            serie = series.get(clave)
+            if serie is None:
+                serie = series[clave] = _Serie(self.muestras)
+            serie.anotar(segundos, m, error)
+
+    def _es_lenta(self, segundos: float) -> bool:
+        return self.umbral_lento > 0 and segundos >= self.umbral_lento
+
+
+def configurar_log_lentas(ruta: str) -> None:
+    """Añade (una sola vez) un fichero de destino al logger `database.lentas`."""
+    ruta = os.path.abspath(ruta)
+    for handler in log_lentas.handlers:
+        if getattr(handler, "baseFilename", None) == ruta:
+            return
+    handler = logging.FileHandler(ruta, encoding="utf-8")
+    handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+    log_lentas.addHandler(handler)
+    log_lentas.setLevel(logging.WARNING)
+
+
+def _contar(resultado: Any) -> int:
+    """Filas de un resultado de la interfaz: listas por longitud, None → 0, resto → 1."""
+    if resultado is None:
+        return 0
+    if isinstance(resultado, list):
+        return len(resultado)
+    return 1
+
+
+class InstrumentedDBManager(DBManager):
+    """
+    Envuelve un `DBManager` y mide cada método de la interfaz.
+
+    Parameters
+    ----------
+    inner : DBManager
+        Gestor al que se delegan las llamadas (puede ser un `CachingDBManager`:
+        así se mide lo que ve quien llama, aciertos de caché incluidos).
+    metricas : MetricasDB
+        Acumulador donde se anotan las mediciones.
+
+    Los métodos se generan a partir de los abstractos de `DBManager`, así que
+    cualquier método nuevo de la interfaz queda medido sin tocar esta clase.
+    Lo que no es de la interfaz (p. ej. `pool_stats`) se delega sin medir.
+    """
+
+    def __init__(self, inner: DBManager, metricas: MetricasDB) -> None:
+        self.inner = inner
+        self.metricas = metricas
+
+    def __getattr__(self, nombre: str) -> Any:
+        return getattr(self.inner, nombre)
+
+    def metricas_stats(self) -> Dict[str, Any]:
+        """Métricas por método, por sentencia y de conexiones (ver `MetricasDB.stats`)."""
+        return self.metricas.stats()
+
+    @contextmanager
+    def transaction(self) -> Iterator["InstrumentedDBManager"]:
+        """Transacción del gestor interno; mide cuánto dura el bloque completo."""
+        with self.metricas.metodo("transaction"), self.inner.transaction():
+            yield self
+
+
+def _medido(nombre: str) -> Callable[..., Any]:
+    original = getattr(DBManager, nombre)
+
+    if nombre.startswith("iter_"):
+        @functools.wraps(original)
+        def iterador(self: InstrumentedDBManager, *args: Any, **kwargs: Any) -> Iterator[Any]:
+            # no se apila: el generador se suspende entre filas y otras
+            # llamadas del hilo se atribuirían a esta
+            with self.metricas.metodo(nombre, args, apilar=False) as m:
+                for fila in getattr(self.inner, nombre)(*args, **kwargs):
+                    m.filas += 1
+                    yield fila
+        return iterador
+
+    @functools.wraps(original)
+    def metodo(self: InstrumentedDBManager, *args: Any, **kwargs: Any) -> Any:
+        with self.metricas.metodo(nombre, args) as m:
+            resultado = getattr(self.inner, nombre)(*args, **kwargs)
+            m.filas = _contar(resultado)
+        return resultado
+    return metodo
+
+
+for _nombre in sorted(DBManager.__abstractmethods__ - {"transaction"}):
+    setattr(InstrumentedDBManager, _nombre, _medido(_nombre))
+InstrumentedDBManager.__abstractmethods__ = frozenset()
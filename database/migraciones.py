@@ -0,0 +1,449 @@
+"""
+migraciones.py
+
+Migraciones versionadas del esquema para los gestores SQL.
+
+La tabla `schema_version` guarda qué migraciones se han aplicado.  Al
+arrancar, `migrar()` lee la versión actual y ejecuta, en orden, solo las
+migraciones posteriores; con el esquema al día el arranque cuesta una
+consulta en lugar de repetir todo el DDL.
+
+Para añadir una migración basta con agregar un `Migracion` al final de
+`MIGRACIONES` con la siguiente versión.  Nunca se modifica una migración ya
+publicada: los cambios van siempre en una nueva.
+"""
+
+from __future__ import annotations
+
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Sequence, Tuple
+
+if TYPE_CHECKING:
+    from .sql_base import SQLManager
+
+
+@dataclass(frozen=True)
+class Migracion:
+    """
+    Paso de migración.
+
+    Attributes
+    ----------
+    version : int
+        Número de versión que deja el esquema al aplicarla.
+    descripcion : str
+        Texto corto que se guarda en `schema_version`.
+    sql : Sequence[str]
+        Sentencias válidas en todos los motores.
+    por_dialecto : Dict[str, Sequence[str]]
+        Sentencias específicas de un motor (clave `SQLManager.DIALECTO`);
+        si existe entrada para el motor, sustituye a `sql`.
+    """
+
+    version: int
+    descripcion: str
+    sql: Sequence[str] = ()
+    por_dialecto: Dict[str, Sequence[str]] = field(default_factory=dict)
+
+    def sentencias(self, dialecto: str) -> Sequence[str]:
+        return self.por_dialecto.get(dialecto, self.sql)
+
+
+# ──────────────────────── Esquema inicial ────────────────────────────────────
+# CREATE TABLE IF NOT EXISTS para que las bases creadas antes de existir
+# `schema_version` se adopten sin error.
+_TABLAS_MYSQL: Tuple[str, ...] = (
+    """
+    CREATE TABLE IF NOT EXISTS duenos (
+        id_dueno      INT AUTO_INCREMENT PRIMARY KEY,
+        nif            VARCHAR(20) UNIQUE NOT NULL,
+        nombre         VARCHAR(100) NOT NULL,
+        direccion      VARCHAR(200) NOT NULL,
+        telefono       VARCHAR(20) NOT NULL
+    ) ENGINE=InnoDB
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS veterinarios (
+        colegiado_id  INT AUTO_INCREMENT PRIMARY KEY,
+        nombre         VARCHAR(100) NOT NULL,
+        nif            VARCHAR(20) UNIQUE NOT NULL,
+        direccion      VARCHAR(200) NOT NULL,
+        telefono       VARCHAR(20) NOT NULL
+    ) ENGINE=InnoDB
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS animales (
+        id_animal       INT AUTO_INCREMENT PRIMARY KEY,
+        chip            VARCHAR(60) UNIQUE NOT NULL,
+        especie         VARCHAR(100) NOT NULL,
+        nombre          VARCHAR(100) NOT NULL,
+        edad            INT,
+        raza            VARCHAR(100),
+        dueno_id        INT,
+        colegiado_id    INT,
+        CONSTRAINT fk_dueno
+            FOREIGN KEY (dueno_id)
+            REFERENCES duenos(id_dueno),
+        CONSTRAINT fk_veterinario
+            FOREIGN KEY (colegiado_id)
+            REFERENCES veterinarios(colegiado_id)
+    ) ENGINE=InnoDB
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS cuidados (
+        id        INT AUTO_INCREMENT PRIMARY KEY,
+        animal_id VARCHAR(60)      NOT NULL,
+        fecha     DATE             NOT NULL,
+        tipo      VARCHAR(50)      NOT NULL,
+        estado    VARCHAR(20)      NOT NULL DEFAULT 'pendiente',
+        notas     TEXT,
+        CONSTRAINT fk_animal
+            FOREIGN KEY (animal_id)
+            REFERENCES animales(chip)
+            ON DELETE CASCADE
+    ) ENGINE=InnoDB
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS alimentos (
+        id               INT AUTO_INCREMENT PRIMARY KEY,
+        tipo_animal      VARCHAR(50)  NOT NULL,
+        alimento         VARCHAR(100) NOT NULL,
+        cantidad         INT          NOT NULL,
+        fecha_caducidad  DATE         NOT NULL,
+        coste            FLOAT        NOT NULL
+    ) ENGINE=InnoDB
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS vacunas (
+        id        INT AUTO_INCREMENT PRIMARY KEY,
+        nombre    VARCHAR(100) NOT NULL,
+        fecha     DATE         NOT NULL
+    ) ENGINE=InnoDB
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS tratamientos (
+        id            INT AUTO_INCREMENT PRIMARY KEY,
+        nombre        VARCHAR(100) NOT NULL,
+        fecha_inicio  DATE         NOT NULL,
+        fecha_fin     DATE         NOT NULL,
+        coste         FLOAT        NOT NULL
+    ) ENGINE=InnoDB
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS consultas (
+        id           INT AUTO_INCREMENT PRIMARY KEY,
+        animal       VARCHAR(100) NOT NULL,
+        veterinario  VARCHAR(100) NOT NULL,
+        fecha        DATE         NOT NULL,
+        diagnostico  TEXT         NOT NULL
+    ) ENGINE=InnoDB
+    """,
+)
+
+_TABLAS_SQLITE: Tuple[str, ...] = (
+    """
+    CREATE TABLE IF NOT EXISTS duenos (
+        id_dueno      INTEGER PRIMARY KEY,
+        nif           TEXT UNIQUE NOT NULL,
+        nombre        TEXT NOT NULL,
+        direccion     TEXT NOT NULL,
+        telefono      TEXT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS veterinarios (
+        colegiado_id  INTEGER PRIMARY KEY,
+        nombre        TEXT NOT NULL,
+        nif           TEXT UNIQUE NOT NULL,
+        direccion     TEXT NOT NULL,
+        telefono      TEXT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS animales (
+        id_animal     INTEGER PRIMARY KEY,
+        chip          TEXT UNIQUE NOT NULL,
+        especie       TEXT NOT NULL,
+        nombre        TEXT NOT NULL,
+        edad          INTEGER,
+        raza          TEXT,
+        dueno_id      INTEGER REFERENCES duenos(id_dueno),
+        colegiado_id  INTEGER REFERENCES veterinarios(colegiado_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS cuidados (
+        id            INTEGER PRIMARY KEY,
+        animal_id     TEXT NOT NULL
+                      REFERENCES animales(chip) ON DELETE CASCADE,
+        fecha         TEXT NOT NULL,
+        tipo          TEXT NOT NULL,
+        estado        TEXT NOT NULL DEFAULT 'pendiente',
+        notas         TEXT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS alimentos (
+        id               INTEGER PRIMARY KEY,
+        tipo_animal      TEXT    NOT NULL,
+        alimento         TEXT    NOT NULL,
+        cantidad         INTEGER NOT NULL,
+        fecha_caducidad  TEXT    NOT NULL,
+        coste            REAL    NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS vacunas (
+        id            INTEGER PRIMARY KEY,
+        nombre        TEXT NOT NULL,
+        fecha         TEXT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS tratamientos (
+        id            INTEGER PRIMARY KEY,
+        nombre        TEXT NOT NULL,
+        fecha_inicio  TEXT NOT NULL,
+        fecha_fin     TEXT NOT NULL,
+        coste         REAL NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS consultas (
+        id            INTEGER PRIMARY KEY,
+        animal        TEXT NOT NULL,
+        veterinario   TEXT NOT NULL,
+        fecha         TEXT NOT NULL,
+        diagnostico   TEXT NOT NULL
+    )
+    """,
+)
+
+# ──────────────────────── Registro de cambios ────────────────────────────────
+# Cada INSERT/UPDATE/DELETE de estas tablas deja una entrada en
+# `registro_cambios` mediante triggers, así se registra también lo escrito en
+# cascada o fuera de la aplicación.  `seq` crece siempre (AUTOINCREMENT en
+# SQLite para no reutilizar valores).  Lista fija: es parte de la migración.
+_TABLAS_REGISTRADAS: Tuple[Tuple[str, str], ...] = (
+    ("duenos", "id_dueno"),
+    ("veterinarios", "colegiado_id"),
+    ("animales", "id_animal"),
+    ("cuidados", "id"),
+    ("alimentos", "id"),
+    ("vacunas", "id"),
+    ("tratamientos", "id"),
+    ("consultas", "id"),
+)
+
+_ANOTAR = "INSERT INTO registro_cambios (tabla, clave, operacion) VALUES ('{t}', {k}, '{op}')"
+
+
+def _registro_sqlite() -> List[str]:
+    sentencias = [
+        """
+        CREATE TABLE IF NOT EXISTS registro_cambios (
+            seq        INTEGER PRIMARY KEY AUTOINCREMENT,
+            tabla      TEXT    NOT NULL,
+            clave      INTEGER NOT NULL,
+            operacion  TEXT    NOT NULL
+        )
+        """,
+    ]
+    for t, k in _TABLAS_REGISTRADAS:
+        alta = _ANOTAR.format(t=t, k=f"NEW.{k}", op="upsert")
+        baja = _ANOTAR.format(t=t, k=f"OLD.{k}", op="delete")
+        # si cambia la clave primaria la fila antigua desaparece
+        cambio_clave = (
+            "INSERT INTO registro_cambios (tabla, clave, operacion) "
+            f"SELECT '{t}', OLD.{k}, 'delete' WHERE OLD.{k} <> NEW.{k}"
+        )
+        sentencias += [
+            f"CREATE TRIGGER trg_{t}_insert AFTER INSERT ON {t} BEGIN {alta}; END",
+            f"CREATE TRIGGER trg_{t}_update AFTER UPDATE ON {t} BEGIN {cambio_clave}; {alta}; END",
+            f"CREATE TRIGGER trg_{t}_delete AFTER DELETE ON {t} BEGIN {baja}; END",
+        ]
+    return sentencias
+
+
+def _registro_mysql() -> List[str]:
+    sentencias = [
+        """
+        CREATE TABLE IF NOT EXISTS registro_cambios (
+            seq        BIGINT AUTO_INCREMENT PRIMARY KEY,
+            tabla      VARCHAR(20) NOT NULL,
+            clave      BIGINT      NOT NULL,
+            operacion  VARCHAR(6)  NOT NULL
+        ) ENGINE=InnoDB
+        """,
+        # InnoDB no dispara triggers en las acciones de clave ajena: las bajas
+        # en cascada de cuidados se anotan antes de borrar el animal
+        "CREATE TRIGGER trg_animales_delete_cuidados BEFORE DELETE ON animales "
+        "FOR EACH ROW INSERT INTO registro_cambios (tabla, clave, operacion) "
+        "SELECT 'cuidados', id, 'delete' FROM cuidados WHERE animal_id = OLD.chip",
+    ]
+    for t, k in _TABLAS_REGISTRADAS:
+        alta = _ANOTAR.format(t=t, k=f"NEW.{k}", op="upsert")
+        baja = _ANOTAR.format(t=t, k=f"OLD.{k}", op="delete")
+        sentencias += [
+            f"CREATE TRIGGER trg_{t}_insert AFTER INSERT ON {t} FOR EACH ROW {alta}",
+            f"CREATE TRIGGER trg_{t}_update AFTER UPDATE ON {t} FOR EACH ROW BEGIN "
+            f"IF OLD.{k} <> NEW.{k} THEN {baja}; END IF; {alta}; END",
+            f"CREATE TRIGGER trg_{t}_delete AFTER DELETE ON {t} FOR EACH ROW {baja}",
+        ]
+    return sentencias
+
+
+# ──────────────────────── Lista ordenada de migraciones ──────────────────────
+MIGRACIONES: Tuple[Migracion, ...] = (
+    Migracion(
+        1,
+        "Esquema inicial",
+        por_dialecto={"mysql": _TABLAS_MYSQL, "sqlite": _TABLAS_SQLITE},
+    ),
+    Migracion(
+        2,
+        "Índices secundarios para cuidados y animales",
+        sql=(
+            "CREATE INDEX idx_cuidados_animal_fecha ON cuidados (animal_id, fecha)",
+            "CREATE INDEX idx_cuidados_estado_fecha ON cuidados (estado, fecha)",
+            "CREATE INDEX idx_animales_especie ON animales (especie)",
+        ),
+    ),
+    Migracion(
+        3,
+        "Índice para el coste de tratamientos por mes",
+        sql=(
+            "CREATE INDEX idx_tratamientos_inicio_coste ON tratamientos (fecha_inicio, coste)",
+        ),
+    ),
+    Migracion(
+        4,
+        "Registro de cambios para sincronización incremental",
+        por_dialecto={"mysql": _registro_mysql(), "sqlite": _registro_sqlite()},
+    ),
+)
+
+
+# ──────────────────────── Ejecución ──────────────────────────────────────────
+# Segundos que un proceso espera a que otro termine de migrar (MySQL; en
+# SQLite espera `busy_timeout`)
+ESPERA_CERROJO = 300
+
+
+def version_actual(manager: "SQLManager", conn: Any = None) -> int:
+    """Devuelve la versión del esquema (0 si no se ha migrado nunca)."""
+    if conn is None:
+        with manager._connect() as conn:
+            return version_actual(manager, conn)
+    cur = manager._cursor(conn)
+    try:
+        cur.execute(
+            "CREATE TABLE IF NOT EXISTS schema_version ("
+            " version INTEGER PRIMARY KEY,"
+            " descripcion VARCHAR(200) NOT NULL,"
+            " aplicada_en VARCHAR(32) NOT NULL)"
+        )
+        cur.execute("SELECT MAX(version) FROM schema_version")
+        fila = cur.fetchone()
+    finally:
+        cur.close()
+    return fila[0] or 0
+
+
+@contextmanager
+def _cerrojo(manager: "SQLManager", conn: Any) -> Iterator[None]:
+    """
+    Excluye a otros procesos que migren la misma base durante el bloque.
+
+    - MySQL: `GET_LOCK` con nombre por base de datos, ligado a `conn`.
+    - SQLite: `BEGIN IMMEDIATE` (cerrojo de escritura); todo el bloque es
+      una transacción, también el DDL.
+    """
+    if manager.DIALECTO == "sqlite":
+        manager._ejecutar(conn, "BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+        return
+
+    nombre = "CONCAT(DATABASE(), '.migraciones')"
+    cur = manager._cursor(conn)
+    try:
+        cur.execute(f"SELECT GET_LOCK({nombre}, {int(ESPERA_CERROJO)})")
+        obtenido = cur.fetchone()[0]
+    finally:
+        cur.close()
+    if obtenido != 1:
+        raise RuntimeError(
+            f"Otro proceso lleva más de {ESPERA_CERROJO}s migrando el esquema."
+        )
+    try:
+        yield
+    finally:
+        cur = manager._cursor(conn)
+        try:
+            cur.execute(f"SELECT RELEASE_LOCK({nombre})")
+            cur.fetchone()
+        finally:
+            cur.close()
+
+
+def migrar(
+    manager: "SQLManager", migraciones: Sequence[Migracion] = MIGRACIONES
+) -> List[int]:
+    """
+    Aplica en orden las migraciones pendientes sobre `manager`.
+
+    Si hay alguna pendiente se toma un cerrojo entre procesos (`_cerrojo`) y
+    se vuelve a leer la versión: si dos procesos arrancan a la vez, el
+    segundo espera y encuentra el esquema ya migrado.  En MySQL cada
+    migración va en su propia transacción (el DDL hace commit implícito,
+    así que allí la garantía es por sentencia); en SQLite todas las
+    pendientes van en la transacción del cerrojo.
+
+    Returns
+    -------
+    List[int]
+        Versiones aplicadas en esta llamada (vacía si el esquema ya estaba al día).
+    """
+    ordenadas = sorted(migraciones, key=lambda m: m.version)
+    aplicadas: List[int] = []
+    with manager._connect() as conn:
+        if not ordenadas or ordenadas[-1].version <= version_actual(manager, conn):
+            return aplicadas
+        with _cerrojo(manager, conn):
+            actual = version_actual(manager, conn)
+            for migracion in ordenadas:
+                if migracion.version <= actual:
+                    continue
+                if manager.DIALECTO == "sqlite":
+                    _aplicar(manager, conn, migracion)
+                else:
+                    with manager._transaccion(conn):
+                        _aplicar(manager, conn, migracion)
+                aplicadas.append(migracion.version)
+    return aplicadas
+
+
+def _aplicar(manager: "SQLManager", conn: Any, migracion: Migracion) -> None:
+    """Ejecuta las sentencias de `migracion` y la anota en `schema_version`."""
+    cur = manager._cursor(conn)
+    try:
+        for sentencia in migracion.sentencias(manager.DIALECTO):
+            cur.execute(sentencia)
+        cur.execute(
+            "INSERT INTO schema_version (version, descripcion, aplicada_en) "
+            f"VALUES ({manager.P}, {manager.P}, {manager.P})",
+            (
+                migracion.version,
+                migracion.descripcion,
+                datetime.now().isoformat(timespec="seconds"),
+            ),
+        )
+    finally:
+        cur.close()
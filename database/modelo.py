@@ -0,0 +1,104 @@
+"""
+modelo.py
+
+`SeguimientoCambios`: mixin para las clases del modelo (Animal, Persona,
+CuidadoProgramado…) que se corresponden con una fila de la base de datos.
+
+Al cargar un objeto desde la BD se toma una instantánea de sus columnas;
+`cambios()` compara el estado actual con ella y `save()` envía un único
+UPDATE con las columnas modificadas (y ninguno si no ha cambiado nada), en
+lugar de reenviar el registro completo.
+
+Cada clase que lo usa define:
+
+    - `_CLAVE`: atributo con la clave primaria (p. ej. "id_animal").
+    - `_ACTUALIZAR`: método de `DBManager` que hace el UPDATE parcial
+      (p. ej. "update_animal").
+    - `_columnas()`: dict columna → valor actual, en el formato de la BD.
+"""
+
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from typing import Any, ClassVar, Dict, Optional
+
+
+class SeguimientoCambios(ABC):
+    """Seguimiento de columnas modificadas desde la última carga o guardado."""
+
+    _CLAVE: ClassVar[str] = "id"
+    _ACTUALIZAR: ClassVar[str] = ""
+
+    # instantánea de columnas y clave primaria; None si no viene de la BD
+    _original: Optional[Dict[str, Any]] = None
+    _clave_original: Any = None
+
+    @abstractmethod
+    def _columnas(self) -> Dict[str, Any]:
+        """Columnas del objeto (sin la clave primaria) en el formato de la BD."""
+        ...
+
+    def marcar_guardado(self, columnas: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Toma el estado actual como el guardado en la BD (tras cargar o guardar).
+
+        Parameters
+        ----------
+        columnas : dict, optional
+            Lo que devolvería `_columnas()`, si quien carga el objeto ya lo
+            tiene (p. ej. la fila leída); evita volver a calcularlo.
+        """
+        self._original = self._columnas() if columnas is None else columnas
+        self._clave_original = getattr(self, self._CLAVE, None)
+
+    def cambios(self) -> Dict[str, Any]:
+        """
+        Columnas cuyo valor difiere del guardado.  Si el objeto no se ha
+        cargado de la BD, todas.
+        """
+        actuales = self._columnas()
+        if self._original is None:
+            return actuales
+        return {c: v for c, v in actuales.items() if self._original.get(c) != v}
+
+    @property
+    def modificado(self) -> bool:
+        """True si hay cambios pendientes de guardar."""
+        return bool(self.cambios())
+
+    def save(self, db: Any = None) -> Dict[str, Any]:
+        """
+        Guarda en la BD solo las columnas modificadas con un único UPDATE.
+        Si no hay cambios no se hace ninguna llamada.
+
+        Parameters
+        ----------
+        db : DBManager, optional
+            Gestor a usar; por defecto `database.db`.
+
+        Returns
+        -------
+        Dict[str, Any]
+            Columnas enviadas (vacío si no había cambios).
+
+        Raises
+        ------
+        ValueError
+            Si el objeto no tiene clave primaria (no se ha guardado nunca).
+        """
+        cambios = self.cambios()
+        if not cambios:
+            return {}
+        clave = self._clave_original
+        if clave is None:
+            clave = getattr(self, self._CLAVE, None)
+        if clave is None:
+            raise ValueError(
+                f"{type(self).__name__} sin {self._CLAVE}: no existe en la BD; "
+                "créalo con el insert correspondiente."
+            )
+        if db is None:
+            from database import db
+        getattr(db, self._ACTUALIZAR)(clave, cambios)
+        self.marcar_guardado()
+        return cambios
@@ -3,6 +3,11 @@ mysql_manager.py
 
 Gestor concreto para MySQL/MariaDB.
 
+El CRUD lo implementa `SQLManager` (sql_base.py); aquí solo vive lo
+específico de MySQL.  Todas las operaciones comparten un pool acotado de
+conexiones (ver `database/pool.py`), de modo que el coste del *handshake* con
+el servidor se paga una vez por conexión y no una vez por sentencia.
+
 Requisitos:
     pip install mysql-connector-python
 """
@@ -10,30 +15,39 @@ Requisitos:
 from __future__ import annotations
 
 import os
-from typing import Any, Dict, List, Optional
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
 
 import mysql.connector
 from mysql.connector import Error
 
-from .db_base import DBManager
+from .migraciones import migrar
+from .pool import ConnectionPool
+from .sql_base import SQLManager
 
-class MySQLManager(DBManager):
+class MySQLManager(SQLManager):
     """
     Operaciones CRUD para la base de datos MySQL gestionando las tablas:
-    duenos, veterinarios, animales, cuidados y alimentos
+    duenos, veterinarios, animales, cuidados, alimentos, vacunas,
+    tratamientos y consultas
     """
 
+    DIALECTO = "mysql"
+
     # ──────────────────────────────── Configuración ──────────────────────────────────
-    def _init_(
+    def __init__(
         self,
         host: Optional[str] = None,
         port: Optional[int] = None,
         user: Optional[str] = None,
         password: Optional[str] = None,
         database: Optional[str] = None,
+        pool_size: Optional[int] = None,
+        pool_idle_timeout: Optional[float] = None,
+        pool_timeout: Optional[float] = None,
     ) -> None:
         """
-        Inicializa la configuración de conexión a la base de datos.
+        Inicializa la configuración de conexión y el pool de conexiones.
 
         Parameters
         ----------
@@ -47,6 +61,14 @@ class MySQLManager(DBManager):
             Contraseña de la base de datos. Por defecto, DB_PASS.
         database : str, optional
             Nombre de la base de datos. Por defecto, DB_NAME.
+        pool_size : int, optional
+            Máximo de conexiones abiertas a la vez. Por defecto, DB_POOL_SIZE o 5.
+        pool_idle_timeout : float, optional
+            Segundos de inactividad tras los que se cierra una conexión.
+            Por defecto, DB_POOL_IDLE_TIMEOUT o 300.
+        pool_timeout : float, optional
+            Segundos máximos de espera por una conexión libre.
+            Por defecto, DB_POOL_TIMEOUT o 30.
 
         Raises
         ------
@@ -61,11 +83,19 @@ class MySQLManager(DBManager):
             "database": database or os.getenv("DB_NAME", ""),
             "autocommit": True,
         }
+        self.pool = ConnectionPool(
+            self._open,
+            size=pool_size or int(os.getenv("DB_POOL_SIZE", 5)),
+            idle_timeout=pool_idle_timeout or float(os.getenv("DB_POOL_IDLE_TIMEOUT", 300)),
+            timeout=pool_timeout or float(os.getenv("DB_POOL_TIMEOUT", 30)),
+            check=lambda conn: conn.is_connected(),
+        )
+        super().__init__()
         self._init_db()
 
-    def _connect(self):
+    def _open(self):
         """
-        Establece y devuelve una nueva conexión MySQL.
+        Abre una conexión MySQL nueva (la usa el pool cuando necesita crecer).
 
         Returns
         -------
@@ -83,150 +113,83 @@ class MySQLManager(DBManager):
             print(" Error al conectar a MySQL:", e)
             raise
 
-    def _init_db(self) -> None:
+    @contextmanager
+    def _connect(self) -> Iterator[Any]:
         """
-        Crea las tablas necesarias si no existen.
+        Presta una conexión del pool durante el bloque `with`.
 
-        Tablas creadas:
-        - duenos
-        - veterinarios
-        - animales
-        - cuidados
-        - alimentos
+        Yields
+        ------
+        mysql.connector.connection.MySQLConnection
+            Conexión activa; vuelve al pool al salir del bloque.
 
         Raises
         ------
         Error
-            Si ocurre un error durante la creación de tablas.
-        """
-        ddl_duenos = """
-        CREATE TABLE IF NOT EXISTS duenos (
-            id_dueno      INT AUTO_INCREMENT PRIMARY KEY,
-            nif            VARCHAR(20) UNIQUE NOT NULL,
-            nombre         VARCHAR(100) NOT NULL,
-            direccion      VARCHAR(200) NOT NULL,
-            telefono       VARCHAR(20) NOT NULL
-        ) ENGINE=InnoDB;
-        """
-        ddl_veterinarios = """
-        CREATE TABLE IF NOT EXISTS veterinarios (
-            colegiado_id  INT AUTO_INCREMENT PRIMARY KEY,
-            nombre         VARCHAR(100) NOT NULL,
-            nif            VARCHAR(20) UNIQUE NOT NULL,
-            direccion      VARCHAR(200) NOT NULL,
-            telefono       VARCHAR(20) NOT NULL
-        ) ENGINE=InnoDB;
-        """
-        ddl_animales = """
-        CREATE TABLE IF NOT EXISTS animales (
-            id_animal       INT AUTO_INCREMENT PRIMARY KEY,
-            chip            VARCHAR(60) UNIQUE NOT NULL,
-            especie         VARCHAR(100) NOT NULL,
-            nombre          VARCHAR(100) NOT NULL,
-            edad            INT,
-            raza            VARCHAR(100),
-            dueno_id        INT,
-            colegiado_id    INT,
-            CONSTRAINT fk_dueno
-                FOREIGN KEY (dueno_id)
-                REFERENCES duenos(id_dueno),
-            CONSTRAINT fk_veterinario
-                FOREIGN KEY (colegiado_id)
-                REFERENCES veterinarios(colegiado_id)
-        ) ENGINE=InnoDB;
-        """
-        ddl_cuidados = """
-        CREATE TABLE IF NOT EXISTS cuidados (
-            id        INT AUTO_INCREMENT PRIMARY KEY,
-            animal_id VARCHAR(60)      NOT NULL,
-            fecha     DATE             NOT NULL,
-            tipo      VARCHAR(50)      NOT NULL,
-            estado    VARCHAR(20)      NOT NULL DEFAULT 'pendiente',
-            notas     TEXT,
-            CONSTRAINT fk_animal
-                FOREIGN KEY (animal_id)
-                REFERENCES animales(chip)
-                ON DELETE CASCADE
-        ) ENGINE=InnoDB;
-        """
-        ddl_alimentos = """
-        CREATE TABLE IF NOT EXISTS alimentos (
-            id               INT AUTO_INCREMENT PRIMARY KEY,
-            tipo_animal      VARCHAR(50)  NOT NULL,
-            alimento         VARCHAR(100) NOT NULL,
-            cantidad         INT          NOT NULL,
-            fecha_caducidad  DATE         NOT NULL,
-            coste            FLOAT        NOT NULL
-        ) ENGINE=InnoDB;
-        """
-
-        with self._connect() as conn:
-            cur = conn.cursor()
-            try:
-                cur.execute(ddl_duenos)
-                cur.execute(ddl_veterinarios)
-                cur.execute(ddl_animales)
-                cur.execute(ddl_cuidados)
-                cur.execute(ddl_alimentos)
-            finally:
-                cur.close()
-
-    # ──────────────────────────────── Dueños ──────────────────────────────────
-    def insert_dueno(self, datos: Dict[str, Any]) -> int:
-        """
-        Inserta un nuevo dueño en la tabla duenos.
+            Si la conexión falla.
+        PoolTimeoutError
+            Si no hay conexiones libres dentro del tiempo de espera.
+        """
+        with self.pool.connection() as conn:
+            yield conn
 
-        Parameters
-        ----------
-        datos : dict
-            Diccionario con las claves:
-            - nif (str): NIF del dueño.
-            - nombre (str): Nombre del dueño.
-            - direccion (str): Dirección del dueño.
-            - telefono (str): Teléfono del dueño.
+    @contextmanager
+    def _connect_stream(self) -> Iterator[Any]:
+        """
+        Conexión dedicada (fuera del pool) para los iteradores `iter_*`.
 
-        Returns
-        -------
-        int
-            ID autogenerado id_dueno.
+        Los cursores de mysql-connector no usan buffer: las filas llegan del
+        socket a medida que se piden con fetchmany.  Una exportación larga
+        retendría así una conexión del pool durante minutos; con una propia
+        las peticiones normales no se quedan sin conexiones.
+        """
+        conn = self._open()
+        try:
+            yield conn
+        finally:
+            conn.close()      # descarta también las filas no leídas
 
-        Raises
-        ------
-        Error
-            Si ocurre un error durante la inserción.
+    def _abortar_stream(self, cur: Any) -> None:
+        """
+        Con filas pendientes `cur.close()` falla ("Unread result found") y
+        vaciarlas costaría leer el resto; se deja que `_connect_stream`
+        cierre la conexión, lo que las descarta en el servidor.
         """
-        q = (
-            "INSERT INTO duenos (nif, nombre, direccion, telefono) "
-            "VALUES (%(nif)s, %(nombre)s, %(direccion)s, %(telefono)s)"
-        )
-        with self._connect() as conn:
-            cur = conn.cursor()
-            try:
-                cur.execute(q, datos)
-                return cur.lastrowid
-            finally:
-                cur.close()
 
-    def get_duenos(self) -> List[Dict[str, Any]]:
+    def _cursor(self, conn: Any, dictionary: bool = False) -> Any:
+        """Cursor MySQL; con `dictionary=True` devuelve filas como dicts."""
+        return conn.cursor(dictionary=dictionary)
+
+    def _on_conflict(self, unica: str, cols: List[str]) -> str:
+        """
+        `ON DUPLICATE KEY UPDATE` con `VALUES(col)` (válido en MySQL y MariaDB).
         """
-        Obtiene todos los registros de la tabla duenos.
+        if not cols:
+            return f"ON DUPLICATE KEY UPDATE {unica} = {unica}"
+        return "ON DUPLICATE KEY UPDATE " + ", ".join(f"{c} = VALUES({c})" for c in cols)
 
-        Returns
-        -------
-        List[Dict[str, Any]]
-            Lista de diccionarios con los campos:
-            id_dueno, nif, nombre, direccion, telefono.
+    def _ids_lote(self, cur: Any, n: int) -> List[int]:
+        """
+        En un INSERT multi-fila `lastrowid` es el ID de la *primera* fila; InnoDB
+        reserva los n valores seguidos para las inserciones simples.
+        """
+        return list(range(cur.lastrowid, cur.lastrowid + n))
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """Devuelve las estadísticas del pool (préstamos, esperas, etc.)."""
+        return self.pool.stats()
+
+    def close(self) -> None:
+        """Cierra las conexiones ociosas del pool."""
+        self.pool.close_all()
+
+    def _init_db(self) -> None:
+        """
+        Aplica las migraciones de esquema pendientes (ver migraciones.py).
 
         Raises
         ------
         Error
-            Si ocurre un error durante la consulta.
-        """
-        q = "SELECT id_dueno, nif, nombre, direccion, telefono FROM duenos"
-        with self._connect() as conn:
-            cur = conn.cursor(dictionary=True)
-            try:
-                cur.execute(q)
-                return cur.fetchall()
-            finally:
-                cur.close()
\ No newline at end of file
+            Si ocurre un error durante la migración.
+        """
+        migrar(self)
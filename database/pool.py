@@ -0,0 +1,233 @@
+"""
+pool.py
+
+Pool de conexiones acotado y seguro entre hilos para los gestores de base de
+datos.  En lugar de abrir una conexión nueva por cada sentencia, los gestores
+piden prestada una conexión al pool y la devuelven al terminar.
+
+Características:
+    - Tamaño máximo (`size`): nunca hay más conexiones abiertas que esto.
+    - Caducidad por inactividad (`idle_timeout`): las conexiones que llevan
+      demasiado tiempo paradas se cierran en lugar de reutilizarse.
+    - Comprobación al préstamo (`check`): se valida cada conexión antes de
+      entregarla y se descarta si está rota.
+    - Estadísticas de espera: préstamos, esperas y tiempo total/máximo que
+      los hilos han esperado por una conexión libre.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, Optional, Tuple
+
+
+class PoolTimeoutError(RuntimeError):
+    """No quedó ninguna conexión libre dentro del tiempo de espera."""
+
+
+class ConnectionPool:
+    """
+    Pool acotado de conexiones reutilizables.
+
+    Parameters
+    ----------
+    factory : Callable[[], Any]
+        Función que abre y devuelve una conexión nueva.
+    size : int
+        Número máximo de conexiones abiertas a la vez.
+    idle_timeout : float
+        Segundos que una conexión puede estar ociosa antes de cerrarse.
+    timeout : float
+        Segundos máximos que `acquire()` espera por una conexión libre.
+    check : Callable[[Any], bool], optional
+        Comprobación de salud ejecutada en cada préstamo; si devuelve `False`
+        o lanza una excepción la conexión se descarta.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], Any],
+        *,
+        size: int = 5,
+        idle_timeout: float = 300.0,
+        timeout: float = 30.0,
+        check: Optional[Callable[[Any], bool]] = None,
+    ) -> None:
+        if size < 1:
+            raise ValueError("El tamaño del pool debe ser al menos 1.")
+        self._factory = factory
+        self._check = check
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+
+        self._cond = threading.Condition()
+        self._idle: Deque[Tuple[Any, float]] = deque()
+        self._abiertas = 0
+
+        # estadísticas
+        self._prestamos = 0
+        self._esperas = 0
+        self._espera_total = 0.0
+        self._espera_max = 0.0
+        self._creadas = 0
+        self._descartadas = 0
+
+    # ─────────────────────────────── Préstamo ────────────────────────────────
+    def acquire(self) -> Any:
+        """
+        Devuelve una conexión sana, reutilizando una ociosa si la hay.
+
+        Raises
+        ------
+        PoolTimeoutError
+            Si tras `timeout` segundos no se ha liberado ninguna conexión.
+        """
+        inicio = time.monotonic()
+        limite = inicio + self.timeout
+        espero = False
+
+        while True:
+            conn = None
+            crear = False
+            with self._cond:
+                while True:
+                    if self._idle:
+                        conn, ultimo_uso = self._idle.pop()
+                        if time.monotonic() - ultimo_uso > self.idle_timeout:
+                            self._abiertas -= 1
+                            self._descartadas += 1
+                            self._cerrar(conn)
+                            conn = None
+                            continue
+                        break
+                    if self._abiertas < self.size:
+                        self._abiertas += 1
+                        crear = True
+                        break
+                    restante = limite - time.monotonic()
+                    if restante <= 0:
+                        raise PoolTimeoutError(
+                            f"Sin conexiones libres tras {self.timeout}s "
+                            f"(pool de {self.size})."
+                        )
+                    espero = True
+                    self._cond.wait(restante)
+
+            # La E/S (abrir o comprobar) se hace fuera del cerrojo.
+            if crear:
+                try:
+                    conn = self._factory()
+                except BaseException:
+                    with self._cond:
+                        self._abiertas -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._creadas += 1
+            elif not self._sana(conn):
+                with self._cond:
+                    self._abiertas -= 1
+                    self._descartadas += 1
+                    self._cond.notify()
+                self._cerrar(conn)
+                continue
+
+            esperado = time.monotonic() - inicio
+            with self._cond:
+                self._prestamos += 1
+                if espero:
+                    self._esperas += 1
+                self._espera_total += esperado
+                self._espera_max = max(self._espera_max, esperado)
+            return conn
+
+    def release(self, conn: Any, *, discard: bool = False) -> None:
+        """
+        Devuelve `conn` al pool.  Con `discard=True` se cierra en su lugar
+        (útil cuando la conexión ha quedado en un estado dudoso).
+        """
+        with self._cond:
+            if discard:
+                self._abiertas -= 1
+                self._descartadas += 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+        if discard:
+            self._cerrar(conn)
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """
+        Presta una conexión durante el bloque `with` y la devuelve al salir.
+
+        Si el bloque lanza una excepción la conexión se descarta: puede tener
+        el socket roto o una transacción a medias, y no debe recibirla el
+        siguiente que la pida.
+        """
+        conn = self.acquire()
+        try:
+            yield conn
+        except BaseException:
+            self.release(conn, discard=True)
+            raise
+        self.release(conn)
+
+    # ──────────────────────────────── Gestión ────────────────────────────────
+    def close_all(self) -> None:
+        """Cierra todas las conexiones ociosas (las prestadas no se tocan)."""
+        with self._cond:
+            ociosas = [c for c, _ in self._idle]
+            self._idle.clear()
+            self._abiertas -= len(ociosas)
+            self._cond.notify_all()
+        for conn in ociosas:
+            self._cerrar(conn)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Devuelve una instantánea de las estadísticas del pool.
+
+        Returns
+        -------
+        Dict[str, Any]
+            size, abiertas, ociosas, en_uso, creadas, descartadas, prestamos,
+            esperas, espera_total_s, espera_media_s y espera_max_s.
+        """
+        with self._cond:
+            ociosas = len(self._idle)
+            return {
+                "size": self.size,
+                "abiertas": self._abiertas,
+                "ociosas": ociosas,
+                "en_uso": self._abiertas - ociosas,
+                "creadas": self._creadas,
+                "descartadas": self._descartadas,
+                "prestamos": self._prestamos,
+                "esperas": self._esperas,
+                "espera_total_s": self._espera_total,
+                "espera_media_s": (
+                    self._espera_total / self._prestamos if self._prestamos else 0.0
+                ),
+                "espera_max_s": self._espera_max,
+            }
+
+    # ─────────────────────────────── Auxiliares ──────────────────────────────
+    def _sana(self, conn: Any) -> bool:
+        if self._check is None:
+            return True
+        try:
+            return bool(self._check(conn))
+        except Exception:
+            return False
+
+    @staticmethod
+    def _cerrar(conn: Any) -> None:
+        try:
+            conn.close()
+        except Exception:
+            pass
@@ -0,0 +1,1167 @@
+"""
+sql_base.py
+
+Implementación común del CRUD para los gestores SQL (MySQL, SQLite, …).
+
+`SQLManager` construye las sentencias a partir del esquema común de
+`db_base` (COLUMNAS/CLAVES).  Cada gestor concreto solo aporta lo que depende
+del motor:
+
+    - `_connect()`: context manager que entrega una conexión (el código
+      común pide siempre `_conexion()`, que reutiliza la de la
+      `transaction()` en curso si la hay).
+    - `_cursor(conn, dictionary)`: cursor que devuelve tuplas o dicts.
+    - `P` / `_p(nombre)`: marcadores de parámetro posicional y con nombre.
+    - `_ids_lote(cur, n)`: IDs generados por un INSERT multi-fila.
+    - `_connect_stream()` / `_abortar_stream(cur)` (opcionales): conexión y
+      cierre para los iteradores `iter_*`.
+    - `DIALECTO`: nombre del motor, para elegir el DDL de migraciones.py.
+
+Con `metricas` asignado (ver metricas.py) se mide cada sentencia y el
+tiempo que se espera por cada conexión.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from abc import abstractmethod
+from contextlib import contextmanager, nullcontext
+from typing import (
+    Any, ContextManager, Dict, Iterable, Iterator, List, Optional, Tuple,
+)
+
+from .db_base import CLAVES, COLUMNAS, DBManager, mismo_valor
+from .metricas import Medicion, MetricasDB
+
+
+class SQLManager(DBManager):
+    """CRUD genérico sobre las tablas de la clínica para motores SQL."""
+
+    # nombre del motor ("mysql", "sqlite"); lo usan las migraciones
+    DIALECTO: str = ""
+    # marcador de parámetro posicional del driver ("%s" en MySQL, "?" en SQLite)
+    P: str = "%s"
+    # máximo de parámetros por sentencia que admite el motor
+    MAX_PARAMS: int = 65535
+    # si se asigna, cada sentencia y espera de conexión se mide (metricas.py)
+    metricas: Optional[MetricasDB] = None
+    # segundos que `cambios_desde` espera a que un hueco en los `seq` del
+    # registro de cambios se llene (transacción aún sin confirmar)
+    ESPERA_HUECOS: float = 10.0
+    # huecos recordados (primer seq que falta → cuándo se vio por primera vez)
+    MAX_HUECOS: int = 10000
+    # últimas entradas del registro en las que `ultimo_cambio` busca huecos
+    COLA_HUECOS: int = 100
+
+    # ──────────────────────────────── Dialecto ──────────────────────────────────
+    @abstractmethod
+    def _connect(self) -> ContextManager[Any]:
+        """Context manager que entrega una conexión lista para usar."""
+        ...
+
+    @abstractmethod
+    def _cursor(self, conn: Any, dictionary: bool = False) -> Any:
+        """Abre un cursor; con `dictionary=True` las filas salen como dicts."""
+        ...
+
+    def _p(self, nombre: str) -> str:
+        """Marcador de parámetro con nombre (estilo `pyformat` por defecto)."""
+        return f"%({nombre})s"
+
+    @abstractmethod
+    def _ids_lote(self, cur: Any, n: int) -> List[int]:
+        """IDs autogenerados por el último INSERT de `n` filas de `cur`, en orden."""
+        ...
+
+    def _connect_stream(self) -> ContextManager[Any]:
+        """
+        Conexión para recorrer resultados grandes con `_iterar`.  Por defecto
+        la normal; los gestores con pool la sobreescriben para no retener
+        una conexión del pool durante toda la exportación.
+        """
+        return self._connect()
+
+    def _abortar_stream(self, cur: Any) -> None:
+        """Cierra un cursor de `_iterar` abandonado antes de leer todas las filas."""
+        cur.close()
+
+    # ──────────────────────────────── Transacciones ──────────────────────────────────
+    def __init__(self) -> None:
+        # conexión fijada por `transaction()` en cada hilo y nivel de anidamiento
+        self._tx_local = threading.local()
+        self._huecos: Dict[int, float] = {}
+        self._huecos_lock = threading.Lock()
+
+    def _conexion_fijada(self) -> Optional[Any]:
+        """Conexión de la `transaction()` abierta en este hilo, o None."""
+        return getattr(self._tx_local, "conn", None)
+
+    @contextmanager
+    def _conexion(self) -> Iterator[Any]:
+        """
+        Conexión para una operación: la de la transacción en curso del hilo
+        si la hay; si no, una nueva de `_connect()`.
+        """
+        conn = self._conexion_fijada()
+        if conn is not None:
+            yield conn
+            return
+        with self._medir_espera(self._connect()) as conn:
+            yield conn
+
+    @contextmanager
+    def _medir_espera(self, conexion: ContextManager[Any]) -> Iterator[Any]:
+        """Entra en `conexion` anotando en `metricas` lo que tarda en entregarla."""
+        inicio = time.perf_counter()
+        with conexion as conn:
+            if self.metricas is not None:
+                self.metricas.espera_conexion(time.perf_counter() - inicio)
+            yield conn
+
+    def _medir(self, q: str, params: Any = None) -> ContextManager[Medicion]:
+        """Mide la sentencia `q` si hay `metricas`; el bloque anota las filas."""
+        if self.metricas is None:
+            return nullcontext(Medicion())
+        return self.metricas.sentencia(q, params)
+
+    def _ejecutar(self, conn: Any, sentencia: str) -> None:
+        cur = self._cursor(conn)
+        try:
+            cur.execute(sentencia)
+        finally:
+            cur.close()
+
+    @contextmanager
+    def _transaccion(self, conn: Any) -> Iterator[Any]:
+        """
+        Agrupa lo ejecutado en el bloque en una transacción sobre `conn`.
+
+        Dentro de una `transaction()` ya abierta usa un SAVEPOINT: si el
+        bloque falla solo se deshace lo suyo y la transacción exterior sigue.
+        """
+        estado = self._tx_local
+        fijada = conn is self._conexion_fijada()
+        if fijada and estado.nivel:
+            nombre = f"sp_{estado.nivel}"
+            self._ejecutar(conn, f"SAVEPOINT {nombre}")
+            estado.nivel += 1
+            try:
+                yield conn
+            except BaseException:
+                self._ejecutar(conn, f"ROLLBACK TO SAVEPOINT {nombre}")
+                raise
+            finally:
+                estado.nivel -= 1
+                self._ejecutar(conn, f"RELEASE SAVEPOINT {nombre}")
+            return
+
+        self._ejecutar(conn, "BEGIN")
+        if fijada:
+            estado.nivel = 1
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            if fijada:
+                estado.nivel = 0
+        with self._medir("COMMIT"):
+            conn.commit()
+
+    @contextmanager
+    def transaction(self) -> Iterator["SQLManager"]:
+        """
+        Unidad de trabajo: fija una conexión para el hilo actual y ejecuta
+        todo lo que se haga en el bloque (con este gestor) en una sola
+        transacción, con un único commit al salir.  Si el bloque lanza una
+        excepción se hace rollback.
+
+        Las transacciones anidadas se convierten en SAVEPOINT.
+        """
+        if self._conexion_fijada() is not None:
+            with self._transaccion(self._conexion_fijada()):
+                yield self
+            return
+        with self._medir_espera(self._connect()) as conn:
+            self._tx_local.conn = conn
+            self._tx_local.nivel = 0
+            try:
+                with self._transaccion(conn):
+                    yield self
+            finally:
+                self._tx_local.conn = None
+
+    # ──────────────────────────────── Auxiliares ──────────────────────────────────
+    def _insert(self, tabla: str, datos: Dict[str, Any]) -> int:
+        """INSERT con las columnas de `tabla` presentes en `datos`; devuelve el ID."""
+        cols = [c for c in COLUMNAS[tabla] if c in datos]
+        q = (
+            f"INSERT INTO {tabla} ({', '.join(cols)}) "
+            f"VALUES ({', '.join(self._p(c) for c in cols)})"
+        )
+        params = {c: datos[c] for c in cols}
+        with self._conexion() as conn:
+            cur = self._cursor(conn)
+            try:
+                with self._medir(q, params) as m:
+                    cur.execute(q, params)
+                    m.filas = 1
+                return cur.lastrowid
+            finally:
+                cur.close()
+
+    def _insert_many(
+        self, tabla: str, filas: Iterable[Dict[str, Any]], chunk_size: int
+    ) -> List[int]:
+        """
+        Inserta `filas` en `tabla` con INSERT multi-fila de hasta `chunk_size`
+        filas, todo dentro de una transacción.  Devuelve los IDs en orden.
+        """
+        if chunk_size < 1:
+            raise ValueError("chunk_size debe ser al menos 1.")
+        ids: List[int] = []
+        with self._conexion() as conn, self._transaccion(conn):
+            cur = self._cursor(conn)
+            try:
+                for cols, lote in self._lotes(tabla, filas, chunk_size):
+                    marcas = "(" + ", ".join([self.P] * len(cols)) + ")"
+                    q = (
+                        f"INSERT INTO {tabla} ({', '.join(cols)}) "
+                        f"VALUES {', '.join([marcas] * len(lote))}"
+                    )
+                    params = [f[c] for f in lote for c in cols]
+                    with self._medir(q, params) as m:
+                        cur.execute(q, params)
+                        m.filas = len(lote)
+                    if CLAVES[tabla] in cols:
+                        ids.extend(f[CLAVES[tabla]] for f in lote)
+                    else:
+                        ids.extend(self._ids_lote(cur, len(lote)))
+            finally:
+                cur.close()
+        return ids
+
+    def _on_conflict(self, unica: str, cols: List[str]) -> str:
+        """
+        Cláusula de upsert sobre la columna UNIQUE `unica` que sobrescribe
+        `cols` con los valores propuestos (sintaxis de SQLite/PostgreSQL;
+        MySQL la sobreescribe).
+        """
+        if not cols:
+            return f"ON CONFLICT ({unica}) DO NOTHING"
+        return f"ON CONFLICT ({unica}) DO UPDATE SET " + ", ".join(
+            f"{c} = excluded.{c}" for c in cols
+        )
+
+    def _upsert(
+        self, tabla: str, unica: str, filas: Iterable[Dict[str, Any]], chunk_size: int
+    ) -> Dict[str, int]:
+        """
+        Inserta o actualiza `filas` identificándolas por la columna UNIQUE
+        `unica`, en una transacción.
+
+        Por cada lote se leen las filas existentes con una sola SELECT ... IN
+        para clasificarlas; las nuevas se envían en un INSERT multi-fila con
+        upsert (por si otra conexión las crea entretanto) y las modificadas en
+        un UPDATE con CASE.  Las que no cambian no se escriben.  Si una clave
+        se repite en el lote manda su última aparición; la clave se compara
+        como texto (columna VARCHAR).
+
+        Returns
+        -------
+        Dict[str, int]
+            Recuentos "insertados", "actualizados" y "sin_cambios".
+
+        Raises
+        ------
+        ValueError
+            Si alguna fila no incluye `unica` o `chunk_size` < 1.
+        """
+        if chunk_size < 1:
+            raise ValueError("chunk_size debe ser al menos 1.")
+        cuenta = {"insertados": 0, "actualizados": 0, "sin_cambios": 0}
+        with self._conexion() as conn, self._transaccion(conn):
+            cur = self._cursor(conn, dictionary=True)
+            try:
+                for cols, lote in self._lotes(tabla, filas, chunk_size):
+                    if unica not in cols:
+                        raise ValueError(f"Cada fila debe incluir '{unica}'.")
+                    # la clave se guarda y se compara como texto (columna VARCHAR)
+                    por_clave = {str(f[unica]): {**f, unica: str(f[unica])} for f in lote}
+                    claves = list(por_clave)
+                    q = (
+                        f"SELECT {', '.join(cols)} FROM {tabla} "
+                        f"WHERE {unica} IN ({', '.join([self.P] * len(claves))})"
+                    )
+                    with self._medir(q, claves) as m:
+                        cur.execute(q, claves)
+                        existentes = {str(f[unica]): f for f in cur.fetchall()}
+                        m.filas = len(existentes)
+
+                    resto = [c for c in cols if c != unica]
+                    nuevas: List[Dict[str, Any]] = []
+                    cambiadas: List[Dict[str, Any]] = []
+                    for clave, fila in por_clave.items():
+                        actual = existentes.get(clave)
+                        if actual is None:
+                            nuevas.append(fila)
+                        elif not all(mismo_valor(actual[c], fila[c]) for c in resto):
+                            cambiadas.append(fila)
+                    cuenta["insertados"] += len(nuevas)
+                    cuenta["actualizados"] += len(cambiadas)
+                    cuenta["sin_cambios"] += len(por_clave) - len(nuevas) - len(cambiadas)
+
+                    if nuevas:
+                        marcas = "(" + ", ".join([self.P] * len(cols)) + ")"
+                        q = (
+                            f"INSERT INTO {tabla} ({', '.join(cols)}) "
+                            f"VALUES {', '.join([marcas] * len(nuevas))} "
+                            + self._on_conflict(unica, resto)
+                        )
+                        params = [f[c] for f in nuevas for c in cols]
+                        with self._medir(q, params) as m:
+                            cur.execute(q, params)
+                            m.filas = len(nuevas)
+                    # cada fila usa 2 parámetros por columna en los CASE y 1 en el IN
+                    # (sin más columnas que la clave nunca hay filas cambiadas)
+                    por_update = max(1, self.MAX_PARAMS // (2 * len(resto) + 1))
+                    for k in range(0, len(cambiadas), por_update):
+                        self._update_por_clave(cur, tabla, unica, resto, cambiadas[k:k + por_update])
+            finally:
+                cur.close()
+        return cuenta
+
+    def _update_por_clave(
+        self, cur: Any, tabla: str, unica: str, cols: List[str], filas: List[Dict[str, Any]]
+    ) -> None:
+        """
+        Un único UPDATE para varias filas con valores distintos:
+        `SET col = CASE unica WHEN ? THEN ? ... END WHERE unica IN (...)`.
+        """
+        casos = " ".join([f"WHEN {self.P} THEN {self.P}"] * len(filas))
+        sets = ", ".join(f"{c} = CASE {unica} {casos} END" for c in cols)
+        q = (
+            f"UPDATE {tabla} SET {sets} "
+            f"WHERE {unica} IN ({', '.join([self.P] * len(filas))})"
+        )
+        params: List[Any] = []
+        for c in cols:
+            for f in filas:
+                params += [f[unica], f[c]]
+        params += [f[unica] for f in filas]
+        with self._medir(q, params) as m:
+            cur.execute(q, params)
+            m.filas = len(filas)
+
+    def _lotes(
+        self, tabla: str, filas: Iterable[Dict[str, Any]], chunk_size: int
+    ) -> Iterator[Tuple[Tuple[str, ...], List[Dict[str, Any]]]]:
+        """
+        Agrupa filas consecutivas con las mismas columnas en lotes de como
+        mucho `chunk_size` filas (y `MAX_PARAMS` parámetros).  Consume
+        `filas` de forma perezosa.
+        """
+        cols: Tuple[str, ...] = ()
+        lote: List[Dict[str, Any]] = []
+        limite = chunk_size
+        for fila in filas:
+            cols_fila = tuple(c for c in COLUMNAS[tabla] if c in fila)
+            if lote and (cols_fila != cols or len(lote) >= limite):
+                yield cols, lote
+                lote = []
+            if not lote:
+                cols = cols_fila
+                limite = max(1, min(chunk_size, self.MAX_PARAMS // max(1, len(cols))))
+            lote.append(fila)
+        if lote:
+            yield cols, lote
+
+    def _select(self, q: str, params: Any = ()) -> List[Dict[str, Any]]:
+        """Ejecuta una SELECT y devuelve todas las filas como dicts."""
+        with self._conexion() as conn:
+            cur = self._cursor(conn, dictionary=True)
+            try:
+                with self._medir(q, params) as m:
+                    cur.execute(q, params)
+                    filas = cur.fetchall()
+                    m.filas = len(filas)
+                return filas
+            finally:
+                cur.close()
+
+    def _consulta_listado(
+        self,
+        tabla: str,
+        columnas: str,
+        filtros: Optional[Dict[str, Any]] = None,
+        limit: Optional[int] = None,
+        after: Optional[Any] = None,
+        ordenar: bool = False,
+    ) -> Tuple[str, List[Any]]:
+        """
+        Construye la SELECT de `columnas` en `tabla` con filtros de igualdad
+        y paginación por clave primaria:
+        `WHERE clave > after ORDER BY clave LIMIT limit`.
+        """
+        clave = CLAVES[tabla]
+        condiciones: List[str] = []
+        params: List[Any] = []
+        for col, valor in (filtros or {}).items():
+            condiciones.append(f"{col} = {self.P}")
+            params.append(valor)
+        if after is not None:
+            condiciones.append(f"{clave} > {self.P}")
+            params.append(after)
+        q = f"SELECT {columnas} FROM {tabla}"
+        if condiciones:
+            q += " WHERE " + " AND ".join(condiciones)
+        if ordenar or limit is not None or after is not None:
+            q += f" ORDER BY {clave}"
+        if limit is not None:
+            if limit < 1:
+                raise ValueError("limit debe ser al menos 1.")
+            q += f" LIMIT {int(limit)}"
+        return q, params
+
+    def _listar(
+        self,
+        tabla: str,
+        columnas: str,
+        filtros: Optional[Dict[str, Any]] = None,
+        limit: Optional[int] = None,
+        after: Optional[Any] = None,
+    ) -> List[Dict[str, Any]]:
+        """Ejecuta `_consulta_listado` y devuelve las filas como dicts."""
+        q, params = self._consulta_listado(tabla, columnas, filtros, limit, after)
+        return self._select(q, params)
+
+    def _iterar(self, q: str, params: Any, batch_size: int) -> Iterator[Dict[str, Any]]:
+        """
+        Ejecuta `q` y va entregando las filas de `batch_size` en
+        `batch_size` (fetchmany) sin materializar el resultado completo.
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size debe ser al menos 1.")
+        fijada = self._conexion_fijada() is not None
+        # dentro de una transaction() se lee por su conexión para ver sus cambios
+        conexion = self._conexion() if fijada else self._medir_espera(self._connect_stream())
+        with conexion as conn:
+            cur = self._cursor(conn, dictionary=True)
+            agotado = False
+            try:
+                # se mide hasta que se agota o se abandona el recorrido
+                with self._medir(q, params) as m:
+                    cur.execute(q, params)
+                    while True:
+                        filas = cur.fetchmany(batch_size)
+                        if not filas:
+                            agotado = True
+                            break
+                        m.filas += len(filas)
+                        yield from filas
+            finally:
+                if agotado:
+                    cur.close()
+                elif fijada:
+                    # la conexión sigue en uso: hay que vaciar el resultado
+                    cur.fetchall()
+                    cur.close()
+                else:
+                    self._abortar_stream(cur)
+
+    def _agregar(
+        self,
+        tabla: str,
+        grupos: Dict[str, str],
+        agregados: Dict[str, str],
+        columna_fecha: Optional[str] = None,
+        desde: Optional[str] = None,
+        hasta: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        `SELECT grupos, agregados FROM tabla GROUP BY grupos ORDER BY grupos`,
+        opcionalmente limitada a `desde <= columna_fecha <= hasta`.
+
+        `grupos` y `agregados` van de alias a expresión SQL.  Las fechas se
+        agrupan con SUBSTR, que MySQL aplica sobre la forma 'YYYY-MM-DD' de
+        DATE y SQLite sobre el TEXT guardado: ambos devuelven texto.
+        """
+        condiciones: List[str] = []
+        params: List[Any] = []
+        if desde is not None:
+            condiciones.append(f"{columna_fecha} >= {self.P}")
+            params.append(desde)
+        if hasta is not None:
+            condiciones.append(f"{columna_fecha} <= {self.P}")
+            params.append(hasta)
+        columnas = [f"{e} AS {a}" for a, e in grupos.items()]
+        columnas += [f"{e} AS {a}" for a, e in agregados.items()]
+        q = f"SELECT {', '.join(columnas)} FROM {tabla}"
+        if condiciones:
+            q += " WHERE " + " AND ".join(condiciones)
+        q += f" GROUP BY {', '.join(grupos.values())} ORDER BY {', '.join(grupos)}"
+        return self._select(q, params)
+
+    def _select_one(self, tabla: str, clave: Any) -> Optional[Dict[str, Any]]:
+        """Devuelve la fila de `tabla` con clave primaria `clave` o None."""
+        filas = self._select(
+            f"SELECT * FROM {tabla} WHERE {CLAVES[tabla]} = {self.P}", (clave,)
+        )
+        return filas[0] if filas else None
+
+    def _update(self, tabla: str, clave: Any, datos: Dict[str, Any]) -> None:
+        """
+        UPDATE de las columnas indicadas en `datos` para la fila `clave`.
+
+        Raises
+        ------
+        ValueError
+            Si `datos` contiene columnas que no existen en `tabla`.
+        """
+        if not datos:
+            return
+        desconocidas = set(datos) - set(COLUMNAS[tabla])
+        if desconocidas:
+            raise ValueError(
+                f"Columnas no válidas para '{tabla}': {sorted(desconocidas)}"
+            )
+        sets = ", ".join(f"{c} = {self._p(c)}" for c in datos)
+        q = f"UPDATE {tabla} SET {sets} WHERE {CLAVES[tabla]} = {self._p('_clave')}"
+        params = {**datos, "_clave": clave}
+        with self._conexion() as conn:
+            cur = self._cursor(conn)
+            try:
+                with self._medir(q, params) as m:
+                    cur.execute(q, params)
+                    m.filas = max(cur.rowcount, 0)
+            finally:
+                cur.close()
+
+    def _delete(self, tabla: str, clave: Any) -> None:
+        """Elimina la fila de `tabla` con clave primaria `clave`."""
+        q = f"DELETE FROM {tabla} WHERE {CLAVES[tabla]} = {self.P}"
+        with self._conexion() as conn:
+            cur = self._cursor(conn)
+            try:
+                with self._medir(q, (clave,)) as m:
+                    cur.execute(q, (clave,))
+                    m.filas = max(cur.rowcount, 0)
+            finally:
+                cur.close()
+
+    # ──────────────────────────────── Animales ──────────────────────────────────
+    def insert_animal(self, datos: Dict[str, Any]) -> int:
+        """Inserta un animal (chip, especie, nombre, edad, raza…) y devuelve su ID."""
+        return self._insert("animales", datos)
+
+    def insert_many_animales(
+        self, filas: Iterable[Dict[str, Any]], chunk_size: int = 500
+    ) -> List[int]:
+        """Inserta varios animales en una transacción; devuelve sus IDs en orden."""
+        return self._insert_many("animales", filas, chunk_size)
+
+    def upsert_animales(
+        self, filas: Iterable[Dict[str, Any]], chunk_size: int = 500
+    ) -> Dict[str, int]:
+        """Inserta o actualiza animales por `chip`; devuelve los recuentos."""
+        return self._upsert("animales", "chip", filas, chunk_size)
+
+    def get_animales(
+        self,
+        *,
+        limit: Optional[int] = None,
+        after: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Devuelve los registros de la tabla animales (paginables por id_animal)."""
+        return self._listar(
+            "animales",
+            "id_animal, chip, especie, nombre, edad, raza, dueno_id, colegiado_id",
+            limit=limit,
+            after=after,
+        )
+
+    def get_animal_by_chip(self, chip: Any) -> Optional[Dict[str, Any]]:
+        """
+        Animal con ese chip o None.  El chip se pasa como texto: en MySQL
+        comparar la columna VARCHAR con un número obliga a convertir cada
+        fila y descarta el índice UNIQUE.
+        """
+        filas = self._select(
+            "SELECT id_animal, chip, especie, nombre, edad, raza, dueno_id, colegiado_id "
+            f"FROM animales WHERE chip = {self.P}",
+            (str(chip),),
+        )
+        return filas[0] if filas else None
+
+    def get_animales_by_chips(self, chips: Iterable[Any]) -> Dict[str, Dict[str, Any]]:
+        """Animales de `chips` (chip → fila) con una SELECT ... IN por cada MAX_PARAMS chips."""
+        unicos = list(dict.fromkeys(str(c) for c in chips))
+        encontrados: Dict[str, Dict[str, Any]] = {}
+        for i in range(0, len(unicos), self.MAX_PARAMS):
+            trozo = unicos[i:i + self.MAX_PARAMS]
+            for fila in self._select(
+                "SELECT id_animal, chip, especie, nombre, edad, raza, dueno_id, colegiado_id "
+                f"FROM animales WHERE chip IN ({', '.join([self.P] * len(trozo))})",
+                trozo,
+            ):
+                encontrados[fila["chip"]] = fila
+        return encontrados
+
+    def iter_animales(self, batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        """Recorre todos los animales en orden de id_animal con memoria constante."""
+        q, params = self._consulta_listado(
+            "animales",
+            "id_animal, chip, especie, nombre, edad, raza, dueno_id, colegiado_id",
+            ordenar=True,
+        )
+        return self._iterar(q, params, batch_size)
+
+    def update_animal(self, animal_id: int, datos: Dict[str, Any]) -> None:
+        """Actualiza los campos indicados en `datos` para el animal `animal_id`."""
+        self._update("animales", animal_id, datos)
+
+    def delete_animal(self, animal_id: int) -> None:
+        """Elimina el animal con ID `animal_id` (y sus cuidados, en cascada)."""
+        self._delete("animales", animal_id)
+
+    # ──────────────────────────────── Dueños ──────────────────────────────────
+    def insertar_dueno(self, datos: Dict[str, Any]) -> int:
+        """
+        Inserta un nuevo dueño en la tabla duenos.
+
+        Parameters
+        ----------
+        datos : dict
+            Diccionario con las claves:
+            - nif (str): NIF del dueño.
+            - nombre (str): Nombre del dueño.
+            - direccion (str): Dirección del dueño.
+            - telefono (str): Teléfono del dueño.
+
+        Returns
+        -------
+        int
+            ID autogenerado id_dueno.
+
+        Raises
+        ------
+        Error
+            Si ocurre un error durante la inserción.
+        """
+        return self._insert("duenos", datos)
+
+    def insert_many_duenos(
+        self, filas: Iterable[Dict[str, Any]], chunk_size: int = 500
+    ) -> List[int]:
+        """Inserta varios dueños en una transacción; devuelve sus IDs en orden."""
+        return self._insert_many("duenos", filas, chunk_size)
+
+    def obtener_duenos(
+        self,
+        *,
+        limit: Optional[int] = None,
+        after: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Obtiene los registros de la tabla duenos.
+
+        Parameters
+        ----------
+        limit : int, optional
+            Máximo de filas a devolver. Sin él se devuelve la tabla completa.
+        after : int, optional
+            Devuelve solo los dueños con id_dueno mayor que este (página siguiente).
+
+        Returns
+        -------
+        List[Dict[str, Any]]
+            Lista de diccionarios con los campos:
+            id_dueno, nif, nombre, direccion, telefono.
+
+        Raises
+        ------
+        Error
+            Si ocurre un error durante la consulta.
+        """
+        return self._listar(
+            "duenos",
+            "id_dueno, nif, nombre, direccion, telefono",
+            limit=limit,
+            after=after,
+        )
+
+    def obtener_dueno(self, dueno_id: int) -> Optional[Dict[str, Any]]:
+        """Devuelve el dueño con ID `dueno_id` o None si no existe."""
+        return self._select_one("duenos", dueno_id)
+
+    def actualizar_dueno(self, dueno_id: int, datos: Dict[str, Any]) -> None:
+        """Actualiza los campos indicados en `datos` para el dueño `dueno_id`."""
+        self._update("duenos", dueno_id, datos)
+
+    def eliminar_dueno(self, dueno_id: int) -> None:
+        """Elimina el dueño con ID `dueno_id`."""
+        self._delete("duenos", dueno_id)
+
+    # ──────────────────────────────── Veterinarios ──────────────────────────────────
+    def insertar_veterinario(self, datos: Dict[str, Any]) -> int:
+        """Inserta un veterinario y devuelve su número de colegiado."""
+        return self._insert("veterinarios", datos)
+
+    def insert_many_veterinarios(
+        self, filas: Iterable[Dict[str, Any]], chunk_size: int = 500
+    ) -> List[int]:
+        """Inserta varios veterinarios en una transacción; devuelve sus IDs en orden."""
+        return self._insert_many("veterinarios", filas, chunk_size)
+
+    def obtener_veterinarios(
+        self,
+        *,
+        limit: Optional[int] = None,
+        after: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Devuelve los registros de la tabla veterinarios (paginables por colegiado_id)."""
+        return self._listar(
+            "veterinarios",
+            "colegiado_id, nombre, nif, direccion, telefono",
+            limit=limit,
+            after=after,
+        )
+
+    def obtener_veterinario(self, colegiado_id: int) -> Optional[Dict[str, Any]]:
+        """Devuelve el veterinario `colegiado_id` o None si no existe."""
+        return self._select_one("veterinarios", colegiado_id)
+
+    def actualizar_veterinario(self, colegiado_id: int, datos: Dict[str, Any]) -> None:
+        """Actualiza los campos indicados en `datos` para el veterinario."""
+        self._update("veterinarios", colegiado_id, datos)
+
+    def eliminar_veterinario(self, colegiado_id: int) -> None:
+        """Elimina el veterinario `colegiado_id`."""
+        self._delete("veterinarios", colegiado_id)
+
+    # ──────────────────────────────── Cuidados ──────────────────────────────────
+    def insert_cuidado(self, datos: Dict[str, Any]) -> int:
+        """Inserta un cuidado (animal_id, fecha, tipo, estado, notas) y devuelve su ID."""
+        return self._insert("cuidados", datos)
+
+    def insert_many_cuidados(
+        self, filas: Iterable[Dict[str, Any]], chunk_size: int = 500
+    ) -> List[int]:
+        """Inserta varios cuidados en una transacción; devuelve sus IDs en orden."""
+        return self._insert_many("cuidados", filas, chunk_size)
+
+    def get_cuidados(
+        self,
+        animal_id: Optional[int] = None,
+        *,
+        limit: Optional[int] = None,
+        after: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Devuelve los cuidados, todos o solo los del animal `animal_id` (paginables por id)."""
+        return self._listar(
+            "cuidados",
+            "id, animal_id, fecha, tipo, estado, notas",
+            None if animal_id is None else {"animal_id": animal_id},
+            limit=limit,
+            after=after,
+        )
+
+    def iter_cuidados(
+        self, animal_id: Optional[int] = None, batch_size: int = 1000
+    ) -> Iterator[Dict[str, Any]]:
+        """Recorre los cuidados (todos o de `animal_id`) en orden de id con memoria constante."""
+        q, params = self._consulta_listado(
+            "cuidados",
+            "id, animal_id, fecha, tipo, estado, notas",
+            None if animal_id is None else {"animal_id": animal_id},
+            ordenar=True,
+        )
+        return self._iterar(q, params, batch_size)
+
+    def iter_cuidados_por_estado(
+        self, estado: str, batch_size: int = 1000
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Recorre los cuidados con `estado` en orden de (fecha, id) por
+        idx_cuidados_estado_fecha, que ya da ese orden (el índice incluye la
+        clave primaria) sin ordenar ni leer las filas de otros estados.
+        """
+        q = (
+            "SELECT id, animal_id, fecha, tipo, estado, notas FROM cuidados "
+            f"WHERE estado = {self.P} ORDER BY fecha, id"
+        )
+        return self._iterar(q, [estado], batch_size)
+
+    def get_cuidados_con_especie(
+        self, animal_id: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Cuidados con la especie de su animal: un LEFT JOIN por el índice
+        UNIQUE de `animales.chip` en lugar de una búsqueda por fila.
+        """
+        q = (
+            "SELECT c.id, c.animal_id, c.fecha, c.tipo, c.estado, c.notas, a.especie "
+            "FROM cuidados c LEFT JOIN animales a ON a.chip = c.animal_id"
+        )
+        params: List[Any] = []
+        if animal_id is not None:
+            q += f" WHERE c.animal_id = {self.P}"
+            params.append(str(animal_id))
+        return self._select(q + " ORDER BY c.id", params)
+
+    def update_cuidado(self, cuidado_id: int, datos: Dict[str, Any]) -> None:
+        """Actualiza los campos indicados en `datos` para el cuidado `cuidado_id`."""
+        self._update("cuidados", cuidado_id, datos)
+
+    def delete_cuidado(self, cuidado_id: int) -> None:
+        """Elimina el cuidado con ID `cuidado_id`."""
+        self._delete("cuidados", cuidado_id)
+
+    def cambiar_estado_cuidados(
+        self,
+        nuevo_estado: str,
+        *,
+        ids: Optional[Iterable[int]] = None,
+        animal_id: Optional[Any] = None,
+        estado: Optional[str] = None,
+        desde: Optional[str] = None,
+        hasta: Optional[str] = None,
+    ) -> int:
+        """
+        Un único `UPDATE cuidados SET estado = ... WHERE ...` (uno por cada
+        MAX_PARAMS `ids`, todos en una transacción).  Los filtros de animal y
+        fecha usan los índices (animal_id, fecha) y (estado, fecha).
+        """
+        condiciones = [f"estado <> {self.P}"]
+        params: List[Any] = [nuevo_estado, nuevo_estado]
+        for condicion, valor in (
+            ("animal_id =", animal_id),
+            ("estado =", estado),
+            ("fecha >=", desde),
+            ("fecha <=", hasta),
+        ):
+            if valor is not None:
+                condiciones.append(f"{condicion} {self.P}")
+                params.append(str(valor))
+        q = f"UPDATE cuidados SET estado = {self.P} WHERE " + " AND ".join(condiciones)
+
+        trozos: List[Optional[List[int]]] = [None]
+        if ids is not None:
+            unicos = list(dict.fromkeys(int(i) for i in ids))
+            if not unicos:
+                return 0
+            n = self.MAX_PARAMS - len(params)
+            trozos = [unicos[i:i + n] for i in range(0, len(unicos), n)]
+
+        cambiados = 0
+        with self._conexion() as conn, self._transaccion(conn):
+            cur = self._cursor(conn)
+            try:
+                for trozo in trozos:
+                    q_trozo, p_trozo = q, params
+                    if trozo is not None:
+                        q_trozo += f" AND id IN ({', '.join([self.P] * len(trozo))})"
+                        p_trozo = params + trozo
+                    with self._medir(q_trozo, p_trozo) as m:
+                        cur.execute(q_trozo, p_trozo)
+                        m.filas = max(cur.rowcount, 0)
+                    cambiados += m.filas
+            finally:
+                cur.close()
+        return cambiados
+
+    # ──────────────────────────────── Alimentos ──────────────────────────────────
+    def insertar_alimento(self, datos: Dict[str, Any]) -> int:
+        """Inserta un alimento y devuelve su ID."""
+        return self._insert("alimentos", datos)
+
+    def insert_many_alimentos(
+        self, filas: Iterable[Dict[str, Any]], chunk_size: int = 500
+    ) -> List[int]:
+        """Inserta varios alimentos en una transacción; devuelve sus IDs en orden."""
+        return self._insert_many("alimentos", filas, chunk_size)
+
+    def obtener_alimentos(
+        self,
+        *,
+        limit: Optional[int] = None,
+        after: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Devuelve los registros de la tabla alimentos (paginables por id)."""
+        return self._listar(
+            "alimentos",
+            "id, tipo_animal, alimento, cantidad, fecha_caducidad, coste",
+            limit=limit,
+            after=after,
+        )
+
+    def obtener_alimento(self, alimento_id: int) -> Optional[Dict[str, Any]]:
+        """Devuelve el alimento con ID `alimento_id` o None si no existe."""
+        return self._select_one("alimentos", alimento_id)
+
+    def actualizar_alimento(self, alimento_id: int, datos: Dict[str, Any]) -> None:
+        """Actualiza los campos indicados en `datos` para el alimento `alimento_id`."""
+        self._update("alimentos", alimento_id, datos)
+
+    def eliminar_alimento(self, alimento_id: int) -> None:
+        """Elimina el alimento con ID `alimento_id`."""
+        self._delete("alimentos", alimento_id)
+
+    # ──────────────────────────────── Vacunas ──────────────────────────────────
+    def insert_vacuna(self, datos: Dict[str, Any]) -> int:
+        """Crea una vacuna y devuelve su ID."""
+        return self._insert("vacunas", datos)
+
+    def insert_many_vacunas(
+        self, filas: Iterable[Dict[str, Any]], chunk_size: int = 500
+    ) -> List[int]:
+        """Inserta varios vacunas en una transacción; devuelve sus IDs en orden."""
+        return self._insert_many("vacunas", filas, chunk_size)
+
+    def listar_vacunas(
+        self,
+        *,
+        limit: Optional[int] = None,
+        after: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Devuelve las vacunas como lista de dicts (paginables por id)."""
+        return self._listar("vacunas", "id, nombre, fecha", limit=limit, after=after)
+
+    def update_vacuna(self, vacuna_id: int, datos: Dict[str, Any]) -> None:
+        """Actualiza los campos indicados en `datos` para la vacuna `vacuna_id`."""
+        self._update("vacunas", vacuna_id, datos)
+
+    def delete_vacuna(self, vacuna_id: int) -> None:
+        """Elimina la vacuna con ID `vacuna_id`."""
+        self._delete("vacunas", vacuna_id)
+
+    # ──────────────────────────────── Tratamientos ──────────────────────────────────
+    def insert_tratamiento(self, datos: Dict[str, Any]) -> int:
+        """Crea un tratamiento y devuelve su ID."""
+        return self._insert("tratamientos", datos)
+
+    def insert_many_tratamientos(
+        self, filas: Iterable[Dict[str, Any]], chunk_size: int = 500
+    ) -> List[int]:
+        """Inserta varios tratamientos en una transacción; devuelve sus IDs en orden."""
+        return self._insert_many("tratamientos", filas, chunk_size)
+
+    def listar_tratamientos(
+        self,
+        *,
+        limit: Optional[int] = None,
+        after: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Devuelve los tratamientos como lista de dicts (paginables por id)."""
+        return self._listar(
+            "tratamientos",
+            "id, nombre, fecha_inicio, fecha_fin, coste",
+            limit=limit,
+            after=after,
+        )
+
+    def update_tratamiento(self, tratamiento_id: int, datos: Dict[str, Any]) -> None:
+        """Actualiza los campos indicados en `datos` para el tratamiento `tratamiento_id`."""
+        self._update("tratamientos", tratamiento_id, datos)
+
+    def delete_tratamiento(self, tratamiento_id: int) -> None:
+        """Elimina el tratamiento con ID `tratamiento_id`."""
+        self._delete("tratamientos", tratamiento_id)
+
+    # ──────────────────────────────── Consultas ──────────────────────────────────
+    def insert_consulta(self, datos: Dict[str, Any]) -> int:
+        """Crea una consulta y devuelve su ID."""
+        return self._insert("consultas", datos)
+
+    def insert_many_consultas(
+        self, filas: Iterable[Dict[str, Any]], chunk_size: int = 500
+    ) -> List[int]:
+        """Inserta varios consultas en una transacción; devuelve sus IDs en orden."""
+        return self._insert_many("consultas", filas, chunk_size)
+
+    def listar_consultas(
+        self,
+        *,
+        limit: Optional[int] = None,
+        after: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Devuelve las consultas como lista de dicts (paginables por id)."""
+        return self._listar(
+            "consultas",
+            "id, animal, veterinario, fecha, diagnostico",
+            limit=limit,
+            after=after,
+        )
+
+    def update_consulta(self, consulta_id: int, datos: Dict[str, Any]) -> None:
+        """Actualiza los campos indicados en `datos` para la consulta `consulta_id`."""
+        self._update("consultas", consulta_id, datos)
+
+    def delete_consulta(self, consulta_id: int) -> None:
+        """Elimina la consulta con ID `consulta_id`."""
+        self._delete("consultas", consulta_id)
+
+    # ──────────────────────────────── Sincronización ──────────────────────────────────
+    def _antes_de_hueco(self, since: int, entradas: List[Dict[str, Any]]) -> int:
+        """
+        Número de `entradas` (en orden de seq) que se pueden entregar sin
+        saltar un hueco reciente después de `since`.
+        """
+        if self.ESPERA_HUECOS <= 0:
+            return len(entradas)
+        ahora = time.monotonic()
+        esperado = since + 1
+        with self._huecos_lock:
+            for i, e in enumerate(entradas):
+                if e["seq"] != esperado:
+                    visto = self._huecos.setdefault(esperado, ahora)
+                    while len(self._huecos) > self.MAX_HUECOS:
+                        del self._huecos[next(iter(self._huecos))]
+                    if ahora - visto < self.ESPERA_HUECOS:
+                        return i
+                esperado = e["seq"] + 1
+        return len(entradas)
+
+    def podar_cambios(self, conservar: int) -> int:
+        """Borra del registro de cambios todo salvo las `conservar` últimas entradas."""
+        if conservar < 1:
+            raise ValueError("conservar debe ser al menos 1.")
+        limite = self.ultimo_cambio() - conservar
+        if limite < 1:
+            return 0
+        # la última entrada de cada tabla se conserva (ETag, ver versiones.py)
+        ultimas = [
+            f["seq"] for f in self._select(
+                "SELECT MAX(seq) AS seq FROM registro_cambios GROUP BY tabla"
+            )
+        ]
+        q = f"DELETE FROM registro_cambios WHERE seq <= {self.P}"
+        if ultimas:
+            q += f" AND seq NOT IN ({', '.join([self.P] * len(ultimas))})"
+        params = (limite, *ultimas)
+        with self._conexion() as conn:
+            cur = self._cursor(conn)
+            try:
+                with self._medir(q, params) as m:
+                    cur.execute(q, params)
+                    m.filas = max(cur.rowcount, 0)
+                return m.filas
+            finally:
+                cur.close()
+
+    def ultimo_cambio(self) -> int:
+        """
+        `seq` de la última entrada del registro de cambios (0 si está vacío).
+
+        Con `ESPERA_HUECOS` se devuelve la anterior al primer hueco reciente
+        de las `COLA_HUECOS` últimas entradas (ver `cambios_desde`): quien
+        empieza a leer desde aquí no se salta una transacción sin confirmar.
+        """
+        if self.ESPERA_HUECOS <= 0:
+            filas = self._select("SELECT MAX(seq) AS seq FROM registro_cambios")
+            return filas[0]["seq"] or 0
+        entradas = self._select(
+            "SELECT seq FROM registro_cambios ORDER BY seq DESC "
+            f"LIMIT {int(self.COLA_HUECOS)}"
+        )
+        if not entradas:
+            return 0
+        entradas.reverse()
+        since = entradas[0]["seq"] - 1
+        corte = self._antes_de_hueco(since, entradas)
+        return entradas[corte - 1]["seq"] if corte else since
+
+    def ultimo_cambio_por_tabla(self, since: int, hasta: int) -> Dict[str, int]:
+        """Último `seq` de cada tabla en el tramo (resuelto por la clave primaria)."""
+        filas = self._select(
+            "SELECT tabla, MAX(seq) AS seq FROM registro_cambios "
+            f"WHERE seq > {self.P} AND seq <= {self.P} GROUP BY tabla",
+            (since, hasta),
+        )
+        return {f["tabla"]: f["seq"] for f in filas}
+
+    def cambios_desde(self, since: int = 0, limit: int = 1000) -> Dict[str, Any]:
+        """
+        Lee la página del registro de cambios (lo escriben los triggers de la
+        migración 4) y el estado actual de las filas con una SELECT ... IN
+        por tabla.
+
+        En MySQL los `seq` (AUTO_INCREMENT) se reservan al escribir pero se
+        ven al confirmar: una transacción lenta puede dejar un hueco que se
+        llena después de que aparezcan `seq` mayores.  La página se corta
+        antes del primer hueco visto hace menos de `ESPERA_HUECOS` segundos,
+        así `next` no lo salta y el cliente lo recibe en una llamada
+        posterior.  Pasado ese tiempo el hueco se da por definitivo (un
+        rollback o entradas podadas con `podar_cambios`).
+        """
+        if limit < 1:
+            raise ValueError("limit debe ser al menos 1.")
+        q = (
+            "SELECT seq, tabla, clave, operacion FROM registro_cambios "
+            f"WHERE seq > {self.P} ORDER BY seq LIMIT {int(limit) + 1}"
+        )
+        entradas = self._select(q, (since,))
+        mas = len(entradas) > limit
+        entradas = entradas[:limit]
+        corte = self._antes_de_hueco(since, entradas)
+        if corte < len(entradas):
+            entradas, mas = entradas[:corte], False
+        # última entrada de cada fila, en orden de seq
+        ultimas = {(e["tabla"], e["clave"]): e for e in entradas}
+        por_tabla: Dict[str, List[Any]] = {}
+        for tabla, clave in ultimas:
+            por_tabla.setdefault(tabla, []).append(clave)
+        filas: Dict[Tuple[str, Any], Dict[str, Any]] = {}
+        for tabla, claves in por_tabla.items():
+            for i in range(0, len(claves), self.MAX_PARAMS):
+                trozo = claves[i:i + self.MAX_PARAMS]
+                for fila in self._select(
+                    f"SELECT * FROM {tabla} WHERE {CLAVES[tabla]} "
+                    f"IN ({', '.join([self.P] * len(trozo))})",
+                    trozo,
+                ):
+                    filas[(tabla, fila[CLAVES[tabla]])] = fila
+        items = []
+        for e in sorted(ultimas.values(), key=lambda e: e["seq"]):
+            fila = filas.get((e["tabla"], e["clave"]))
+            items.append({
+                "seq": e["seq"],
+                "tabla": e["tabla"],
+                "clave": e["clave"],
+                "op": "delete" if fila is None else "upsert",
+                "fila": fila,
+            })
+        return {
+            "items": items,
+            "next": entradas[-1]["seq"] if entradas else since,
+            "more": mas,
+        }
+
+    # ──────────────────────────────── Estadísticas ──────────────────────────────────
+    def cuidados_por_estado_y_dia(
+        self, desde: Optional[str] = None, hasta: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Cuidados por día y estado (resuelto con idx_cuidados_estado_fecha)."""
+        return self._agregar(
+            "cuidados",
+            {"fecha": "SUBSTR(fecha, 1, 10)", "estado": "estado"},
+            {"total": "COUNT(*)"},
+            "fecha", desde, hasta,
+        )
+
+    def animales_por_especie(self) -> List[Dict[str, Any]]:
+        """Animales por especie (resuelto con idx_animales_especie)."""
+        return self._agregar("animales", {"especie": "especie"}, {"total": "COUNT(*)"})
+
+    def coste_tratamientos_por_mes(
+        self, desde: Optional[str] = None, hasta: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Tratamientos y coste por mes de inicio (idx_tratamientos_inicio_coste)."""
+        return self._agregar(
+            "tratamientos",
+            {"mes": "SUBSTR(fecha_inicio, 1, 7)"},
+            {"tratamientos": "COUNT(*)", "coste": "SUM(coste)"},
+            "fecha_inicio", desde, hasta,
+        )
@@ -0,0 +1,212 @@
+"""
+sqlite_manager.py
+
+Gestor concreto para SQLite (sin servidor, pensado para clínicas pequeñas,
+nodos *edge* y pruebas locales).
+
+El CRUD lo implementa `SQLManager` (sql_base.py); aquí solo vive lo
+específico de SQLite:
+
+    - Modo WAL + `synchronous=NORMAL`: los lectores no bloquean al escritor
+      y cada commit no fuerza un fsync completo.
+    - Un pool acotado de conexiones (`database/pool.py`, el mismo que usa
+      MySQL): cada operación toma una prestada y la devuelve al terminar,
+      así que el número de conexiones abiertas no crece con los hilos del
+      servidor (Werkzeug crea uno por petición).
+    - `mmap_size` y `cache_size` configurables.
+
+No requiere dependencias externas (usa el módulo estándar `sqlite3`).
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from .migraciones import migrar
+from .pool import ConnectionPool
+from .sql_base import SQLManager
+
+# Ruta por defecto: datos/clinica.db en la raíz del proyecto
+_RUTA_DEFECTO = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "datos", "clinica.db"
+)
+
+
+def _dict_factory(cur: sqlite3.Cursor, row: tuple) -> Dict[str, Any]:
+    """`row_factory` que devuelve cada fila como dict columna → valor."""
+    return {d[0]: v for d, v in zip(cur.description, row)}
+
+
+class SQLiteManager(SQLManager):
+    """
+    Operaciones CRUD sobre un fichero SQLite con las mismas tablas que el
+    gestor MySQL.
+    """
+
+    DIALECTO = "sqlite"
+    P = "?"
+    MAX_PARAMS = 32766   # SQLITE_MAX_VARIABLE_NUMBER desde SQLite 3.32
+    # las escrituras se serializan y AUTOINCREMENT deshace el seq con el
+    # rollback: los seq se ven en orden y no hay huecos que esperar
+    ESPERA_HUECOS = 0.0
+
+    # ──────────────────────────────── Configuración ──────────────────────────────────
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        mmap_size: Optional[int] = None,
+        cache_size_kb: Optional[int] = None,
+        busy_timeout: float = 5.0,
+        pool_size: Optional[int] = None,
+        pool_idle_timeout: Optional[float] = None,
+        pool_timeout: Optional[float] = None,
+    ) -> None:
+        """
+        Inicializa el gestor y crea las tablas si no existen.
+
+        Parameters
+        ----------
+        path : str, optional
+            Ruta del fichero. Por defecto, DB_PATH o `datos/clinica.db`.
+            Con ':memory:' cada conexión vería una base distinta: se usa una
+            sola, compartida, y solo tiene sentido en programas de un hilo.
+        mmap_size : int, optional
+            Bytes de la base que se leen vía `mmap`. Por defecto,
+            DB_SQLITE_MMAP_SIZE o 256 MiB; 0 lo desactiva.
+        cache_size_kb : int, optional
+            Tamaño de la caché de páginas por conexión, en KiB. Por defecto,
+            DB_SQLITE_CACHE_KB o 64 MiB.
+        busy_timeout : float
+            Segundos que una escritura espera si otra conexión tiene el cerrojo.
+        pool_size : int, optional
+            Máximo de conexiones abiertas a la vez. Por defecto, DB_POOL_SIZE o 5.
+        pool_idle_timeout : float, optional
+            Segundos de inactividad tras los que se cierra una conexión.
+            Por defecto, DB_POOL_IDLE_TIMEOUT o 300.
+        pool_timeout : float, optional
+            Segundos máximos de espera por una conexión libre.
+            Por defecto, DB_POOL_TIMEOUT o 30.
+        """
+        self.path = path or os.getenv("DB_PATH", _RUTA_DEFECTO)
+        self.mmap_size = (
+            mmap_size if mmap_size is not None
+            else int(os.getenv("DB_SQLITE_MMAP_SIZE", 256 * 1024 * 1024))
+        )
+        self.cache_size_kb = (
+            cache_size_kb if cache_size_kb is not None
+            else int(os.getenv("DB_SQLITE_CACHE_KB", 64 * 1024))
+        )
+        self.busy_timeout = busy_timeout
+
+        # ':memory:' es una base por conexión: se comparte una sola
+        self._memoria: Optional[sqlite3.Connection] = (
+            self._open() if self.path == ":memory:" else None
+        )
+        self.pool = ConnectionPool(
+            self._open,
+            size=pool_size or int(os.getenv("DB_POOL_SIZE", 5)),
+            idle_timeout=pool_idle_timeout or float(os.getenv("DB_POOL_IDLE_TIMEOUT", 300)),
+            timeout=pool_timeout or float(os.getenv("DB_POOL_TIMEOUT", 30)),
+        )
+        super().__init__()
+        self._init_db()
+
+    def _open(self) -> sqlite3.Connection:
+        """Abre una conexión nueva y le aplica los PRAGMA de rendimiento."""
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.busy_timeout,
+            isolation_level=None,        # autocommit, igual que MySQL
+            check_same_thread=False,     # el pool la presta a distintos hilos
+        )
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute("PRAGMA foreign_keys = ON")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        conn.execute(f"PRAGMA cache_size = -{int(self.cache_size_kb)}")
+        return conn
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """
+        Presta una conexión del pool durante el bloque `with`.
+
+        Raises
+        ------
+        PoolTimeoutError
+            Si no hay conexiones libres dentro del tiempo de espera.
+        """
+        if self._memoria is not None:
+            yield self._memoria
+            return
+        with self.pool.connection() as conn:
+            yield conn
+
+    @contextmanager
+    def _connect_stream(self) -> Iterator[sqlite3.Connection]:
+        """
+        Conexión dedicada (fuera del pool) para los iteradores `iter_*`: un
+        recorrido largo, o uno que consulta otras tablas entre lote y lote
+        (p. ej. el planificador), no retiene una conexión del pool.  Abrir
+        una conexión SQLite no cuesta más que un `open()` y los PRAGMA.
+        """
+        if self._memoria is not None:
+            yield self._memoria
+            return
+        conn = self._open()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _cursor(self, conn: sqlite3.Connection, dictionary: bool = False) -> sqlite3.Cursor:
+        """Cursor SQLite; con `dictionary=True` devuelve filas como dicts."""
+        cur = conn.cursor()
+        if dictionary:
+            cur.row_factory = _dict_factory
+        return cur
+
+    def _p(self, nombre: str) -> str:
+        return f":{nombre}"
+
+    def _ids_lote(self, cur: sqlite3.Cursor, n: int) -> List[int]:
+        """En SQLite `lastrowid` es el ID de la *última* fila del INSERT."""
+        return list(range(cur.lastrowid - n + 1, cur.lastrowid + 1))
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """Devuelve las estadísticas del pool (préstamos, esperas, etc.)."""
+        return self.pool.stats()
+
+    def close(self) -> None:
+        """Cierra las conexiones ociosas del pool."""
+        self.pool.close_all()
+
+    def _init_db(self) -> None:
+        """
+        Aplica las migraciones de esquema pendientes (ver migraciones.py).
+
+        Si encuentra la tabla `animales` del prototipo antiguo (columnas
+        id/tipo) y está vacía, la elimina antes para que la migración
+        inicial cree la actual.
+
+        Raises
+        ------
+        RuntimeError
+            Si la tabla antigua contiene datos (hay que migrarlos a mano).
+        """
+        with self._connect() as conn:
+            columnas = {r[1] for r in conn.execute("PRAGMA table_info(animales)")}
+            if columnas and "id_animal" not in columnas:
+                if conn.execute("SELECT COUNT(*) FROM animales").fetchone()[0]:
+                    raise RuntimeError(
+                        f"'{self.path}' tiene la tabla 'animales' del prototipo "
+                        "antiguo con datos; migra esos datos antes de usarla."
+                    )
+                conn.execute("DROP TABLE animales")
+        migrar(self)
@@ -0,0 +1,209 @@
+"""
+versiones.py
+
+`VersionedDBManager`: decorador de cualquier `DBManager` que sabe la versión
+de cada tabla: el `seq` de su última entrada en el registro de cambios (lo
+escriben los triggers de la migración 4, así que incluye lo escrito por
+otros procesos).
+
+La API construye con esas versiones el `ETag` de cada GET y responde 304 a
+un `If-None-Match` que coincide sin consultar la base de datos: las
+versiones se guardan en memoria y se releen del registro como mucho cada
+`refresco` segundos (`DB_VERSIONES_REFRESCO`), o en la primera consulta
+tras una escritura hecha a través de este gestor.  Una escritura de otro
+proceso cambia el ETag, como mucho, a los `refresco` segundos.
+
+El ETag solo depende de datos de la BD: todos los procesos que sirven la
+misma base dan el mismo ETag para los mismos datos, también tras un
+reinicio, y una escritura solo cambia el de los recursos que leen su tabla.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Set, Tuple
+
+from .db_base import COLUMNAS, DBManager
+
+# Tablas que modifica cada método de escritura de la interfaz
+ESCRITURAS: Dict[str, Tuple[str, ...]] = {
+    "insert_animal": ("animales",),
+    "insert_many_animales": ("animales",),
+    "upsert_animales": ("animales",),
+    "update_animal": ("animales",),
+    "delete_animal": ("animales", "cuidados"),      # ON DELETE CASCADE
+    "insertar_dueno": ("duenos",),
+    "insert_many_duenos": ("duenos",),
+    "actualizar_dueno": ("duenos",),
+    "eliminar_dueno": ("duenos",),
+    "insertar_veterinario": ("veterinarios",),
+    "insert_many_veterinarios": ("veterinarios",),
+    "actualizar_veterinario": ("veterinarios",),
+    "eliminar_veterinario": ("veterinarios",),
+    "insert_cuidado": ("cuidados",),
+    "insert_many_cuidados": ("cuidados",),
+    "update_cuidado": ("cuidados",),
+    "delete_cuidado": ("cuidados",),
+    "cambiar_estado_cuidados": ("cuidados",),
+    "insertar_alimento": ("alimentos",),
+    "insert_many_alimentos": ("alimentos",),
+    "actualizar_alimento": ("alimentos",),
+    "eliminar_alimento": ("alimentos",),
+    "insert_vacuna": ("vacunas",),
+    "insert_many_vacunas": ("vacunas",),
+    "update_vacuna": ("vacunas",),
+    "delete_vacuna": ("vacunas",),
+    "insert_tratamiento": ("tratamientos",),
+    "insert_many_tratamientos": ("tratamientos",),
+    "update_tratamiento": ("tratamientos",),
+    "delete_tratamiento": ("tratamientos",),
+    "insert_consulta": ("consultas",),
+    "insert_many_consultas": ("consultas",),
+    "update_consulta": ("consultas",),
+    "delete_consulta": ("consultas",),
+}
+
+_PREFIJOS_ESCRITURA = (
+    "insert", "upsert", "update", "delete", "actualizar", "eliminar", "cambiar",
+)
+
+
+class VersionesTablas:
+    """
+    Versión de cada tabla leída del registro de cambios de `gestor`, segura
+    entre hilos.
+
+    Parameters
+    ----------
+    gestor : DBManager
+        Gestor del que se lee el registro (`ultimo_cambio` y
+        `ultimo_cambio_por_tabla`, solo el tramo nuevo en cada lectura).
+    refresco : float
+        Segundos durante los que se usan las versiones en memoria sin
+        volver a leer el registro.
+    """
+
+    def __init__(self, gestor: DBManager, refresco: float = 1.0) -> None:
+        self._gestor = gestor
+        self.refresco = refresco
+        self._lock = threading.Lock()
+        self._versiones: Dict[str, int] = {t: 0 for t in COLUMNAS}
+        # seq hasta el que se ha leído el registro y cuándo empezó la
+        # lectura (None: hay que volver a leer antes de responder)
+        self._hasta = 0
+        self._leido: Optional[float] = None
+
+    def escrito(self, tablas: Iterable[str]) -> None:
+        """Anota una escritura en `tablas`: la próxima consulta relee el registro."""
+        if not tuple(tablas):
+            return
+        with self._lock:
+            self._leido = None
+
+    def version(self, *tablas: str) -> Tuple[int, ...]:
+        """Versión actual de cada una de `tablas` (0 si no consta ningún cambio)."""
+        with self._lock:
+            self._al_dia()
+            return tuple(self._versiones[t] for t in tablas)
+
+    def etag(self, *tablas: str) -> str:
+        """Valor de ETag (sin comillas) para un recurso que depende de `tablas`."""
+        return ".".join(str(v) for v in self.version(*tablas))
+
+    def _al_dia(self) -> None:
+        """Lee el tramo nuevo del registro si toca (con el cerrojo tomado)."""
+        inicio = time.monotonic()
+        if self._leido is not None and inicio - self._leido < self.refresco:
+            return
+        hasta = self._gestor.ultimo_cambio()
+        if hasta < self._hasta:             # registro vaciado o BD sustituida
+            self._versiones = {t: 0 for t in COLUMNAS}
+            self._hasta = 0
+        if hasta > self._hasta:
+            self._versiones.update(self._gestor.ultimo_cambio_por_tabla(self._hasta, hasta))
+            self._hasta = hasta
+        self._leido = inicio
+
+
+class VersionedDBManager(DBManager):
+    """
+    Envuelve un `DBManager` y mantiene la versión de cada tabla.
+
+    Parameters
+    ----------
+    inner : DBManager
+        Gestor al que se delegan las llamadas.
+    refresco : float
+        Segundos que se reutilizan las versiones sin leer el registro
+        (ver `VersionesTablas`).
+
+    Cada método de `ESCRITURAS` marca las versiones para releerlas al
+    terminar (también si falla: pudo escribir una parte).  Dentro de una
+    `transaction()` se marcan además al salir del bloque exterior: un
+    lector de otro hilo pudo leer el registro antes de la confirmación.
+    """
+
+    def __init__(self, inner: DBManager, refresco: float = 1.0) -> None:
+        self.inner = inner
+        self.versiones = VersionesTablas(inner, refresco)
+        # tablas escritas por la transaction() abierta en cada hilo
+        self._tx_local = threading.local()
+
+    def __getattr__(self, nombre: str) -> Any:
+        return getattr(self.inner, nombre)
+
+    def version(self, *tablas: str) -> Tuple[int, ...]:
+        """Versión actual de cada una de `tablas`."""
+        return self.versiones.version(*tablas)
+
+    def etag(self, *tablas: str) -> str:
+        """ETag de un recurso que depende de `tablas` (ver `VersionesTablas.etag`)."""
+        return self.versiones.etag(*tablas)
+
+    @contextmanager
+    def transaction(self) -> Iterator["VersionedDBManager"]:
+        """Transacción del gestor interno; al salir marca las tablas escritas."""
+        tocadas: Optional[Set[str]] = getattr(self._tx_local, "tablas", None)
+        if tocadas is not None:
+            with self.inner.transaction():
+                yield self
+            return
+        self._tx_local.tablas = tocadas = set()
+        try:
+            with self.inner.transaction():
+                yield self
+        finally:
+            self._tx_local.tablas = None
+            self.versiones.escrito(iter(tocadas))
+
+    def _escrito(self, tablas: Tuple[str, ...]) -> None:
+        tocadas = getattr(self._tx_local, "tablas", None)
+        if tocadas is not None:
+            tocadas.update(tablas)
+        self.versiones.escrito(iter(tablas))
+
+
+def _delegado(nombre: str) -> Callable[..., Any]:
+    tablas = ESCRITURAS.get(nombre)
+    if tablas is None:
+        def lectura(self: VersionedDBManager, *args: Any, **kwargs: Any) -> Any:
+            return getattr(self.inner, nombre)(*args, **kwargs)
+        lectura.__name__ = nombre
+        return lectura
+
+    def escritura(self: VersionedDBManager, *args: Any, **kwargs: Any) -> Any:
+        try:
+            return getattr(self.inner, nombre)(*args, **kwargs)
+        finally:
+            self._escrito(tablas)
+    escritura.__name__ = nombre
+    return escritura
+
+
+for _nombre in sorted(DBManager.__abstractmethods__ - {"transaction"}):
+    if _nombre.startswith(_PREFIJOS_ESCRITURA) and _nombre not in ESCRITURAS:
+        raise RuntimeError(f"Falta '{_nombre}' en versiones.ESCRITURAS")
+    setattr(VersionedDBManager, _nombre, _delegado(_nombre))
+VersionedDBManager.__abstractmethods__ = frozenset()